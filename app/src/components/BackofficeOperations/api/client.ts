@@ -351,6 +351,20 @@ export interface MatchResultResponse {
   matched_pairs: MatchedPair[];
   unmatched_source: UnmatchedRow[];
   unmatched_target: UnmatchedRow[];
+  rows_included: boolean; // false: row lists are empty (external engine), page them instead
+  created_at: string;
+}
+
+export interface MatchResultSummary {
+  id: number;
+  config_id: number;
+  config_name: string;
+  source_table_key: string;
+  target_table_key: string;
+  matched_count: number;
+  unmatched_source_count: number;
+  unmatched_target_count: number;
+  stale: boolean;
   created_at: string;
 }
 
@@ -362,7 +376,7 @@ export const matchingApi = {
     }),
 
   listResults: (configId?: number, limit: number = 10) =>
-    fetchApi<MatchResultResponse[]>('/matching/results', {
+    fetchApi<MatchResultSummary[]>('/matching/results', {
       params: {
         ...(configId ? { config_id: String(configId) } : {}),
         limit: String(limit),
@@ -5,6 +5,7 @@ import {
   matchingApi,
   type MatchConfigResponse,
   type MatchResultResponse,
+  type MatchResultSummary,
 } from '../api';
 
 // Convert backend match config to frontend type
@@ -56,6 +57,25 @@ function toFrontendResult(backend: MatchResultResponse): MatchSummary {
   };
 }
 
+// Convert a backend result summary (counts only, no rows) to frontend type
+function toFrontendSummary(backend: MatchResultSummary): MatchSummary {
+  return {
+    configId: String(backend.config_id),
+    configName: backend.config_name,
+    sourceTable: backend.source_table_key,
+    targetTable: backend.target_table_key,
+    runAt: new Date(backend.created_at).getTime(),
+    result: {
+      matchedCount: backend.matched_count,
+      unmatchedSourceCount: backend.unmatched_source_count,
+      unmatchedTargetCount: backend.unmatched_target_count,
+      matchedPairs: [],
+      unmatchedSource: [],
+      unmatchedTarget: [],
+    },
+  };
+}
+
 export function useMatchEngine(
   tableDataOverrides: Record<string, { columns: string[]; data: string[][] }>,
   _valueMappings: ValueMapping[],
@@ -83,7 +103,7 @@ export function useMatchEngine(
   const loadMatchResults = useCallback(async () => {
     try {
       const results = await matchingApi.listResults(undefined, 20);
-      setMatchResults(results.map(toFrontendResult));
+      setMatchResults(results.map(toFrontendSummary));
     } catch (error) {
       console.error('Error loading match results:', error);
     }
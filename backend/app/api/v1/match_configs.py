@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
 
 from ...database import get_db
 from ...models import MatchConfig, MatchColumn, Table
 from ...schemas import (
-    MatchConfigCreate, MatchConfigUpdate, MatchConfigResponse, MatchColumnResponse
+    MatchConfigCreate, MatchConfigUpdate, MatchConfigResponse, MatchColumnResponse, MatchColumnCreate
 )
+from ...services.match_results import delete_match_result_rows
+from ...services.matching_service import validate_match_config
 
 router = APIRouter(prefix="/match-configs", tags=["Match Configurations"])
 
@@ -38,14 +40,45 @@ def config_to_response(db: Session, config: MatchConfig) -> MatchConfigResponse:
                 source_column=col.source_column,
                 target_column=col.target_column,
                 value_mapping_id=col.value_mapping_id,
-                case_sensitive=col.case_sensitive
+                case_sensitive=col.case_sensitive,
+                match_type=col.match_type or "exact",
+                tolerance_type=col.tolerance_type,
+                tolerance=col.tolerance,
+                fuzzy_threshold=col.fuzzy_threshold,
+                pass_index=col.pass_index or 0
             )
             for col in config.match_columns
         ],
+        match_mode=config.match_mode or "one_to_one",
+        aggregate_max_size=config.aggregate_max_size,
         created_at=config.created_at
     )
 
 
+def build_match_column(config_id: int, col_data: MatchColumnCreate) -> MatchColumn:
+    """Create a MatchColumn model from request data"""
+    return MatchColumn(
+        config_id=config_id,
+        source_column=col_data.source_column,
+        target_column=col_data.target_column,
+        value_mapping_id=col_data.value_mapping_id,
+        case_sensitive=col_data.case_sensitive,
+        match_type=col_data.match_type,
+        tolerance_type=col_data.tolerance_type,
+        tolerance=col_data.tolerance,
+        fuzzy_threshold=col_data.fuzzy_threshold,
+        pass_index=col_data.pass_index
+    )
+
+
+def check_match_config(match_mode: Optional[str], aggregate_max_size: Optional[int], match_columns) -> None:
+    """Validate match mode and column rules or raise 400"""
+    try:
+        validate_match_config(match_mode, aggregate_max_size, match_columns)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 @router.get("/", response_model=List[MatchConfigResponse])
 async def list_match_configs(db: Session = Depends(get_db)):
     """List all match configurations"""
@@ -68,27 +101,23 @@ async def create_match_config(
     db: Session = Depends(get_db)
 ):
     """Create a new match configuration"""
+    check_match_config(data.match_mode, data.aggregate_max_size, data.match_columns)
     source_table_id = get_table_id_by_key(db, data.source_table_key)
     target_table_id = get_table_id_by_key(db, data.target_table_key)
 
     config = MatchConfig(
         name=data.name,
         source_table_id=source_table_id,
-        target_table_id=target_table_id
+        target_table_id=target_table_id,
+        match_mode=data.match_mode,
+        aggregate_max_size=data.aggregate_max_size
     )
     db.add(config)
     db.flush()
 
     # Add match columns
     for col_data in data.match_columns:
-        col = MatchColumn(
-            config_id=config.id,
-            source_column=col_data.source_column,
-            target_column=col_data.target_column,
-            value_mapping_id=col_data.value_mapping_id,
-            case_sensitive=col_data.case_sensitive
-        )
-        db.add(col)
+        db.add(build_match_column(config.id, col_data))
 
     db.commit()
     db.refresh(config)
@@ -110,20 +139,24 @@ async def update_match_config(
     if data.name is not None:
         config.name = data.name
 
+    if data.match_mode is not None or data.aggregate_max_size is not None or data.match_columns is not None:
+        check_match_config(
+            data.match_mode if data.match_mode is not None else config.match_mode,
+            data.aggregate_max_size if data.aggregate_max_size is not None else config.aggregate_max_size,
+            data.match_columns if data.match_columns is not None else config.match_columns
+        )
+    if data.match_mode is not None:
+        config.match_mode = data.match_mode
+    if data.aggregate_max_size is not None:
+        config.aggregate_max_size = data.aggregate_max_size
+
     if data.match_columns is not None:
         # Delete existing columns
         db.query(MatchColumn).filter(MatchColumn.config_id == config.id).delete()
 
         # Add new columns
         for col_data in data.match_columns:
-            col = MatchColumn(
-                config_id=config.id,
-                source_column=col_data.source_column,
-                target_column=col_data.target_column,
-                value_mapping_id=col_data.value_mapping_id,
-                case_sensitive=col_data.case_sensitive
-            )
-            db.add(col)
+            db.add(build_match_column(config.id, col_data))
 
     db.commit()
     db.refresh(config)
@@ -137,6 +170,7 @@ async def delete_match_config(id: int, db: Session = Depends(get_db)):
     config = db.query(MatchConfig).filter(MatchConfig.id == id).first()
     if not config:
         raise HTTPException(status_code=404, detail="Match config not found")
+    delete_match_result_rows(db, [result.id for result in config.results])
     db.delete(config)
     db.commit()
     return None
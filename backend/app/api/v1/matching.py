@@ -4,7 +4,14 @@ from typing import List, Optional
 
 from ...database import get_db
 from ...models import MatchConfig, MatchResult, Table
-from ...schemas import MatchExecuteRequest, MatchResultResponse, MatchedPair, UnmatchedRow
+from ...schemas import (
+    MatchBreakCounts, MatchBreakRow, MatchDiagnostics, MatchExecuteRequest, MatchResultDiff, MatchResultResponse, MatchResultRowsPage,
+    MatchResultSummary, MatchedPair, UnmatchedRow
+)
+from ...services.match_result_diff import result_diff
+from ...services.match_results import (
+    ResultRowLoader, delete_match_result_rows, is_stale, result_detail, result_page
+)
 from ...services.matching_service import MatchingService
 
 router = APIRouter(prefix="/matching", tags=["Match Execution"])
@@ -16,9 +23,17 @@ def get_table_key_by_id(db: Session, table_id: int) -> str:
     return table.key if table else ""
 
 
-def result_to_response(db: Session, result: MatchResult) -> MatchResultResponse:
-    """Convert model to response"""
+def result_to_response(
+    db: Session,
+    result: MatchResult,
+    loader: Optional[ResultRowLoader] = None,
+    with_rows: bool = True
+) -> MatchResultResponse:
+    """Convert model to response, with every row (read from the tables through loader) unless with_rows is off"""
     config = result.config
+    matched_pairs, unmatched_source, unmatched_target = (
+        result_detail(db, result, loader) if with_rows else ([], [], [])
+    )
     return MatchResultResponse(
         id=result.id,
         config_id=result.config_id,
@@ -33,69 +48,194 @@ def result_to_response(db: Session, result: MatchResult) -> MatchResultResponse:
                 source_row_index=p["source_row_index"],
                 target_row_index=p["target_row_index"],
                 source_row=p["source_row"],
-                target_row=p["target_row"]
+                target_row=p["target_row"],
+                score=p.get("score"),
+                pass_index=p.get("pass_index")
             )
-            for p in result.matched_pairs
+            for p in matched_pairs
         ],
         unmatched_source=[
             UnmatchedRow(row_index=r["row_index"], row=r["row"])
-            for r in result.unmatched_source
+            for r in unmatched_source
         ],
         unmatched_target=[
             UnmatchedRow(row_index=r["row_index"], row=r["row"])
-            for r in result.unmatched_target
+            for r in unmatched_target
         ],
+        rows_included=with_rows,
+        created_at=result.created_at
+    )
+
+
+def result_to_summary(db: Session, result: MatchResult) -> MatchResultSummary:
+    """Convert model to a summary, without reading any rows"""
+    config = result.config
+    return MatchResultSummary(
+        id=result.id,
+        config_id=result.config_id,
+        config_name=config.name if config else "",
+        source_table_key=get_table_key_by_id(db, config.source_table_id) if config else "",
+        target_table_key=get_table_key_by_id(db, config.target_table_id) if config else "",
+        matched_count=result.matched_count,
+        unmatched_source_count=result.unmatched_source_count,
+        unmatched_target_count=result.unmatched_target_count,
+        stale=is_stale(db, result),
         created_at=result.created_at
     )
 
 
+def get_result_by_id(db: Session, id: int) -> MatchResult:
+    """Get a match result by ID or raise 404"""
+    result = db.query(MatchResult).filter(MatchResult.id == id).first()
+    if not result:
+        raise HTTPException(status_code=404, detail="Match result not found")
+    return result
+
+
 @router.post("/execute", response_model=MatchResultResponse)
-async def execute_match(
+def execute_match(
     request: MatchExecuteRequest,
     db: Session = Depends(get_db)
 ):
-    """Execute matching based on a saved config"""
+    """
+    Execute matching based on a saved config (sync, so large matches run in the threadpool).
+
+    The response has every row, except with the external engine: its tables
+    may not fit in memory, so it returns the counts only (rows_included false)
+    and the rows are paged from /results/{id}/rows.
+    """
     config = db.query(MatchConfig).filter(MatchConfig.id == request.config_id).first()
     if not config:
         raise HTTPException(status_code=404, detail="Match config not found")
 
     service = MatchingService(db)
-    result = service.execute_match(config)
+    try:
+        result = service.execute_match(
+            config, engine=request.engine, incremental=request.incremental, diagnostics=request.diagnostics
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return result_to_response(db, result)
+    response = result_to_response(db, result, service.row_loader, with_rows=not service.streamed)
+    if service.diagnostics:
+        response.diagnostics = MatchDiagnostics(**service.diagnostics)
+    return response
 
 
-@router.get("/results", response_model=List[MatchResultResponse])
-async def list_match_results(
+@router.get("/results", response_model=List[MatchResultSummary])
+def list_match_results(
     config_id: Optional[int] = None,
-    limit: int = Query(10, ge=1, le=100),
+    limit: int = Query(10, ge=1, le=1000),
     db: Session = Depends(get_db)
 ):
-    """Get history of match results"""
+    """Get history of match results as counts, newest first; rows are paged from /results/{id}/rows"""
     query = db.query(MatchResult).order_by(MatchResult.created_at.desc())
 
     if config_id:
         query = query.filter(MatchResult.config_id == config_id)
 
-    results = query.limit(limit).all()
-    return [result_to_response(db, r) for r in results]
+    return [result_to_summary(db, r) for r in query.limit(limit).all()]
 
 
 @router.get("/results/{id}", response_model=MatchResultResponse)
-async def get_match_result(id: int, db: Session = Depends(get_db)):
-    """Get a match result by ID"""
-    result = db.query(MatchResult).filter(MatchResult.id == id).first()
-    if not result:
-        raise HTTPException(status_code=404, detail="Match result not found")
-    return result_to_response(db, result)
+def get_match_result(id: int, db: Session = Depends(get_db)):
+    """Get a match result by ID, with every row"""
+    return result_to_response(db, get_result_by_id(db, id))
+
+
+@router.get("/results/{id}/summary", response_model=MatchResultSummary)
+def get_match_result_summary(id: int, db: Session = Depends(get_db)):
+    """Get the counts of a match result without its rows"""
+    return result_to_summary(db, get_result_by_id(db, id))
+
+
+@router.get("/results/{id}/rows", response_model=MatchResultRowsPage)
+def get_match_result_rows(
+    id: int,
+    kind: str = Query("matched"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    sort: str = Query("position"),
+    descending: bool = False,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    search: Optional[str] = None,
+    pass_index: Optional[int] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Page through one kind of a result's rows: matched pairs, unmatched source
+    or unmatched target rows, optionally filtered by score, by pass or by a
+    substring of any cell, and sorted by position (run order), row index or score.
+    """
+    result = get_result_by_id(db, id)
+    try:
+        total, items = result_page(
+            db, result, kind, offset, limit, sort, descending, min_score, max_score, search, pass_index
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    page = MatchResultRowsPage(result_id=result.id, kind=kind, total=total, offset=offset, limit=limit)
+    if kind == "matched":
+        page.matched_pairs = [
+            MatchedPair(
+                source_row_index=p["source_row_index"],
+                target_row_index=p["target_row_index"],
+                source_row=p["source_row"],
+                target_row=p["target_row"],
+                score=p.get("score"),
+                pass_index=p.get("pass_index")
+            )
+            for p in items
+        ]
+    else:
+        page.unmatched_rows = [UnmatchedRow(row_index=r["row_index"], row=r["row"]) for r in items]
+    return page
+
+
+@router.get("/results/{id}/diff", response_model=MatchResultDiff)
+def get_match_result_diff(
+    id: int,
+    base_id: int,
+    side: str = Query("source"),
+    category: str = Query("new"),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=1000),
+    db: Session = Depends(get_db)
+):
+    """
+    Compare the breaks (unmatched rows) of a result with those of an earlier
+    result of the same config: counts of new, resolved and persistent breaks
+    on both sides, and a page of one side's breaks of one category.
+    """
+    result = get_result_by_id(db, id)
+    base = get_result_by_id(db, base_id)
+    try:
+        counts, total, items = result_diff(db, result, base, side, category, offset, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return MatchResultDiff(
+        result_id=result.id,
+        base_result_id=base.id,
+        source=MatchBreakCounts(**counts["source"]),
+        target=MatchBreakCounts(**counts["target"]),
+        side=side,
+        category=category,
+        total=total,
+        offset=offset,
+        limit=limit,
+        rows=[MatchBreakRow(**r) for r in items],
+        stale=is_stale(db, result) or is_stale(db, base)
+    )
 
 
 @router.delete("/results/{id}", status_code=204)
 async def delete_match_result(id: int, db: Session = Depends(get_db)):
     """Delete a match result"""
-    result = db.query(MatchResult).filter(MatchResult.id == id).first()
-    if not result:
-        raise HTTPException(status_code=404, detail="Match result not found")
+    result = get_result_by_id(db, id)
+    delete_match_result_rows(db, [result.id])
     db.delete(result)
     db.commit()
     return None
@@ -1,10 +1,13 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
+from typing import Any, List, Optional
 from pydantic import BaseModel
 
-from ...database import get_db
+from ...config import settings
+from ...database import get_db, SessionLocal
 from ...services.python_executor import PythonExecutorService
+from ...services.python_executions import start_execution_stream, cancel_execution, format_sse
 
 router = APIRouter(prefix="/python", tags=["Python Execution"])
 
@@ -12,6 +15,26 @@ router = APIRouter(prefix="/python", tags=["Python Execution"])
 class PythonExecuteRequest(BaseModel):
     script: str
     table_keys: Optional[List[str]] = None
+    deterministic: bool = False  # memoize the result until an input table changes
+    result_format: str = "rows"  # "rows" (strings) | "columnar" (native values per column)
+    target_table_key: Optional[str] = None  # save the full result as this table
+    target_table_name: Optional[str] = None
+    replace_target: bool = False
+
+
+class PythonResultPage(BaseModel):
+    result_id: Optional[str] = None
+    columns: List[str]
+    dtypes: List[str]
+    offset: int
+    total_rows: int
+    data: List[List[Any]]  # one list per column
+
+
+class PythonResourceUsage(BaseModel):
+    wall_time_ms: Optional[int] = None
+    cpu_time_ms: Optional[int] = None
+    peak_rss_bytes: Optional[int] = None  # only measured on worker processes
 
 
 class PythonExecuteResponse(BaseModel):
@@ -20,6 +43,14 @@ class PythonExecuteResponse(BaseModel):
     execution_time_ms: int
     result_columns: Optional[List[str]] = None
     result_data: Optional[List[List[str]]] = None
+    result: Optional[PythonResultPage] = None
+    result_id: Optional[str] = None
+    result_row_count: Optional[int] = None
+    saved_table_key: Optional[str] = None
+    saved_row_count: Optional[int] = None
+    cached: bool = False
+    output_truncated: bool = False
+    resources: Optional[PythonResourceUsage] = None
 
 
 class TableInfo(BaseModel):
@@ -30,7 +61,7 @@ class TableInfo(BaseModel):
 
 
 @router.post("/execute", response_model=PythonExecuteResponse)
-async def execute_python(
+def execute_python(
     request: PythonExecuteRequest,
     db: Session = Depends(get_db)
 ):
@@ -40,9 +71,19 @@ async def execute_python(
     The script has access to:
     - `pandas` as `pd`
     - `numpy` as `np`
-    - `tables`: dict of DataFrames keyed by table_key
+    - `tables`: DataFrames keyed by table_key, loaded on first access
+      (`tables.load(key, columns=[...])` loads only some columns)
 
     To return data, set a `result` variable to a DataFrame or list.
+    Scripts are stopped after PYTHON_EXECUTION_TIMEOUT seconds and limited by
+    PYTHON_MEMORY_LIMIT_MB / PYTHON_CPU_LIMIT_SECONDS; `resources` reports the
+    wall time, CPU time and peak RSS of the run. With
+    `deterministic: true` the result is reused (`cached: true`) until a table
+    the script read changes.
+
+    The full result is kept under `result_id` for paging; its first page is
+    returned as strings (`result_format: "rows"`) or as native values per
+    column (`"columnar"`). `target_table_key` saves the whole result as a table.
 
     Example:
     ```python
@@ -52,16 +93,93 @@ async def execute_python(
     ```
     """
     service = PythonExecutorService(db)
-    result = service.execute_script(request.script, request.table_keys)
-
-    return PythonExecuteResponse(
-        output=result['output'],
-        error=result['error'],
-        execution_time_ms=result['execution_time_ms'],
-        result_columns=result['result_columns'],
-        result_data=result['result_data'],
+    result = service.execute_script(
+        request.script,
+        request.table_keys,
+        deterministic=request.deterministic,
+        result_format=request.result_format,
+        target_table_key=request.target_table_key,
+        target_table_name=request.target_table_name,
+        replace_target=request.replace_target
     )
 
+    return PythonExecuteResponse(**result)
+
+
+@router.post("/execute/stream")
+def execute_python_stream(request: PythonExecuteRequest):
+    """
+    Execute a Python script, streaming its progress as Server-Sent Events.
+
+    Events: `start` ({execution_id}), `output` (printed text, line by line),
+    `progress` ({value, message} from `progress(value, message)` calls in the
+    script), `dropped` ({count} events skipped because the client fell behind),
+    then `result` (the same body as /execute, plus dropped_events) or `error`.
+    Cancel with POST /python/executions/{execution_id}/cancel or by closing
+    the connection.
+    """
+    def run(on_event, cancel_event):
+        # The request's session is closed before streaming starts, so use our own
+        db = SessionLocal()
+        try:
+            result = PythonExecutorService(db).execute_script(
+                request.script,
+                request.table_keys,
+                deterministic=request.deterministic,
+                result_format=request.result_format,
+                target_table_key=request.target_table_key,
+                target_table_name=request.target_table_name,
+                replace_target=request.replace_target,
+                on_event=on_event,
+                cancel_event=cancel_event
+            )
+            return PythonExecuteResponse(**result).model_dump()
+        finally:
+            db.close()
+
+    stream = start_execution_stream(run)
+
+    def events():
+        try:
+            yield format_sse("start", {"execution_id": stream.id})
+            for event in stream.events(keepalive=settings.PYTHON_STREAM_KEEPALIVE_SECONDS):
+                if event is None:
+                    yield ": keep-alive\n\n"
+                else:
+                    yield format_sse(*event)
+        finally:
+            # A client that disconnects early cancels the script; no-op once finished
+            stream.cancel_event.set()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.post("/executions/{execution_id}/cancel")
+def cancel_python_execution(execution_id: str):
+    """Cancel a running streamed execution"""
+    if not cancel_execution(execution_id):
+        raise HTTPException(status_code=404, detail="Execution not found or already finished")
+    return {"execution_id": execution_id, "cancelled": True}
+
+
+@router.get("/results/{result_id}", response_model=PythonResultPage)
+def get_result_page(
+    result_id: str,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(1000, ge=1, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Get a page of a script's full result, as native values per column"""
+    service = PythonExecutorService(db)
+    page = service.get_result_page(result_id, offset, limit)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result not found or expired")
+    return page
+
 
 @router.get("/tables", response_model=List[TableInfo])
 async def get_available_tables(db: Session = Depends(get_db)):
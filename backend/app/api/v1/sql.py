@@ -2,22 +2,41 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 
 from ...database import get_db
-from ...schemas import SqlExecuteRequest, SqlExecuteResponse
+from ...models import SavedProcess
+from ...schemas import SqlExecuteRequest, SqlSavedQueryExecuteRequest, SqlExecuteResponse
 from ...services.sql_executor import SqlExecutorService
 
 router = APIRouter(prefix="/sql", tags=["SQL Execution"])
 
+# Saved queries are SavedProcess records of this type, with config
+# {"query": ..., "table_keys": [...], "parameters": ..., "engine": ...}
+SAVED_QUERY_PROCESS_TYPE = "sql_query"
+
 
 @router.post("/execute", response_model=SqlExecuteResponse)
-async def execute_sql(
+def execute_sql(
     request: SqlExecuteRequest,
     db: Session = Depends(get_db)
 ):
-    """Execute SQL query against imported tables"""
+    """
+    Execute SQL query against imported tables.
+
+    Declared sync so queries run in the threadpool and execute in parallel
+    on the shared workspace's reader connections.
+    """
     service = SqlExecutorService(db)
 
     try:
-        result = service.execute_query(request.query, request.table_keys)
+        result = service.execute_query(
+            request.query,
+            request.table_keys,
+            profile=request.profile,
+            engine=request.engine,
+            parameters=request.parameters,
+            target_table_key=request.target_table_key,
+            target_table_name=request.target_table_name,
+            replace_target=request.replace_target
+        )
         return result
     except Exception as e:
         return SqlExecuteResponse(
@@ -29,6 +48,47 @@ async def execute_sql(
         )
 
 
+@router.post("/saved/{id}/execute", response_model=SqlExecuteResponse)
+def execute_saved_sql(
+    id: int,
+    request: SqlSavedQueryExecuteRequest,
+    db: Session = Depends(get_db)
+):
+    """Execute a saved parameterized query; request parameters override the saved defaults"""
+    process = db.query(SavedProcess).filter(SavedProcess.id == id).first()
+    if not process or process.process_type != SAVED_QUERY_PROCESS_TYPE:
+        raise HTTPException(status_code=404, detail="Saved query not found")
+
+    config = process.config or {}
+    if not config.get("query"):
+        raise HTTPException(status_code=400, detail="Saved query has no SQL")
+
+    parameters = config.get("parameters")
+    if isinstance(parameters, dict) and isinstance(request.parameters, dict):
+        parameters = {**parameters, **request.parameters}
+    elif request.parameters is not None:
+        parameters = request.parameters
+
+    service = SqlExecutorService(db)
+
+    try:
+        return service.execute_query(
+            config["query"],
+            config.get("table_keys"),
+            profile=request.profile,
+            engine=config.get("engine"),
+            parameters=parameters
+        )
+    except Exception as e:
+        return SqlExecuteResponse(
+            columns=[],
+            data=[],
+            row_count=0,
+            execution_time_ms=0,
+            error=str(e)
+        )
+
+
 @router.get("/schema")
 async def get_sql_schema(db: Session = Depends(get_db)):
     """Generate SQL DDL schema for all tables"""
@@ -8,6 +8,7 @@ from ...schemas import (
     TableCreate, TableUpdate, TableDataUpdate,
     TableSummaryResponse, TableDetailResponse, TableListResponse
 )
+from ...services.table_store import mark_table_changed
 
 router = APIRouter(prefix="/tables", tags=["Tables"])
 
@@ -148,6 +149,7 @@ async def update_table(key: str, table_data: TableUpdate, db: Session = Depends(
             db.add(row)
 
         table.row_count = len(table_data.data)
+        mark_table_changed(table)
 
     db.commit()
     db.refresh(table)
@@ -175,6 +177,7 @@ async def update_table_data(key: str, data: TableDataUpdate, db: Session = Depen
         db.add(row)
 
     table.row_count = len(data.data)
+    mark_table_changed(table)
 
     db.commit()
     db.refresh(table)
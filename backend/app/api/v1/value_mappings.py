@@ -5,6 +5,7 @@ from typing import List
 from ...database import get_db
 from ...models import ValueMapping
 from ...schemas import ValueMappingCreate, ValueMappingUpdate, ValueMappingResponse
+from ...services.value_mapping_cache import get_value_mapping_cache
 
 router = APIRouter(prefix="/value-mappings", tags=["Value Mappings"])
 
@@ -39,6 +40,8 @@ async def create_value_mapping(
     db.add(mapping)
     db.commit()
     db.refresh(mapping)
+    # The id may have been looked up (and missed) before, e.g. after a delete
+    get_value_mapping_cache().invalidate(mapping.id)
     return mapping
 
 
@@ -62,6 +65,7 @@ async def update_value_mapping(
 
     db.commit()
     db.refresh(mapping)
+    get_value_mapping_cache().invalidate(mapping.id)
     return mapping
 
 
@@ -73,28 +77,27 @@ async def delete_value_mapping(id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Value mapping not found")
     db.delete(mapping)
     db.commit()
+    get_value_mapping_cache().invalidate(id)
     return None
 
 
 @router.post("/{id}/apply")
 async def apply_mapping(id: int, value: str, db: Session = Depends(get_db)):
     """Apply mapping to transform a single value"""
-    mapping = db.query(ValueMapping).filter(ValueMapping.id == id).first()
+    mapping = get_value_mapping_cache().get(db, id)
     if not mapping:
         raise HTTPException(status_code=404, detail="Value mapping not found")
 
-    transformed = mapping.mappings.get(value, value)
+    transformed = mapping.forward.get(value, value)
     return {"original": value, "transformed": transformed}
 
 
 @router.post("/{id}/reverse")
 async def reverse_mapping(id: int, value: str, db: Session = Depends(get_db)):
     """Reverse lookup in mapping"""
-    mapping = db.query(ValueMapping).filter(ValueMapping.id == id).first()
+    mapping = get_value_mapping_cache().get(db, id)
     if not mapping:
         raise HTTPException(status_code=404, detail="Value mapping not found")
 
-    # Reverse lookup
-    reverse_map = {v: k for k, v in mapping.mappings.items()}
-    original = reverse_map.get(value, value)
+    original = mapping.reverse.get(value, value)
     return {"transformed": value, "original": original}
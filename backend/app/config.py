@@ -18,8 +18,43 @@ class Settings(BaseSettings):
     # Execution Limits
     PYTHON_EXECUTION_TIMEOUT: int = 30
     PYTHON_MAX_OUTPUT_SIZE: int = 1024 * 1024
+    PYTHON_WORKER_POOL_SIZE: int = 4  # 0 runs scripts in the API process
+    PYTHON_MEMORY_LIMIT_MB: int = 4096  # worker address space, incl. mapped tables; 0 = no limit
+    PYTHON_CPU_LIMIT_SECONDS: int = 0  # CPU time per script on a worker; 0 = no limit
+    PYTHON_SHARED_TABLES: bool = True  # hand tables to workers as shared Arrow files (needs pyarrow)
+    PYTHON_SHARED_TABLES_DIR: Optional[str] = None  # defaults to a per-process dir in /dev/shm
+    PYTHON_SHARED_TABLES_MAX_MB: int = 256  # published table files kept, oldest removed first
+    PYTHON_CODE_CACHE_SIZE: int = 256  # compiled scripts kept per process
+    PYTHON_RESULT_CACHE_SIZE: int = 128  # memoized results of deterministic scripts
+    PYTHON_RESULT_STORE_SIZE: int = 32  # full results kept for paging
+    PYTHON_RESULT_PAGE_SIZE: int = 1000  # rows returned inline with an execution
+    PYTHON_STREAM_BUFFER_EVENTS: int = 1000  # output/progress events buffered per stream
+    PYTHON_STREAM_KEEPALIVE_SECONDS: int = 15
     SQL_MAX_ROWS: int = 10000
     SQL_TIMEOUT: int = 30
+    SQL_ENGINE: str = "sqlite"  # "sqlite" | "duckdb"
+    SQL_SHARED_WORKSPACE: bool = True
+    SQL_WORKSPACE_PATH: Optional[str] = None  # defaults to a per-process temp file
+    SQL_READER_POOL_SIZE: int = 8
+    SQL_STATEMENT_CACHE_SIZE: int = 256  # prepared statements kept per reader connection
+    SQL_WORKSPACE_MMAP_SIZE: int = 256 * 1024 * 1024
+
+    # Matching
+    MATCH_ENGINE: str = "vectorized"  # "vectorized" | "parallel" | "external" (spills to disk) | "legacy"
+    MATCH_WORKERS: int = 0  # processes of the "parallel" match engine (0: one per CPU)
+    MATCH_PARALLEL_MIN_ROWS: int = 100000  # smaller matches run in-process even with the "parallel" engine
+    MATCH_MEMORY_BUDGET_MB: int = 512  # working set of one partition with the "external" engine
+    MATCH_CHUNK_ROWS: int = 50000  # rows read from the database at a time by the "external" engine
+    MATCH_SPILL_DIR: Optional[str] = None  # spill files of the "external" engine; defaults to the temp dir
+    MATCH_FUZZY_THRESHOLD: float = 0.85  # default minimum similarity of fuzzy match columns
+    MATCH_AGGREGATE_MAX_SIZE: int = 5  # default most target rows netted into one source row
+    MATCH_AGGREGATE_MAX_STEPS: int = 20000  # subset-sum search steps per source row
+    MATCH_AGGREGATE_TIME_LIMIT: float = 60.0  # seconds of subset-sum search per match run
+    MATCH_DIAGNOSTICS_TOP_KEYS: int = 10  # largest key groups listed per pass by match diagnostics
+    VALUE_MAPPING_CACHE_SIZE: int = 64  # value mappings kept per process, rechecked against updated_at
+
+    # Bulk table writes (SQL/Python results saved as tables)
+    BULK_INSERT_BATCH_SIZE: int = 5000
 
     class Config:
         env_file = ".env"
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect, text
 from sqlalchemy.orm import sessionmaker, Session
 from typing import Generator
 
@@ -20,6 +20,23 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Columns added to tables that existing databases already have: (table, column,
+# SQL default or None). create_all creates only missing tables, so init_db adds
+# these; the defaults match the models, so existing rows read as before.
+ADDED_COLUMNS = [
+    ("match_configs", "match_mode", "'one_to_one'"),
+    ("match_configs", "aggregate_max_size", None),
+    ("match_columns", "match_type", "'exact'"),
+    ("match_columns", "tolerance_type", None),
+    ("match_columns", "tolerance", None),
+    ("match_columns", "fuzzy_threshold", None),
+    ("match_columns", "pass_index", "0"),
+    ("match_results", "source_updated_at", None),
+    ("match_results", "target_updated_at", None),
+    ("match_result_rows", "pass_index", None),
+    ("match_result_rows", "row_hash", None),
+]
+
 
 def get_db() -> Generator[Session, None, None]:
     """Dependency for getting database session"""
@@ -34,3 +51,20 @@ def init_db() -> None:
     """Initialize database tables"""
     from .models.base import Base
     Base.metadata.create_all(bind=engine)
+    _add_missing_columns(Base.metadata)
+
+
+def _add_missing_columns(metadata) -> None:
+    """Add the ADDED_COLUMNS an existing database does not have yet"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table_name, column_name, default in ADDED_COLUMNS:
+            if not inspector.has_table(table_name):
+                continue
+            if column_name in {c["name"] for c in inspector.get_columns(table_name)}:
+                continue
+            column = metadata.tables[table_name].columns[column_name]
+            ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+            if default is not None:
+                ddl += f" DEFAULT {default}"
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
@@ -4,6 +4,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
 from .database import init_db
 from .api.router import api_router
+from .services.sql_workspace import close_workspace
+from .services.python_worker_pool import get_worker_pool, close_worker_pool
+from .services.python_shared_tables import close_shared_table_store
+from .services.matching_parallel import close_parallel_matcher
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -26,6 +30,17 @@ app.include_router(api_router, prefix=settings.API_V1_PREFIX)
 @app.on_event("startup")
 async def startup_event():
     init_db()
+    if settings.PYTHON_WORKER_POOL_SIZE > 0:
+        # Start workers now so the first script doesn't pay for interpreter start-up
+        get_worker_pool()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    close_workspace()
+    close_worker_pool()
+    close_shared_table_store()
+    close_parallel_matcher()
 
 
 @app.get("/health")
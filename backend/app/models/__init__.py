@@ -1,7 +1,7 @@
 from .base import Base, TimestampMixin
 from .table import Table, TableColumn, TableRow
 from .relationship import TableRelationship, ValueMapping
-from .matching import MatchConfig, MatchColumn, MatchResult
+from .matching import MatchConfig, MatchColumn, MatchResult, MatchResultRow, MatchState
 from .process import SavedProcess, ProcessChain, ProcessChainStep
 
 __all__ = [
@@ -15,6 +15,8 @@ __all__ = [
     "MatchConfig",
     "MatchColumn",
     "MatchResult",
+    "MatchResultRow",
+    "MatchState",
     "SavedProcess",
     "ProcessChain",
     "ProcessChainStep",
@@ -1,5 +1,5 @@
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, Boolean, Float, ForeignKey, Index, JSON, LargeBinary
+from sqlalchemy.orm import deferred, relationship
 from .base import Base, TimestampMixin
 
 
@@ -11,10 +11,13 @@ class MatchConfig(Base, TimestampMixin):
     name = Column(String(255), nullable=False)
     source_table_id = Column(Integer, ForeignKey("tables.id", ondelete="CASCADE"), nullable=False)
     target_table_id = Column(Integer, ForeignKey("tables.id", ondelete="CASCADE"), nullable=False)
+    match_mode = Column(String(20), default="one_to_one")  # "one_to_one" | "aggregate"
+    aggregate_max_size = Column(Integer, nullable=True)  # most targets per source row, defaults to MATCH_AGGREGATE_MAX_SIZE
 
     # Relationships
     match_columns = relationship("MatchColumn", back_populates="config", cascade="all, delete-orphan")
     results = relationship("MatchResult", back_populates="config", cascade="all, delete-orphan", order_by="MatchResult.created_at.desc()")
+    state = relationship("MatchState", back_populates="config", cascade="all, delete-orphan", uselist=False)
 
 
 class MatchColumn(Base):
@@ -27,6 +30,11 @@ class MatchColumn(Base):
     target_column = Column(String(255), nullable=False)
     value_mapping_id = Column(Integer, ForeignKey("value_mappings.id", ondelete="SET NULL"), nullable=True)
     case_sensitive = Column(Boolean, default=False)
+    match_type = Column(String(20), default="exact")  # "exact" | "tolerance" | "fuzzy"
+    tolerance_type = Column(String(20), nullable=True)  # "absolute" | "percent" | "days"
+    tolerance = Column(Float, nullable=True)
+    fuzzy_threshold = Column(Float, nullable=True)  # minimum similarity, defaults to MATCH_FUZZY_THRESHOLD
+    pass_index = Column(Integer, default=0)  # waterfall pass the column belongs to
 
     config = relationship("MatchConfig", back_populates="match_columns")
 
@@ -40,8 +48,42 @@ class MatchResult(Base, TimestampMixin):
     matched_count = Column(Integer, nullable=False)
     unmatched_source_count = Column(Integer, nullable=False)
     unmatched_target_count = Column(Integer, nullable=False)
-    matched_pairs = Column(JSON, nullable=False)
-    unmatched_source = Column(JSON, nullable=False)
-    unmatched_target = Column(JSON, nullable=False)
+    # Rows of results stored before match_result_rows; new results leave them empty
+    matched_pairs = deferred(Column(JSON, nullable=False))
+    unmatched_source = deferred(Column(JSON, nullable=False))
+    unmatched_target = deferred(Column(JSON, nullable=False))
+    source_updated_at = Column(DateTime, nullable=True)  # table versions the row indexes refer to
+    target_updated_at = Column(DateTime, nullable=True)
 
     config = relationship("MatchConfig", back_populates="results")
+
+
+class MatchResultRow(Base):
+    """A matched pair or unmatched row of a MatchResult, by row index"""
+    __tablename__ = "match_result_rows"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    result_id = Column(Integer, ForeignKey("match_results.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String(20), nullable=False)  # "matched" | "unmatched_source" | "unmatched_target"
+    position = Column(Integer, nullable=False)  # order within its kind, as matched
+    source_row_index = Column(Integer, nullable=True)
+    target_row_index = Column(Integer, nullable=True)
+    score = Column(Float, nullable=True)
+    pass_index = Column(Integer, nullable=True)  # pass that matched the pair, with several passes
+    row_hash = Column(BigInteger, nullable=True)  # content hash of an unmatched row, to diff results
+
+    __table_args__ = (
+        Index('ix_match_result_rows_result_kind', 'result_id', 'kind', 'position'),
+    )
+
+
+class MatchState(Base, TimestampMixin):
+    """Row fingerprints and pairs of a config's last incremental run"""
+    __tablename__ = "match_states"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    config_id = Column(Integer, ForeignKey("match_configs.id", ondelete="CASCADE"), nullable=False, unique=True)
+    digest = Column(String(64), nullable=False)  # config, rules and mappings the state was built with
+    data = Column(LargeBinary, nullable=False)  # packed IncrementalState
+
+    config = relationship("MatchConfig", back_populates="state")
@@ -11,7 +11,7 @@ class Table(Base, TimestampMixin):
     key = Column(String(255), unique=True, nullable=False, index=True)
     name = Column(String(255), nullable=False)
     category = Column(String(100), nullable=True)
-    source_type = Column(String(50), nullable=False)  # "master" | "imported"
+    source_type = Column(String(50), nullable=False)  # "master" | "imported" | "derived"
     file_name = Column(String(255), nullable=True)
     sheet_name = Column(String(255), nullable=True)
     row_count = Column(Integer, default=0)
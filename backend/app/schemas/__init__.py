@@ -8,14 +8,15 @@ from .relationship import (
 )
 from .matching import (
     MatchColumnCreate, MatchColumnResponse, MatchConfigCreate, MatchConfigUpdate, MatchConfigResponse,
-    MatchResultResponse, MatchExecuteRequest, MatchedPair, UnmatchedRow
+    MatchResultResponse, MatchResultSummary, MatchResultRowsPage, MatchExecuteRequest, MatchedPair, UnmatchedRow,
+    MatchDiagnostics, MatchPassDiagnostics, MatchSideKeyStats, MatchKeyCount, MatchBreakCounts, MatchBreakRow, MatchResultDiff
 )
 from .process import (
     SavedProcessCreate, SavedProcessUpdate, SavedProcessResponse,
     ProcessChainCreate, ProcessChainResponse, ProcessChainStepResponse
 )
 from .execution import (
-    SqlExecuteRequest, SqlExecuteResponse,
+    SqlParameters, SqlExecuteRequest, SqlSavedQueryExecuteRequest, SqlExecuteResponse, SqlProfile, SqlTableProfile, SqlQueryPlanStep,
     PythonExecuteRequest, PythonExecuteResponse,
     ExportRequest
 )
@@ -26,10 +27,12 @@ __all__ = [
     "TableRelationshipCreate", "TableRelationshipUpdate", "TableRelationshipResponse",
     "ValueMappingCreate", "ValueMappingUpdate", "ValueMappingResponse",
     "MatchColumnCreate", "MatchColumnResponse", "MatchConfigCreate", "MatchConfigUpdate", "MatchConfigResponse",
-    "MatchResultResponse", "MatchExecuteRequest", "MatchedPair", "UnmatchedRow",
+    "MatchResultResponse", "MatchResultSummary", "MatchResultRowsPage", "MatchExecuteRequest", "MatchedPair",
+    "UnmatchedRow", "MatchDiagnostics", "MatchPassDiagnostics", "MatchSideKeyStats", "MatchKeyCount",
+    "MatchBreakCounts", "MatchBreakRow", "MatchResultDiff",
     "SavedProcessCreate", "SavedProcessUpdate", "SavedProcessResponse",
     "ProcessChainCreate", "ProcessChainResponse", "ProcessChainStepResponse",
-    "SqlExecuteRequest", "SqlExecuteResponse",
+    "SqlParameters", "SqlExecuteRequest", "SqlSavedQueryExecuteRequest", "SqlExecuteResponse", "SqlProfile", "SqlTableProfile", "SqlQueryPlanStep",
     "PythonExecuteRequest", "PythonExecuteResponse",
     "ExportRequest",
 ]
@@ -1,12 +1,52 @@
 from pydantic import BaseModel
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Union
 
 
 # ============ SQL Execution ============
 
+# Positional (?) or named (:name) query bindings
+SqlParameters = Union[List[Any], Dict[str, Any]]
+
+
 class SqlExecuteRequest(BaseModel):
     query: str
     table_keys: Optional[List[str]] = None
+    parameters: Optional[SqlParameters] = None
+    profile: bool = False
+    engine: Optional[str] = None  # "sqlite" | "duckdb", defaults to settings.SQL_ENGINE
+    # Materialise the full result into this app table instead of only displaying it
+    target_table_key: Optional[str] = None
+    target_table_name: Optional[str] = None
+    replace_target: bool = False
+
+
+class SqlSavedQueryExecuteRequest(BaseModel):
+    parameters: Optional[SqlParameters] = None  # overrides the saved defaults
+    profile: bool = False
+
+
+class SqlTableProfile(BaseModel):
+    table_key: str
+    rows_loaded: int
+    rows_scanned: int  # rows_loaded x full-scan steps in the query plan
+
+
+class SqlQueryPlanStep(BaseModel):
+    id: int
+    parent: int
+    detail: str
+
+
+class SqlProfile(BaseModel):
+    resolve_ms: float
+    load_ms: float
+    execute_ms: float
+    fetch_ms: float
+    serialize_ms: float
+    save_ms: float = 0.0
+    total_ms: float
+    tables: List[SqlTableProfile] = []
+    query_plan: List[SqlQueryPlanStep] = []
 
 
 class SqlExecuteResponse(BaseModel):
@@ -15,6 +55,9 @@ class SqlExecuteResponse(BaseModel):
     row_count: int
     execution_time_ms: int
     error: Optional[str] = None
+    profile: Optional[SqlProfile] = None
+    saved_table_key: Optional[str] = None
+    saved_row_count: Optional[int] = None
 
 
 # ============ Python Execution ============
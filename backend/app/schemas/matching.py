@@ -10,6 +10,11 @@ class MatchColumnCreate(BaseModel):
     target_column: str
     value_mapping_id: Optional[int] = None
     case_sensitive: bool = False
+    match_type: str = "exact"  # "exact" | "tolerance" | "fuzzy"
+    tolerance_type: Optional[str] = None  # "absolute" | "percent" (of the source value) | "days"
+    tolerance: Optional[float] = None
+    fuzzy_threshold: Optional[float] = None  # 0-1 similarity; defaults to MATCH_FUZZY_THRESHOLD
+    pass_index: int = 0  # waterfall pass; later passes only see rows earlier passes left unmatched
 
 
 class MatchColumnResponse(BaseModel):
@@ -18,6 +23,11 @@ class MatchColumnResponse(BaseModel):
     target_column: str
     value_mapping_id: Optional[int]
     case_sensitive: bool
+    match_type: str = "exact"
+    tolerance_type: Optional[str] = None
+    tolerance: Optional[float] = None
+    fuzzy_threshold: Optional[float] = None
+    pass_index: int = 0
 
     class Config:
         from_attributes = True
@@ -28,11 +38,15 @@ class MatchConfigCreate(BaseModel):
     source_table_key: str
     target_table_key: str
     match_columns: List[MatchColumnCreate]
+    match_mode: str = "one_to_one"  # "one_to_one" | "aggregate" (one source row to the sum of several targets)
+    aggregate_max_size: Optional[int] = None  # defaults to MATCH_AGGREGATE_MAX_SIZE
 
 
 class MatchConfigUpdate(BaseModel):
     name: Optional[str] = None
     match_columns: Optional[List[MatchColumnCreate]] = None
+    match_mode: Optional[str] = None
+    aggregate_max_size: Optional[int] = None
 
 
 class MatchConfigResponse(BaseModel):
@@ -41,6 +55,8 @@ class MatchConfigResponse(BaseModel):
     source_table_key: str
     target_table_key: str
     match_columns: List[MatchColumnResponse]
+    match_mode: str = "one_to_one"
+    aggregate_max_size: Optional[int] = None
     created_at: datetime
 
     class Config:
@@ -54,6 +70,8 @@ class MatchedPair(BaseModel):
     target_row_index: int
     source_row: List[str]
     target_row: List[str]
+    score: Optional[float] = None  # similarity, for configs with fuzzy columns
+    pass_index: Optional[int] = None  # pass that matched the pair, for configs with several passes
 
 
 class UnmatchedRow(BaseModel):
@@ -61,6 +79,43 @@ class UnmatchedRow(BaseModel):
     row: List[str]
 
 
+class MatchKeyCount(BaseModel):
+    key: str  # normalized exact columns, joined by "|"
+    source_rows: int
+    target_rows: int
+
+
+class MatchSideKeyStats(BaseModel):
+    rows: int
+    distinct_keys: int
+    duplicate_keys: int  # keys of more than one row
+    duplicate_rows: int  # rows with those keys
+    largest_group: int
+    blank_key_rows: int  # rows with a blank or missing cell in an exact column
+    colliding_keys: int  # keys made from different cells (case, whitespace, value mapping, "|" in a cell)
+
+
+class MatchPassDiagnostics(BaseModel):
+    pass_index: int
+    source: MatchSideKeyStats
+    target: MatchSideKeyStats
+    shared_keys: int
+    candidate_pairs: int  # source x target rows, summed over keys; what tolerance/fuzzy matching compares
+    top_keys: List[MatchKeyCount]  # largest candidate groups first
+
+
+class MatchDiagnostics(BaseModel):
+    load_ms: float
+    key_build_ms: float
+    join_ms: float
+    rows_ms: float  # building the result rows
+    persist_ms: float
+    diagnostics_ms: float  # computing these statistics
+    total_ms: float
+    peak_rss_bytes: Optional[int] = None  # of the server process
+    passes: List[MatchPassDiagnostics]
+
+
 class MatchResultResponse(BaseModel):
     id: int
     config_id: int
@@ -73,11 +128,67 @@ class MatchResultResponse(BaseModel):
     matched_pairs: List[MatchedPair]
     unmatched_source: List[UnmatchedRow]
     unmatched_target: List[UnmatchedRow]
+    rows_included: bool = True  # false: the row lists are empty, page them from /results/{id}/rows
     created_at: datetime
+    diagnostics: Optional[MatchDiagnostics] = None  # only from execute with diagnostics
 
     class Config:
         from_attributes = True
 
 
+class MatchResultSummary(BaseModel):
+    id: int
+    config_id: int
+    config_name: str
+    source_table_key: str
+    target_table_key: str
+    matched_count: int
+    unmatched_source_count: int
+    unmatched_target_count: int
+    stale: bool = False  # a table changed since the run, so its rows now read differently
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class MatchResultRowsPage(BaseModel):
+    result_id: int
+    kind: str  # "matched" | "unmatched_source" | "unmatched_target"
+    total: int  # rows of this kind after filtering
+    offset: int
+    limit: int
+    matched_pairs: Optional[List[MatchedPair]] = None  # kind "matched"
+    unmatched_rows: Optional[List[UnmatchedRow]] = None  # the unmatched kinds
+
+
+class MatchBreakCounts(BaseModel):
+    new: int  # unmatched in the result, not in the base
+    resolved: int  # unmatched in the base, not in the result
+    persistent: int  # unmatched in both
+
+
+class MatchBreakRow(BaseModel):
+    row_index: int
+    row: Optional[List[str]]  # None when the table no longer holds the row at row_index
+
+
+class MatchResultDiff(BaseModel):
+    result_id: int
+    base_result_id: int
+    source: MatchBreakCounts
+    target: MatchBreakCounts
+    side: str  # "source" | "target"
+    category: str  # "new" | "resolved" | "persistent"
+    total: int  # breaks of this side and category
+    offset: int
+    limit: int
+    rows: List[MatchBreakRow]  # row indexes of the base for resolved breaks, of the result otherwise
+    stale: bool  # a table changed since one of the runs, so rows read now may differ
+
+
 class MatchExecuteRequest(BaseModel):
     config_id: int
+    engine: Optional[str] = None  # "vectorized" | "parallel" | "external" | "legacy"; defaults to MATCH_ENGINE
+    incremental: bool = False  # re-match only rows changed since the config's last incremental run
+    diagnostics: bool = False  # add key distribution, phase timings and peak memory to the response
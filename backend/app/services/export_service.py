@@ -7,6 +7,7 @@ from openpyxl.utils import get_column_letter
 from sqlalchemy.orm import Session
 
 from ..models import Table, TableColumn, TableRow, MatchResult
+from .match_results import result_detail
 
 
 class ExportService:
@@ -99,6 +100,7 @@ class ExportService:
         result = self.db.query(MatchResult).filter(MatchResult.id == result_id).first()
         if not result:
             raise ValueError(f"Match result {result_id} not found")
+        matched_pairs, unmatched_source, unmatched_target = result_detail(self.db, result)
 
         wb = Workbook()
         # Remove default sheet
@@ -115,53 +117,65 @@ class ExportService:
         ws_summary.append(["Created At", str(result.created_at)])
 
         # Matched pairs sheet
-        if include_matched and result.matched_pairs:
+        if include_matched and matched_pairs:
             ws_matched = wb.create_sheet(title="Matched Pairs")
 
             # Get max columns from data
-            if result.matched_pairs:
-                sample = result.matched_pairs[0]
+            if matched_pairs:
+                sample = matched_pairs[0]
                 source_cols = len(sample.get("source_row", []))
                 target_cols = len(sample.get("target_row", []))
 
+                # Pairs of a multi-pass run carry a score only from fuzzy passes
+                has_score = any("score" in pair for pair in matched_pairs)
+                has_pass = "pass_index" in sample
+
                 # Headers
                 headers = ["Source Row #"] + [f"Source Col {i+1}" for i in range(source_cols)]
                 headers += ["Target Row #"] + [f"Target Col {i+1}" for i in range(target_cols)]
+                if has_score:
+                    headers.append("Score")
+                if has_pass:
+                    headers.append("Pass")
                 ws_matched.append(headers)
 
                 # Data
-                for pair in result.matched_pairs:
+                for pair in matched_pairs:
                     row = [pair["source_row_index"]] + pair["source_row"]
                     row += [pair["target_row_index"]] + pair["target_row"]
+                    if has_score:
+                        row.append(pair.get("score"))
+                    if has_pass:
+                        row.append(pair.get("pass_index"))
                     ws_matched.append(row)
 
         # Unmatched source sheet
-        if include_unmatched and result.unmatched_source:
+        if include_unmatched and unmatched_source:
             ws_unmatched_src = wb.create_sheet(title="Unmatched Source")
 
-            if result.unmatched_source:
-                sample = result.unmatched_source[0]
+            if unmatched_source:
+                sample = unmatched_source[0]
                 cols = len(sample.get("row", []))
 
                 headers = ["Row #"] + [f"Column {i+1}" for i in range(cols)]
                 ws_unmatched_src.append(headers)
 
-                for item in result.unmatched_source:
+                for item in unmatched_source:
                     row = [item["row_index"]] + item["row"]
                     ws_unmatched_src.append(row)
 
         # Unmatched target sheet
-        if include_unmatched and result.unmatched_target:
+        if include_unmatched and unmatched_target:
             ws_unmatched_tgt = wb.create_sheet(title="Unmatched Target")
 
-            if result.unmatched_target:
-                sample = result.unmatched_target[0]
+            if unmatched_target:
+                sample = unmatched_target[0]
                 cols = len(sample.get("row", []))
 
                 headers = ["Row #"] + [f"Column {i+1}" for i in range(cols)]
                 ws_unmatched_tgt.append(headers)
 
-                for item in result.unmatched_target:
+                for item in unmatched_target:
                     row = [item["row_index"]] + item["row"]
                     ws_unmatched_tgt.append(row)
 
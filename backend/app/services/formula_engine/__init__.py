@@ -1,6 +1,8 @@
 """
 Excel Formula Engine - combines all formula mixins into a single class.
 """
+from typing import Optional
+
 from .base import BaseFormulaMixin
 from .conditional import ConditionalFormulaMixin
 from .logic import LogicFormulaMixin
@@ -10,6 +12,7 @@ from .pnl import PnLFormulaMixin
 from .settlement import SettlementFormulaMixin
 from .reconciliation import ReconciliationFormulaMixin
 from .fx import FXFormulaMixin
+from .mapping import MappingFormulaMixin, MappingLoader, MappingRef, ValueLookup
 
 
 class ExcelFormulaEngine(
@@ -21,7 +24,8 @@ class ExcelFormulaEngine(
     PnLFormulaMixin,
     SettlementFormulaMixin,
     ReconciliationFormulaMixin,
-    FXFormulaMixin
+    FXFormulaMixin,
+    MappingFormulaMixin
 ):
     """
     Excel formula evaluation engine combining all formula functions.
@@ -37,11 +41,16 @@ class ExcelFormulaEngine(
     - Settlement: Settlement dates, accrued interest, day count
     - Reconciliation: Variance, matching, break detection
     - FX: Currency conversion, cross rates, FX gain/loss
+    - Mapping: Value mapping lookups, forward and reverse
+
+    mapping_loader resolves value mappings by id or name; without one the
+    mapping functions are unavailable.
     """
 
-    def __init__(self):
+    def __init__(self, mapping_loader: Optional[MappingLoader] = None):
         # Initialize base mixin which handles pycel availability
         BaseFormulaMixin.__init__(self)
+        MappingFormulaMixin.__init__(self, mapping_loader)
 
 
-__all__ = ['ExcelFormulaEngine']
+__all__ = ['ExcelFormulaEngine', 'MappingLoader', 'MappingRef', 'ValueLookup']
@@ -0,0 +1,65 @@
+"""
+Value mapping functions - look values up in the app's value mappings.
+
+The engine does not load mappings itself: whoever creates it passes a loader
+that hands over each mapping's dicts, so this module stays free of the
+database layer.
+"""
+from typing import Any, Callable, Dict, NamedTuple, Optional, Union
+
+import pandas as pd
+
+
+MappingRef = Union[int, str]  # mapping id, or mapping name
+
+
+class ValueLookup(NamedTuple):
+    """A value mapping's dicts. Treat them as read-only; they may be shared."""
+    forward: Dict[str, str]   # source value -> target value
+    reverse: Dict[str, str]   # target value -> source value
+
+
+# Resolves a mapping id or name; None if there is no such mapping
+MappingLoader = Callable[[MappingRef], Optional[ValueLookup]]
+
+
+class MappingFormulaMixin:
+    """Mixin with value mapping functions (mappings by id or name)."""
+
+    def __init__(self, mapping_loader: Optional[MappingLoader] = None):
+        self._mapping_loader = mapping_loader
+        self._mappings: Dict[MappingRef, ValueLookup] = {}
+
+    def _get_mapping(self, mapping: MappingRef) -> ValueLookup:
+        if mapping not in self._mappings:
+            if self._mapping_loader is None:
+                raise RuntimeError("Value mappings are not available here")
+            loaded = self._mapping_loader(mapping)
+            if loaded is None:
+                raise KeyError(f"Value mapping not found: {mapping!r}")
+            self._mappings[mapping] = loaded
+        return self._mappings[mapping]
+
+    def map_value(self, mapping: MappingRef, value: Any) -> Any:
+        """Map a value through a value mapping (unmapped values pass through)."""
+        return self._get_mapping(mapping).forward.get(value, value)
+
+    def reverse_map_value(self, mapping: MappingRef, value: Any) -> Any:
+        """Reverse lookup of a mapped value."""
+        return self._get_mapping(mapping).reverse.get(value, value)
+
+    def map_column(self, df: pd.DataFrame, column: str, mapping: MappingRef,
+                   new_column: Optional[str] = None) -> pd.DataFrame:
+        """Map a column through a value mapping, in place or into new_column."""
+        forward = self._get_mapping(mapping).forward
+        df = df.copy()
+        df[new_column or column] = [forward.get(v, v) for v in df[column]]
+        return df
+
+    def reverse_map_column(self, df: pd.DataFrame, column: str, mapping: MappingRef,
+                           new_column: Optional[str] = None) -> pd.DataFrame:
+        """Reverse-map a column, in place or into new_column."""
+        reverse = self._get_mapping(mapping).reverse
+        df = df.copy()
+        df[new_column or column] = [reverse.get(v, v) for v in df[column]]
+        return df
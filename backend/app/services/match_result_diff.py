@@ -0,0 +1,137 @@
+"""
+Match Result Diff - breaks that are new, resolved or persistent between two runs.
+
+A break is an unmatched source or target row. Reruns reload the tables, so
+row indexes change between runs and breaks are recognised by content instead:
+the hash stored with each unmatched row (match_results.row_hashes). Equal
+rows are told apart by occurrence, so two identical breaks in the base run
+and one in the newer run are one persistent and one resolved break.
+
+Break rows are read from the tables by row index, so a table rewritten since
+the run may hold a different row there; a row whose hash differs from the
+stored one is returned as None rather than as the wrong row. Results stored
+before row hashes are hashed from the rows their tables hold now, which is
+right only while the result is not stale.
+"""
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from ..models import MatchResult, MatchResultRow
+from .match_results import ResultRowLoader, has_json_rows, row_hashes
+from .matching_engine import occurrences
+
+
+DIFF_CATEGORIES = ("new", "resolved", "persistent")
+DIFF_SIDES = ("source", "target")
+
+
+class _Breaks(NamedTuple):
+    """Unmatched rows of one side of a result, in result order."""
+    row_indices: np.ndarray
+    hashes: np.ndarray
+    rows: Optional[List[List[str]]]  # only for results kept in JSON columns
+
+
+def _table_id(result: MatchResult, side: str) -> Optional[int]:
+    config = result.config
+    if config is None:
+        return None
+    return config.source_table_id if side == "source" else config.target_table_id
+
+
+def _breaks(db: Session, result: MatchResult, side: str, loader: ResultRowLoader) -> _Breaks:
+    if has_json_rows(result):
+        items = result.unmatched_source if side == "source" else result.unmatched_target
+        rows = [item["row"] for item in items]
+        return _Breaks(np.array([item["row_index"] for item in items], dtype=np.int64), row_hashes(rows), rows)
+
+    index_column = MatchResultRow.source_row_index if side == "source" else MatchResultRow.target_row_index
+    entries = (
+        db.query(index_column, MatchResultRow.row_hash)
+        .filter(MatchResultRow.result_id == result.id, MatchResultRow.kind == f"unmatched_{side}")
+        .order_by(MatchResultRow.position)
+        .all()
+    )
+    row_indices = np.array([row_index for row_index, _ in entries], dtype=np.int64)
+    hashes = np.array([row_hash or 0 for _, row_hash in entries], dtype=np.int64)
+    missing = [i for i, (_, row_hash) in enumerate(entries) if row_hash is None]
+    table_id = _table_id(result, side)
+    if missing and table_id is not None:
+        # Stored before row hashes: hash the rows as the table holds them now
+        indices = row_indices[missing].tolist()
+        found = loader.rows_at(table_id, indices)
+        hashes[missing] = row_hashes([found.get(i, []) for i in indices])
+    return _Breaks(row_indices, hashes, None)
+
+
+def _categories(base_hashes: np.ndarray, hashes: np.ndarray) -> Dict[str, np.ndarray]:
+    """Positions of each category's breaks: resolved ones in the base result, the others in the newer one."""
+    codes, _ = pd.factorize(np.concatenate([base_hashes, hashes]))
+    codes = codes.astype(np.int64)
+    base_codes, codes = codes[:len(base_hashes)], codes[len(base_hashes):]
+    # A break is its content plus how many equal breaks precede it
+    width = max(len(base_hashes), len(hashes)) + 1
+    base_ids = base_codes * width + occurrences(base_codes)
+    ids = codes * width + occurrences(codes)
+    persistent = np.isin(ids, base_ids)
+    return {
+        "new": np.flatnonzero(~persistent),
+        "resolved": np.flatnonzero(~np.isin(base_ids, ids)),
+        "persistent": np.flatnonzero(persistent),
+    }
+
+
+def result_diff(
+    db: Session,
+    result: MatchResult,
+    base: MatchResult,
+    side: str = "source",
+    category: str = "new",
+    offset: int = 0,
+    limit: int = 100
+) -> Tuple[Dict[str, Dict[str, int]], int, List[dict]]:
+    """
+    Break counts of both sides between a base result and a newer one of the
+    same config, and a page of one side's breaks of one category; raises
+    ValueError.
+
+    Returns the counts by side and category, the number of breaks in the
+    requested category and the page's rows (resolved breaks with the row
+    indexes of the base result, the others with those of the newer one; row
+    None where the table no longer holds the break at that index).
+    """
+    if side not in DIFF_SIDES:
+        raise ValueError(f"Unknown side '{side}'. Use one of: {', '.join(DIFF_SIDES)}")
+    if category not in DIFF_CATEGORIES:
+        raise ValueError(f"Unknown category '{category}'. Use one of: {', '.join(DIFF_CATEGORIES)}")
+    if result.config_id != base.config_id:
+        raise ValueError("Only results of the same match config can be compared")
+
+    loader = ResultRowLoader(db)
+    counts = {}
+    for diff_side in DIFF_SIDES:
+        base_breaks = _breaks(db, base, diff_side, loader)
+        breaks = _breaks(db, result, diff_side, loader)
+        categories = _categories(base_breaks.hashes, breaks.hashes)
+        counts[diff_side] = {name: len(positions) for name, positions in categories.items()}
+        if diff_side == side:
+            chosen = base_breaks if category == "resolved" else breaks
+            positions = categories[category]
+
+    page = positions[offset:offset + limit]
+    indices = chosen.row_indices[page].tolist()
+    if chosen.rows is not None:
+        rows = [chosen.rows[p] for p in page.tolist()]
+    else:
+        table_id = _table_id(result, side)
+        found = loader.rows_at(table_id, indices) if table_id is not None else {}
+        rows = [found.get(i) for i in indices]
+        current = row_hashes([row or [] for row in rows])
+        rows = [
+            row if row is not None and current_hash == stored_hash else None
+            for row, current_hash, stored_hash in zip(rows, current.tolist(), chosen.hashes[page].tolist())
+        ]
+    return counts, len(positions), [{"row_index": i, "row": row} for i, row in zip(indices, rows)]
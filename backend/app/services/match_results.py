@@ -0,0 +1,366 @@
+"""
+Match Results - storage and paged reading of match results.
+
+A result stores its matched pairs and unmatched rows as row indexes in
+match_result_rows, one row each, instead of copies of the rows. Row data is
+read from the source and target tables when a page is requested, so a
+result is current only while its tables are unchanged (see is_stale).
+Results stored before this layout keep their rows in MatchResult's JSON
+columns and are read from there.
+"""
+from itertools import islice
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import func, insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import MatchConfig, MatchResult, MatchResultRow, Table, TableRow
+from .table_store import fetch_indexed_rows
+
+
+RESULT_ROW_KINDS = ("matched", "unmatched_source", "unmatched_target")
+RESULT_ROW_SORTS = ("position", "source_row_index", "target_row_index", "score")
+
+# Row indexes looked up per query, below SQLite's bound parameter limit
+_ROW_LOOKUP_BATCH = 500
+
+
+def row_hashes(rows: List[List[str]]) -> np.ndarray:
+    """Content hash of each row, the same in every process, as int64 (a BigInteger column)."""
+    texts = np.array(["\x1f".join("" if cell is None else str(cell) for cell in row) for row in rows], dtype=object)
+    return pd.util.hash_array(texts, categorize=False).view(np.int64)
+
+
+class ResultRowLoader:
+    """Rows of the tables behind match results, by table id and row index; each table read once."""
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._tables: Dict[int, Dict[int, List[str]]] = {}
+
+    def add(self, table_id: int, rows: Dict[int, List[str]]) -> None:
+        """Use rows already in memory for a table instead of reading it."""
+        self._tables.setdefault(table_id, {}).update(rows)
+
+    def table(self, table_id: int) -> Dict[int, List[str]]:
+        """Every row of a table."""
+        if table_id not in self._tables:
+            table = self.db.query(Table).filter(Table.id == table_id).first()
+            indices, rows = fetch_indexed_rows(self.db, table) if table else ([], [])
+            self._tables[table_id] = dict(zip(indices, rows))
+        return self._tables[table_id]
+
+    def rows_at(self, table_id: int, row_indices: List[int]) -> Dict[int, List[str]]:
+        """Some rows of a table, read by index unless the table is already loaded."""
+        if table_id in self._tables:
+            return self._tables[table_id]
+        found = {}
+        wanted = sorted(set(row_indices))
+        for start in range(0, len(wanted), _ROW_LOOKUP_BATCH):
+            batch = wanted[start:start + _ROW_LOOKUP_BATCH]
+            found.update(
+                self.db.query(TableRow.row_index, TableRow.data)
+                .filter(TableRow.table_id == table_id, TableRow.row_index.in_(batch))
+            )
+        return found
+
+
+class IndexedRows(NamedTuple):
+    """Unmatched rows of one side as row indexes and content hashes (see row_hashes)."""
+    row_indices: np.ndarray
+    hashes: np.ndarray
+
+
+class IndexedPairs(NamedTuple):
+    """Matched pairs as source and target row indexes, with scores (NaN: none) if any."""
+    source_row_indices: np.ndarray
+    target_row_indices: np.ndarray
+    scores: Optional[np.ndarray]
+
+
+def save_match_result(
+    db: Session,
+    config: MatchConfig,
+    source_table: Table,
+    target_table: Table,
+    matched_pairs: List[dict],
+    unmatched_source: List[dict],
+    unmatched_target: List[dict]
+) -> MatchResult:
+    """Store a match run as row indexes, written in BULK_INSERT_BATCH_SIZE batches."""
+    def unmatched(items: List[dict]) -> IndexedRows:
+        row_indices = np.array([item["row_index"] for item in items], dtype=np.int64)
+        return IndexedRows(row_indices, row_hashes([item["row"] for item in items]))
+
+    def entries(result_id: int) -> Iterable[dict]:
+        for position, pair in enumerate(matched_pairs):
+            yield {
+                "result_id": result_id, "kind": "matched", "position": position,
+                "source_row_index": pair["source_row_index"], "target_row_index": pair["target_row_index"],
+                "score": pair.get("score"), "pass_index": pair.get("pass_index"), "row_hash": None,
+            }
+        yield from _unmatched_entries(result_id, "unmatched_source", unmatched(unmatched_source))
+        yield from _unmatched_entries(result_id, "unmatched_target", unmatched(unmatched_target))
+
+    counts = (len(matched_pairs), len(unmatched_source), len(unmatched_target))
+    return _insert_result(db, config, source_table, target_table, counts, entries)
+
+
+def save_indexed_match_result(
+    db: Session,
+    config: MatchConfig,
+    source_table: Table,
+    target_table: Table,
+    pairs: IndexedPairs,
+    unmatched_source: IndexedRows,
+    unmatched_target: IndexedRows
+) -> MatchResult:
+    """Store a match run given as row index arrays, never holding its rows in memory."""
+    def entries(result_id: int) -> Iterable[dict]:
+        scores = pairs.scores.tolist() if pairs.scores is not None else None
+        for position, (s, t) in enumerate(zip(pairs.source_row_indices.tolist(), pairs.target_row_indices.tolist())):
+            score = scores[position] if scores is not None else None
+            yield {
+                "result_id": result_id, "kind": "matched", "position": position,
+                "source_row_index": s, "target_row_index": t,
+                # NaN: a pair without a score
+                "score": round(score, 4) if score is not None and score == score else None,
+                "pass_index": None, "row_hash": None,
+            }
+        yield from _unmatched_entries(result_id, "unmatched_source", unmatched_source)
+        yield from _unmatched_entries(result_id, "unmatched_target", unmatched_target)
+
+    counts = (len(pairs.source_row_indices), len(unmatched_source.row_indices), len(unmatched_target.row_indices))
+    return _insert_result(db, config, source_table, target_table, counts, entries)
+
+
+def _unmatched_entries(result_id: int, kind: str, rows: IndexedRows) -> Iterable[dict]:
+    source = kind == "unmatched_source"
+    for position, (row_index, row_hash) in enumerate(zip(rows.row_indices.tolist(), rows.hashes.tolist())):
+        yield {
+            "result_id": result_id, "kind": kind, "position": position,
+            "source_row_index": row_index if source else None, "target_row_index": None if source else row_index,
+            "score": None, "pass_index": None, "row_hash": row_hash,
+        }
+
+
+def _insert_result(
+    db: Session,
+    config: MatchConfig,
+    source_table: Table,
+    target_table: Table,
+    counts: Tuple[int, int, int],
+    entries: Callable[[int], Iterable[dict]]
+) -> MatchResult:
+    matched_count, unmatched_source_count, unmatched_target_count = counts
+    result = MatchResult(
+        config_id=config.id,
+        matched_count=matched_count,
+        unmatched_source_count=unmatched_source_count,
+        unmatched_target_count=unmatched_target_count,
+        matched_pairs=[],
+        unmatched_source=[],
+        unmatched_target=[],
+        source_updated_at=source_table.updated_at,
+        target_updated_at=target_table.updated_at
+    )
+    db.add(result)
+    db.flush()
+
+    rows = iter(entries(result.id))
+    while True:
+        batch = list(islice(rows, settings.BULK_INSERT_BATCH_SIZE))
+        if not batch:
+            break
+        db.execute(insert(MatchResultRow), batch)
+
+    db.commit()
+    db.refresh(result)
+    return result
+
+
+def delete_match_result_rows(db: Session, result_ids: List[int]) -> None:
+    """Bulk-delete the stored rows of results (before deleting the results themselves)."""
+    if result_ids:
+        db.query(MatchResultRow).filter(MatchResultRow.result_id.in_(result_ids)).delete(synchronize_session=False)
+
+
+def has_json_rows(result: MatchResult) -> bool:
+    """Whether a result predates indexed storage and keeps its rows in JSON columns."""
+    return bool(result.matched_pairs or result.unmatched_source or result.unmatched_target)
+
+
+def is_stale(db: Session, result: MatchResult) -> bool:
+    """Whether a table of an indexed result changed since the run, so rows read now may differ."""
+    config = result.config
+    if config is None or result.source_updated_at is None:
+        return False
+    tables = dict(
+        db.query(Table.id, Table.updated_at).filter(Table.id.in_([config.source_table_id, config.target_table_id]))
+    )
+    return (
+        tables.get(config.source_table_id) != result.source_updated_at
+        or tables.get(config.target_table_id) != result.target_updated_at
+    )
+
+
+def _matched_pair(entry: MatchResultRow, source_rows: Dict[int, List[str]], target_rows: Dict[int, List[str]]) -> dict:
+    pair = {
+        "source_row_index": entry.source_row_index,
+        "target_row_index": entry.target_row_index,
+        "source_row": source_rows.get(entry.source_row_index, []),
+        "target_row": target_rows.get(entry.target_row_index, []),
+    }
+    if entry.score is not None:
+        pair["score"] = entry.score
+    if entry.pass_index is not None:
+        pair["pass_index"] = entry.pass_index
+    return pair
+
+
+def _unmatched_row(row_index: int, rows: Dict[int, List[str]]) -> dict:
+    return {"row_index": row_index, "row": rows.get(row_index, [])}
+
+
+def _kind_rows(
+    loader: ResultRowLoader,
+    config: Optional[MatchConfig],
+    kind: str,
+    entries: List[MatchResultRow],
+    whole_tables: bool = False
+) -> List[dict]:
+    """Entries of one kind as the dicts MatchResult's JSON columns held."""
+    source_id = config.source_table_id if config else None
+    target_id = config.target_table_id if config else None
+
+    def rows(table_id, indices):
+        if table_id is None:
+            return {}
+        return loader.table(table_id) if whole_tables else loader.rows_at(table_id, indices)
+
+    if kind == "matched":
+        source_rows = rows(source_id, [e.source_row_index for e in entries])
+        target_rows = rows(target_id, [e.target_row_index for e in entries])
+        return [_matched_pair(e, source_rows, target_rows) for e in entries]
+    if kind == "unmatched_source":
+        source_rows = rows(source_id, [e.source_row_index for e in entries])
+        return [_unmatched_row(e.source_row_index, source_rows) for e in entries]
+    target_rows = rows(target_id, [e.target_row_index for e in entries])
+    return [_unmatched_row(e.target_row_index, target_rows) for e in entries]
+
+
+def result_detail(
+    db: Session,
+    result: MatchResult,
+    loader: Optional[ResultRowLoader] = None
+) -> Tuple[List[dict], List[dict], List[dict]]:
+    """All matched pairs and unmatched rows of a result, with row data."""
+    if has_json_rows(result):
+        return result.matched_pairs, result.unmatched_source, result.unmatched_target
+
+    loader = loader or ResultRowLoader(db)
+    entries = {kind: [] for kind in RESULT_ROW_KINDS}
+    for entry in (
+        db.query(MatchResultRow)
+        .filter(MatchResultRow.result_id == result.id)
+        .order_by(MatchResultRow.kind, MatchResultRow.position)
+    ):
+        entries[entry.kind].append(entry)
+    return tuple(
+        _kind_rows(loader, result.config, kind, entries[kind], whole_tables=True) for kind in RESULT_ROW_KINDS
+    )
+
+
+def _json_rows(result: MatchResult, kind: str) -> List[dict]:
+    return {
+        "matched": result.matched_pairs,
+        "unmatched_source": result.unmatched_source,
+        "unmatched_target": result.unmatched_target,
+    }[kind]
+
+
+def _matches_search(item: dict, search: str) -> bool:
+    cells = (item.get("source_row") or []) + (item.get("target_row") or []) + (item.get("row") or [])
+    return any(search in str(cell).lower() for cell in cells)
+
+
+def _sort_value(item: dict, kind: str, sort: str):
+    if sort == "score":
+        return item.get("score") if item.get("score") is not None else -1.0
+    if kind == "matched":
+        return item[sort]
+    return item["row_index"]
+
+
+def result_page(
+    db: Session,
+    result: MatchResult,
+    kind: str,
+    offset: int = 0,
+    limit: int = 100,
+    sort: str = "position",
+    descending: bool = False,
+    min_score: Optional[float] = None,
+    max_score: Optional[float] = None,
+    search: Optional[str] = None,
+    pass_index: Optional[int] = None
+) -> Tuple[int, List[dict]]:
+    """
+    A page of one kind of a result's rows and the number of rows after filtering; raises ValueError.
+
+    Indexed results are filtered, sorted and paged in the database and only
+    the page's rows are read from the tables, except with search (a
+    case-insensitive substring of any cell), which reads the tables whole.
+    pass_index keeps the matched pairs of one pass of a multi-pass config.
+    """
+    if kind not in RESULT_ROW_KINDS:
+        raise ValueError(f"Unknown kind '{kind}'. Use one of: {', '.join(RESULT_ROW_KINDS)}")
+    if sort not in RESULT_ROW_SORTS:
+        raise ValueError(f"Unknown sort '{sort}'. Use one of: {', '.join(RESULT_ROW_SORTS)}")
+    allowed = {
+        "matched": RESULT_ROW_SORTS,
+        "unmatched_source": ("position", "source_row_index"),
+        "unmatched_target": ("position", "target_row_index"),
+    }[kind]
+    if sort not in allowed:
+        raise ValueError(f"Rows of kind '{kind}' sort by one of: {', '.join(allowed)}")
+    search = search.lower() if search else None
+
+    if has_json_rows(result):
+        items = _json_rows(result, kind)
+        if min_score is not None or max_score is not None:
+            items = [
+                i for i in items if i.get("score") is not None
+                and (min_score is None or i["score"] >= min_score) and (max_score is None or i["score"] <= max_score)
+            ]
+        if pass_index is not None:
+            items = [i for i in items if i.get("pass_index") == pass_index]
+        if search:
+            items = [i for i in items if _matches_search(i, search)]
+        if sort != "position":
+            items = sorted(items, key=lambda i: _sort_value(i, kind, sort), reverse=descending)
+        elif descending:
+            items = items[::-1]
+        return len(items), items[offset:offset + limit]
+
+    query = db.query(MatchResultRow).filter(MatchResultRow.result_id == result.id, MatchResultRow.kind == kind)
+    if min_score is not None:
+        query = query.filter(MatchResultRow.score >= min_score)
+    if max_score is not None:
+        query = query.filter(MatchResultRow.score <= max_score)
+    if pass_index is not None:
+        query = query.filter(MatchResultRow.pass_index == pass_index)
+    column = getattr(MatchResultRow, sort)
+    query = query.order_by(column.desc() if descending else column, MatchResultRow.position)
+
+    loader = ResultRowLoader(db)
+    if search:
+        items = [i for i in _kind_rows(loader, result.config, kind, query.all(), whole_tables=True)
+                 if _matches_search(i, search)]
+        return len(items), items[offset:offset + limit]
+
+    total = query.with_entities(func.count(MatchResultRow.id)).order_by(None).scalar()
+    return total, _kind_rows(loader, result.config, kind, query.offset(offset).limit(limit).all())
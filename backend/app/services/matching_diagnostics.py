@@ -0,0 +1,118 @@
+"""
+Match Diagnostics - key distribution and timings of a match run.
+
+Rows pair only within their group of equal exact keys, so the shape of the
+groups decides both the result and the cost: a key shared by thousands of
+rows on both sides makes tolerance and fuzzy matching compare every source
+row of the group with every target row. For each pass of a run this reports
+per side how many distinct keys there are, how many are duplicated or blank,
+how many merge different raw values (case, whitespace, value mappings, or a
+"|" inside a cell, which joins the parts of a key), and which keys have the
+largest source x target groups; plus the time spent per phase and the
+process's peak memory.
+"""
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .python_limits import peak_rss_bytes, reset_peak_rss
+
+
+PHASES = ("load", "key_build", "join", "rows", "persist", "diagnostics")
+
+
+def _raw_digests(raw_values: List[List[Optional[str]]], count: int) -> np.ndarray:
+    """Hash of each row's raw cells across columns."""
+    digests = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for values in raw_values:
+            digests = digests * np.uint64(31) ^ pd.util.hash_array(np.array(values, dtype=object), categorize=False)
+    return digests
+
+
+def _blank_rows(raw_values: List[List[Optional[str]]], count: int) -> int:
+    """Rows with a blank or missing cell in any of the columns."""
+    blank = np.zeros(count, dtype=bool)
+    for values in raw_values:
+        blank |= np.fromiter((not v or v.isspace() for v in values), dtype=bool, count=count)
+    return int(blank.sum())
+
+
+def _side_stats(codes: np.ndarray, counts: np.ndarray, raw_values: List[List[Optional[str]]]) -> dict:
+    duplicated = counts > 1
+    frame = pd.DataFrame({"key": codes, "raw": _raw_digests(raw_values, len(codes))}).drop_duplicates()
+    return {
+        "rows": len(codes),
+        "distinct_keys": int((counts > 0).sum()),
+        "duplicate_keys": int(duplicated.sum()),
+        "duplicate_rows": int(counts[duplicated].sum()),
+        "largest_group": int(counts.max(initial=0)),
+        "blank_key_rows": _blank_rows(raw_values, len(codes)),
+        "colliding_keys": int((frame["key"].value_counts() > 1).sum()),
+    }
+
+
+def pass_diagnostics(
+    pass_index: int,
+    source_keys: List[str],
+    target_keys: List[str],
+    source_values: List[List[Optional[str]]],
+    target_values: List[List[Optional[str]]],
+    top: int
+) -> dict:
+    """
+    Key statistics of one pass from the exact keys of both sides.
+
+    source_values/target_values hold the raw_match_values of the pass's
+    exact columns.
+    """
+    codes, uniques = pd.factorize(np.array(source_keys + target_keys, dtype=object))
+    codes = codes.astype(np.int64)
+    source_codes, target_codes = codes[:len(source_keys)], codes[len(source_keys):]
+    source_counts = np.bincount(source_codes, minlength=len(uniques))
+    target_counts = np.bincount(target_codes, minlength=len(uniques))
+    candidates = source_counts * target_counts
+
+    # Largest candidate groups first, then the largest one-sided groups
+    order = np.lexsort((-(source_counts + target_counts), -candidates))[:top]
+    return {
+        "pass_index": pass_index,
+        "source": _side_stats(source_codes, source_counts, source_values),
+        "target": _side_stats(target_codes, target_counts, target_values),
+        "shared_keys": int(((source_counts > 0) & (target_counts > 0)).sum()),
+        "candidate_pairs": int(candidates.sum()),
+        "top_keys": [
+            {"key": uniques[i], "source_rows": int(source_counts[i]), "target_rows": int(target_counts[i])}
+            for i in order.tolist()
+        ],
+    }
+
+
+class MatchDiagnostics:
+    """Collects the timings and pass statistics of one match run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings: Dict[str, float] = {phase: 0.0 for phase in PHASES}
+        self.passes: List[dict] = []
+        # The peak mark is per process, so other requests served meanwhile count too
+        reset_peak_rss()
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the time spent in a block to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[name] += time.perf_counter() - start
+
+    def report(self) -> dict:
+        report = {f"{phase}_ms": round(seconds * 1000, 2) for phase, seconds in self.timings.items()}
+        report["total_ms"] = round((time.perf_counter() - self.started) * 1000, 2)
+        report["peak_rss_bytes"] = peak_rss_bytes()
+        report["passes"] = self.passes
+        return report
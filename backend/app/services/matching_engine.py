@@ -0,0 +1,861 @@
+"""
+Matching Engine - vectorized key building and one-to-one hash join.
+
+Works on plain row lists, independent of the database. Column positions are
+resolved once per table, match keys for a whole table are built a column
+at a time, and rows are paired with a hash join on (key, occurrence)
+so the k-th source row with a key pairs with the k-th target row with that
+key. That is the same first-come, one-to-one pairing as the original
+row-by-row loop. Rows left over can then pair by tolerance (numbers and
+dates) or by fuzzy text similarity, within groups of equal exact columns,
+or a source row can pair with several targets whose amounts net to it.
+"""
+import gc
+import logging
+import math
+import re
+import time
+import zlib
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..models import MatchColumn
+
+
+logger = logging.getLogger(__name__)
+
+
+class JoinResult(NamedTuple):
+    """Row positions (0-based, in table order) produced by a join."""
+    source_positions: np.ndarray   # matched pairs, ordered by source position
+    target_positions: np.ndarray
+    unmatched_source: np.ndarray
+    unmatched_target: np.ndarray
+    scores: Optional[np.ndarray] = None  # similarity per matched pair, with fuzzy columns
+
+
+@contextmanager
+def paused_gc() -> Iterator[None]:
+    """
+    Suspend cyclic garbage collection for a block.
+
+    Building millions of result dicts otherwise triggers repeated full
+    collections that rescan every row list loaded for the match; none of
+    these objects form cycles, so reference counting frees them anyway.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def column_values(rows: Sequence[List], col_idx: int) -> List[Optional[str]]:
+    """One column of a row list as strings: "" for None cells, None for short rows."""
+    return [
+        None if col_idx >= len(row)
+        else "" if row[col_idx] is None
+        else row[col_idx] if type(row[col_idx]) is str
+        else str(row[col_idx])
+        for row in rows
+    ]
+
+
+def occurrences(codes: np.ndarray) -> np.ndarray:
+    """For each element, how many earlier elements have the same code (0 for the first)."""
+    order = np.argsort(codes, kind="stable")
+    ordered = codes[order]
+    positions = np.arange(len(codes))
+    starts = np.ones(len(codes), dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    group_start = np.maximum.accumulate(np.where(starts, positions, 0))
+    result = np.empty(len(codes), dtype=np.int64)
+    result[order] = positions - group_start
+    return result
+
+
+def normalize_values(values: List[Optional[str]], case_sensitive: bool) -> List[str]:
+    """Column-wide _normalize_value: trim, and upper-case unless case sensitive."""
+    if case_sensitive:
+        return [v.strip() if v else "" for v in values]
+    return [v.strip().upper() if v else "" for v in values]
+
+
+def apply_mapping(values: List[Optional[str]], mapping: Dict[str, str]) -> List[Optional[str]]:
+    """Replace values found in the mapping, keep the rest (and missing cells)."""
+    if not mapping:
+        return values
+    return [v if v is None else mapping.get(v, v) for v in values]
+
+
+def column_positions(columns: List[str]) -> Dict[str, int]:
+    """Position of each column name (the first, if a name repeats)."""
+    return {name: idx for idx, name in reversed(list(enumerate(columns)))}
+
+
+def raw_match_values(
+    rows: Sequence[List],
+    positions: Dict[str, int],
+    match_col: MatchColumn,
+    is_source: bool
+) -> List[Optional[str]]:
+    """Cells of one match column for every row; all None if the table lacks the column."""
+    col_name = match_col.source_column if is_source else match_col.target_column
+    col_idx = positions.get(col_name, -1)
+    if col_idx < 0:
+        return [None] * len(rows)
+    return column_values(rows, col_idx)
+
+
+def normalize_match_values(
+    values: List[Optional[str]],
+    match_col: MatchColumn,
+    is_source: bool,
+    mappings: Optional[Dict[int, Dict[str, str]]] = None
+) -> List[str]:
+    """
+    Normalized values of one match column, as in MatchingService._create_match_key.
+
+    Value mappings (by mapping id) apply to the source side only, and, as in
+    the row-by-row path, not to cells missing from a short row.
+    """
+    if is_source and match_col.value_mapping_id:
+        values = apply_mapping(values, (mappings or {}).get(match_col.value_mapping_id, {}))
+    return normalize_values(values, match_col.case_sensitive)
+
+
+def match_values(
+    rows: Sequence[List],
+    positions: Dict[str, int],
+    match_col: MatchColumn,
+    is_source: bool,
+    mappings: Optional[Dict[int, Dict[str, str]]] = None
+) -> List[str]:
+    """Normalized values of one match column for every row."""
+    values = raw_match_values(rows, positions, match_col, is_source)
+    return normalize_match_values(values, match_col, is_source, mappings)
+
+
+def join_parts(parts: List[List[str]], count: int) -> List[str]:
+    """Per-row keys from per-column values."""
+    if not parts:
+        return [""] * count
+    if len(parts) == 1:
+        return parts[0]
+    return ["|".join(key_parts) for key_parts in zip(*parts)]
+
+
+def build_keys(
+    rows: Sequence[List],
+    columns: List[str],
+    match_columns: List[MatchColumn],
+    is_source: bool,
+    mappings: Optional[Dict[int, Dict[str, str]]] = None
+) -> List[str]:
+    """
+    Composite match key for every row, equal to MatchingService._create_match_key.
+
+    Work is done a column at a time with plain comprehensions, which beat
+    pandas' object-dtype string methods here.
+    """
+    positions = column_positions(columns)
+    parts = [match_values(rows, positions, col, is_source, mappings) for col in match_columns]
+    return join_parts(parts, len(rows))
+
+
+def is_tolerance_column(match_col: MatchColumn) -> bool:
+    return (match_col.match_type or "exact") == "tolerance"
+
+
+def is_fuzzy_column(match_col: MatchColumn) -> bool:
+    return (match_col.match_type or "exact") == "fuzzy"
+
+
+# Spellings of common name words reduced to one form before fuzzy comparison
+FUZZY_TOKEN_ALIASES = {
+    "LIMITED": "LTD",
+    "PRIVATE": "PVT",
+    "COMPANY": "CO",
+    "CORPORATION": "CORP",
+    "INCORPORATED": "INC",
+    "&": "AND",
+}
+
+_FUZZY_TOKEN = re.compile(r"&|[^\W_]+")
+
+
+def fuzzy_text(value: str) -> str:
+    """Canonical form for fuzzy comparison: upper case, words only, aliases applied."""
+    return " ".join(FUZZY_TOKEN_ALIASES.get(token, token) for token in _FUZZY_TOKEN.findall(value.upper()))
+
+
+def parse_tolerance_values(values: List[str], tolerance_type: str) -> np.ndarray:
+    """
+    Normalized values as floats for tolerance comparison, NaN where a value
+    does not parse: numbers (thousands separators allowed), or for "days"
+    the calendar date of a YYYY-MM-DD value as a day number.
+    """
+    if tolerance_type == "days":
+        # Few distinct dates, so parse each once
+        codes, uniques = pd.factorize(np.array(values, dtype=object))
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object).str[:10], format="%Y-%m-%d", errors="coerce")
+        days = parsed.to_numpy(dtype="datetime64[ns]").astype("datetime64[D]").astype(np.int64).astype(np.float64)
+        days[parsed.isna().to_numpy()] = np.nan
+        return days[codes] if len(codes) else np.array([], dtype=np.float64)
+
+    strings = pd.Series(values, dtype=object)
+    if any("," in v for v in values):
+        strings = strings.str.replace(",", "", regex=False)
+    numbers = pd.to_numeric(strings, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    numbers[~np.isfinite(numbers)] = np.nan
+    return numbers
+
+
+class SideKeys(NamedTuple):
+    """Match keys of one side, one entry per row."""
+    exact_keys: List[str]                # exact columns
+    tolerance_values: List[np.ndarray]   # parsed, one array per tolerance column
+    tolerance_texts: List[List[str]]     # normalized, for values that do not parse
+    fuzzy_texts: List[List[str]]         # canonical text, one list per fuzzy column
+
+
+def build_side_keys(
+    rows: Sequence[List],
+    columns: List[str],
+    match_columns: List[MatchColumn],
+    is_source: bool,
+    mappings: Optional[Dict[int, Dict[str, str]]] = None
+) -> SideKeys:
+    """Keys of one side for match_sides."""
+    positions = column_positions(columns)
+    raw_values = [raw_match_values(rows, positions, match_col, is_source) for match_col in match_columns]
+    return side_keys_from_values(raw_values, len(rows), match_columns, is_source, mappings)
+
+
+def side_keys_from_values(
+    raw_values: List[List[Optional[str]]],
+    count: int,
+    match_columns: List[MatchColumn],
+    is_source: bool,
+    mappings: Optional[Dict[int, Dict[str, str]]] = None
+) -> SideKeys:
+    """Keys of `count` rows of one side from the raw_match_values of each match column."""
+    exact_parts = []
+    tolerance_values = []
+    tolerance_texts = []
+    fuzzy_texts = []
+    for match_col, raw in zip(match_columns, raw_values):
+        values = normalize_match_values(raw, match_col, is_source, mappings)
+        if is_tolerance_column(match_col):
+            tolerance_values.append(parse_tolerance_values(values, match_col.tolerance_type))
+            tolerance_texts.append(values)
+        elif is_fuzzy_column(match_col):
+            fuzzy_texts.append([fuzzy_text(v) for v in values])
+        else:
+            exact_parts.append(values)
+    return SideKeys(join_parts(exact_parts, count), tolerance_values, tolerance_texts, fuzzy_texts)
+
+
+def key_partitions(keys: List[str], partitions: int) -> np.ndarray:
+    """Partition number of each key; the same in every process (unlike hash())."""
+    return np.fromiter(
+        (zlib.crc32(key.encode("utf-8", "surrogatepass")) % partitions for key in keys),
+        dtype=np.int64, count=len(keys)
+    )
+
+
+def shared_codes(source_keys: List[str], target_keys: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer codes for keys, equal across both sides for equal keys."""
+    codes, _ = pd.factorize(np.array(source_keys + target_keys, dtype=object))
+    codes = codes.astype(np.int64)
+    return codes[:len(source_keys)], codes[len(source_keys):]
+
+
+def combine_codes(codes: np.ndarray, other: np.ndarray) -> np.ndarray:
+    """Codes for the pair (codes, other), renumbered densely."""
+    combined, _ = pd.factorize(codes * (int(other.max(initial=0)) + 1) + other)
+    return combined.astype(np.int64)
+
+
+def value_codes(values: np.ndarray, texts: List[str]) -> np.ndarray:
+    """Codes of a tolerance column for the exact pass: equal numbers share a code, as do equal texts that did not parse."""
+    codes, uniques = pd.factorize(values + 0.0)  # -0.0 == 0.0; NaN -> -1
+    codes = codes.astype(np.int64)
+    missing = np.flatnonzero(codes < 0)
+    if len(missing):
+        text_codes, _ = pd.factorize(np.array([texts[i] for i in missing.tolist()], dtype=object))
+        codes[missing] = len(uniques) + text_codes
+    return codes
+
+
+def hash_join(source_keys: List[str], target_keys: List[str]) -> JoinResult:
+    """Pair rows with equal keys one-to-one in order of appearance."""
+    return hash_join_codes(*shared_codes(source_keys, target_keys))
+
+
+def hash_join_codes(source_codes: np.ndarray, target_codes: np.ndarray) -> JoinResult:
+    """
+    Pair rows with equal key codes one-to-one in order of appearance.
+
+    Each row is tagged with its occurrence number within its key and the join
+    is on (code, occurrence), so duplicates pair off first-come and surplus
+    rows on either side stay unmatched.
+    """
+    source_occ = occurrences(source_codes)
+    target_occ = occurrences(target_codes)
+    base = int(max(source_occ.max(initial=0), target_occ.max(initial=0))) + 1
+
+    # (code, occurrence) is unique per side, so a lookup gives the one partner
+    target_index = pd.Index(target_codes * base + target_occ)
+    partner = target_index.get_indexer(source_codes * base + source_occ)
+
+    source_matched = partner >= 0
+    source_positions = np.flatnonzero(source_matched)
+    target_positions = partner[source_matched]
+
+    target_matched = np.zeros(len(target_codes), dtype=bool)
+    target_matched[target_positions] = True
+
+    return JoinResult(
+        source_positions=source_positions,
+        target_positions=target_positions,
+        unmatched_source=np.flatnonzero(~source_matched),
+        unmatched_target=np.flatnonzero(~target_matched),
+    )
+
+
+class ToleranceRule(NamedTuple):
+    tolerance_type: str  # "absolute" | "percent" (of the source value) | "days"
+    tolerance: float
+
+
+TOLERANCE_TYPES = ("absolute", "percent", "days")
+
+# Slack for binary floating point, so 100.50 vs 100.49 is within 0.01
+_TOLERANCE_EPSILON = 1e-9
+
+
+def tolerance_widths(rule: ToleranceRule, values: np.ndarray) -> np.ndarray:
+    """How far a target value may be from each source value under a rule."""
+    magnitude = np.abs(values)
+    if rule.tolerance_type == "percent":
+        width = magnitude * (rule.tolerance / 100.0)
+    else:
+        width = np.full(len(values), float(rule.tolerance))
+    return width + _TOLERANCE_EPSILON * np.maximum(magnitude, 1.0)
+
+
+def _find(parent: List[int], i: int) -> int:
+    """Union-find root with path compression."""
+    root = i
+    while parent[root] != root:
+        root = parent[root]
+    while parent[i] != root:
+        parent[i], i = root, parent[i]
+    return root
+
+
+def tolerance_join(
+    source_groups: np.ndarray,
+    source_values: List[np.ndarray],
+    target_groups: np.ndarray,
+    target_values: List[np.ndarray],
+    rules: List[ToleranceRule]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pair rows of the same group whose values are within every rule's tolerance.
+
+    Targets are sorted by (group, first tolerance value) and each source's
+    window [value - width, value + width] is located by binary search, so
+    only targets inside the window are ever looked at. Sources are taken in
+    order and each pairs with the free target nearest to it on the first
+    tolerance column that also satisfies the other rules (ties: the earlier
+    target). Rows with a value that does not parse take no part.
+
+    Returns (source indexes, target indexes) into the given arrays.
+    """
+    empty = np.array([], dtype=np.int64)
+    source_ok = np.logical_and.reduce([np.isfinite(v) for v in source_values])
+    target_ok = np.logical_and.reduce([np.isfinite(v) for v in target_values])
+    source_idx = np.flatnonzero(source_ok)
+    target_idx = np.flatnonzero(target_ok)
+    if not len(source_idx) or not len(target_idx):
+        return empty, empty
+
+    s_group = source_groups[source_idx].astype(np.int64)
+    s_values = [v[source_idx] for v in source_values]
+    s_widths = [tolerance_widths(rule, v) for rule, v in zip(rules, s_values)]
+
+    # Targets ordered by group, then first tolerance value, then position
+    order = np.lexsort((target_idx, target_values[0][target_idx], target_groups[target_idx]))
+    target_idx = target_idx[order]
+    t_group = target_groups[target_idx].astype(np.int64)
+    t_values = [v[target_idx] for v in target_values]
+
+    # Binary search on (group, value): rank all values together so the pair
+    # becomes a single sortable integer
+    primary = s_values[0]
+    lows, highs = primary - s_widths[0], primary + s_widths[0]
+    ranks = np.unique(np.concatenate([t_values[0], lows, highs, primary]), return_inverse=True)[1]
+    n_t, n_s = len(target_idx), len(source_idx)
+    span = int(ranks.max()) + 1
+    t_key = t_group * span + ranks[:n_t]
+    window_lo = np.searchsorted(t_key, s_group * span + ranks[n_t:n_t + n_s], side="left")
+    window_hi = np.searchsorted(t_key, s_group * span + ranks[n_t + n_s:n_t + 2 * n_s], side="right")
+    nearest = np.searchsorted(t_key, s_group * span + ranks[n_t + 2 * n_s:], side="left")
+
+    candidates = np.flatnonzero(window_hi > window_lo).tolist()
+    if not candidates:
+        return empty, empty
+
+    # Start of each run of equal (group, value) targets, so the earliest of
+    # equally near targets on the left can be found
+    run_starts = np.ones(n_t, dtype=bool)
+    run_starts[1:] = t_key[1:] != t_key[:-1]
+    run_start = np.maximum.accumulate(np.where(run_starts, np.arange(n_t), 0)).tolist()
+
+    window_lo, window_hi, nearest = window_lo.tolist(), window_hi.tolist(), nearest.tolist()
+    t_primary = t_values[0].tolist()
+    s_primary = primary.tolist()
+    t_position = target_idx.tolist()
+    secondary = [
+        (s_v.tolist(), t_v.tolist(), w.tolist())
+        for s_v, t_v, w in zip(s_values[1:], t_values[1:], s_widths[1:])
+    ]
+
+    # Free sorted targets: next_free[i] -> first free index >= i (n_t: none),
+    # prev_free[i + 1] - 1 -> last free index <= i (-1: none)
+    next_free = list(range(n_t + 1))
+    prev_free = list(range(n_t + 1))
+
+    paired_source, paired_target = [], []
+    for k in candidates:
+        lo, hi, value = window_lo[k], window_hi[k], s_primary[k]
+        # Right of `nearest` values are >= value and scanning right visits
+        # equal values in target order; on the left, `left_end` is the last
+        # free index of the nearest run and `left` its earliest free target
+        right = _find(next_free, nearest[k])
+        left_end = _find(prev_free, nearest[k]) - 1
+        left = _find(next_free, run_start[left_end]) if left_end >= lo else -1
+        while True:
+            has_right = right < hi
+            has_left = left_end >= lo
+            if not has_right and not has_left:
+                break
+            if has_right and has_left:
+                d_right = t_primary[right] - value
+                d_left = value - t_primary[left]
+                take_right = d_right < d_left or (d_right == d_left and t_position[right] < t_position[left])
+            else:
+                take_right = has_right
+            t = right if take_right else left
+
+            if all(abs(t_v[t] - s_v[k]) <= w[k] for s_v, t_v, w in secondary):
+                paired_source.append(k)
+                paired_target.append(t)
+                next_free[t] = t + 1
+                prev_free[t + 1] = t
+                break
+            if take_right:
+                right = _find(next_free, right + 1)
+            else:
+                left = _find(next_free, left + 1)
+                if left > left_end:
+                    # Run exhausted: move to the previous run
+                    left_end = _find(prev_free, run_start[left_end]) - 1
+                    left = _find(next_free, run_start[left_end]) if left_end >= lo else -1
+
+    return (
+        source_idx[np.array(paired_source, dtype=np.int64)],
+        target_idx[np.array(paired_target, dtype=np.int64)],
+    )
+
+
+def ngrams(text: str, n: int = 3) -> frozenset:
+    """Character n-grams of a text padded with a space at both ends (empty for empty text)."""
+    if not text:
+        return frozenset()
+    padded = f" {text} "
+    return frozenset(padded[i:i + n] for i in range(len(padded) - n + 1))
+
+
+def similarity(a: frozenset, b: frozenset) -> float:
+    """Dice coefficient of two n-gram sets."""
+    if not a or not b:
+        return 0.0
+    return 2.0 * len(a & b) / (len(a) + len(b))
+
+
+class FuzzyRule(NamedTuple):
+    threshold: float  # minimum similarity, 0 < threshold <= 1
+
+
+def fuzzy_join(
+    source_groups: np.ndarray,
+    source_texts: List[List[str]],
+    target_groups: np.ndarray,
+    target_texts: List[List[str]],
+    fuzzy_rules: List[FuzzyRule],
+    source_values: List[np.ndarray] = (),
+    target_values: List[np.ndarray] = (),
+    tolerance_rules: List[ToleranceRule] = ()
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Pair rows of the same group whose texts are similar on every fuzzy column.
+
+    Candidates come from an inverted index of trigrams of the first fuzzy
+    column, keyed by group (the blocking key). Only a prefix of each text's
+    trigrams, rarest first, is indexed and probed: two texts with Dice
+    similarity >= t (Jaccard >= t / (2 - t)) always share a trigram in their
+    prefixes, so no qualifying pair is missed and frequent trigrams such as
+    " LT" never produce candidate lists of the whole table. Candidates are
+    scored on every fuzzy column and must also pass the tolerance rules.
+
+    Pairs are then taken best first (mean similarity, then source and target
+    order), one-to-one. Returns (source indexes, target indexes, scores).
+    """
+    empty = np.array([], dtype=np.int64)
+    source_grams = [[ngrams(t) for t in texts] for texts in source_texts]
+    target_grams = [[ngrams(t) for t in texts] for texts in target_texts]
+
+    # Global trigram order, rarest first
+    frequency = Counter()
+    for grams in target_grams[0]:
+        frequency.update(grams)
+    for grams in source_grams[0]:
+        frequency.update(grams)
+    rank = {gram: i for i, (gram, _) in enumerate(sorted(frequency.items(), key=lambda item: (item[1], item[0])))}
+
+    jaccard = fuzzy_rules[0].threshold / (2.0 - fuzzy_rules[0].threshold)
+
+    def prefix(grams: frozenset) -> List[int]:
+        ordered = sorted(rank[g] for g in grams)
+        return ordered[:len(ordered) - math.ceil(jaccard * len(ordered) - 1e-9) + 1]
+
+    source_group_list = source_groups.tolist()
+    target_group_list = target_groups.tolist()
+    index: Dict[Tuple[int, int], List[int]] = defaultdict(list)
+    for j, grams in enumerate(target_grams[0]):
+        if grams:
+            group = target_group_list[j]
+            for gram in prefix(grams):
+                index[(group, gram)].append(j)
+
+    source_widths = [tolerance_widths(rule, v) for rule, v in zip(tolerance_rules, source_values)]
+    tolerance_checks = [
+        (s_v.tolist(), t_v.tolist(), w.tolist())
+        for s_v, t_v, w in zip(source_values, target_values, source_widths)
+    ]
+
+    candidates = []
+    for i, grams in enumerate(source_grams[0]):
+        if not grams:
+            continue
+        group = source_group_list[i]
+        size = len(grams)
+        seen = set()
+        for gram in prefix(grams):
+            seen.update(index.get((group, gram), ()))
+        for j in seen:
+            other = target_grams[0][j]
+            # Length filter: Jaccard >= t needs t * |a| <= |b| <= |a| / t
+            if not jaccard * size - 1e-9 <= len(other) <= size / jaccard + 1e-9:
+                continue
+            scores = [similarity(grams, other)]
+            if scores[0] < fuzzy_rules[0].threshold:
+                continue
+            for rule, s_grams, t_grams in zip(fuzzy_rules[1:], source_grams[1:], target_grams[1:]):
+                scores.append(similarity(s_grams[i], t_grams[j]))
+                if scores[-1] < rule.threshold:
+                    break
+            else:
+                if all(abs(t_v[j] - s_v[i]) <= w[i] for s_v, t_v, w in tolerance_checks):
+                    candidates.append((-sum(scores) / len(scores), i, j))
+
+    candidates.sort()
+    source_used, target_used = set(), set()
+    paired_source, paired_target, paired_scores = [], [], []
+    for negative_score, i, j in candidates:
+        if i in source_used or j in target_used:
+            continue
+        source_used.add(i)
+        target_used.add(j)
+        paired_source.append(i)
+        paired_target.append(j)
+        paired_scores.append(-negative_score)
+
+    if not paired_source:
+        return empty, empty, np.array([], dtype=np.float64)
+    return (
+        np.array(paired_source, dtype=np.int64),
+        np.array(paired_target, dtype=np.int64),
+        np.array(paired_scores, dtype=np.float64),
+    )
+
+
+class AggregateRule(NamedTuple):
+    amount: ToleranceRule  # "absolute" | "percent" (of the source amount)
+    max_size: int          # most target rows netted into one source row
+    max_steps: int         # subset-sum search steps per source row
+    time_limit: float      # seconds for the subset-sum search of a whole run
+
+
+class _SearchExhausted(Exception):
+    """A subset-sum search used up its step budget."""
+
+
+def subset_sum(
+    values: List[float],
+    low: float,
+    high: float,
+    min_size: int,
+    max_size: int,
+    max_steps: int
+) -> Optional[List[int]]:
+    """
+    Positions of the fewest values (ascending, as given) whose sum is within [low, high].
+
+    Tries each size from min_size to max_size, depth-first over positions in
+    order, so the first combination found is the lexicographically earliest
+    of its size. Prefix sums bound each branch: with k values still to pick
+    after position i, the smallest reachable sum takes the next k values and
+    the largest the last k; once even the smallest overshoots `high` no later
+    position can do better, so the loop stops. Raises _SearchExhausted after
+    max_steps positions in all.
+    """
+    n = len(values)
+    cumulative = [0.0]
+    for v in values:
+        cumulative.append(cumulative[-1] + v)
+    # Differences of prefix sums round differently from the sums themselves
+    slack = _TOLERANCE_EPSILON * (sum(abs(v) for v in values) + 1.0)
+    chosen: List[int] = []
+    steps = 0
+
+    def search(start: int, remaining: int, total: float) -> bool:
+        nonlocal steps
+        rest = remaining - 1
+        for i in range(start, n - rest):
+            steps += 1
+            if steps > max_steps:
+                raise _SearchExhausted()
+            partial = total + values[i]
+            smallest = partial + (cumulative[i + 1 + rest] - cumulative[i + 1])
+            if smallest > high + slack:
+                break
+            largest = partial + (cumulative[n] - cumulative[n - rest])
+            if largest < low - slack:
+                continue
+            if not rest and not low <= partial <= high:
+                continue
+            chosen.append(i)
+            if not rest or search(i + 1, rest, partial):
+                return True
+            chosen.pop()
+        return False
+
+    for size in range(min_size, min(max_size, n) + 1):
+        if search(0, size, 0.0):
+            return chosen
+    return None
+
+
+def aggregate_join(
+    source_groups: np.ndarray,
+    source_amounts: np.ndarray,
+    target_groups: np.ndarray,
+    target_amounts: np.ndarray,
+    rule: AggregateRule
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Pair source rows with several targets of their group whose amounts sum to the source amount.
+
+    First whole groups: where the free targets of a group add up to a source
+    amount of that group (within the tolerance), the first such source takes
+    them all. Then, for each remaining source in order, subset_sum looks for
+    the fewest free targets of its group (2 to max_size) that add up to it.
+    A source whose search runs out of steps stays unmatched; once the
+    time limit passes, the remaining sources are not searched. Rows with an
+    amount that does not parse take no part.
+
+    Returns (source indexes, target indexes), one entry per target paired,
+    ordered by source then target.
+    """
+    empty = np.array([], dtype=np.int64)
+    source_idx = np.flatnonzero(np.isfinite(source_amounts))
+    target_idx = np.flatnonzero(np.isfinite(target_amounts))
+    if not len(source_idx) or len(target_idx) < 2:
+        return empty, empty
+
+    widths = tolerance_widths(rule.amount, source_amounts[source_idx])
+    s_group = source_groups[source_idx].tolist()
+    s_low = (source_amounts[source_idx] - widths).tolist()
+    s_high = (source_amounts[source_idx] + widths).tolist()
+
+    # Free targets per group, ordered by (amount, position)
+    order = np.lexsort((target_idx, target_amounts[target_idx], target_groups[target_idx]))
+    by_group: Dict[int, List[Tuple[float, int]]] = defaultdict(list)
+    for group, amount, position in zip(
+        target_groups[target_idx[order]].tolist(), target_amounts[target_idx[order]].tolist(), target_idx[order].tolist()
+    ):
+        by_group[group].append((amount, position))
+
+    pairs: Dict[int, List[int]] = {}
+
+    # Whole groups, compared on their summed amounts
+    totals = {group: math.fsum(a for a, _ in free) for group, free in by_group.items() if len(free) > 1}
+    for k, group in enumerate(s_group):
+        total = totals.get(group)
+        if total is not None and s_low[k] <= total <= s_high[k]:
+            pairs[k] = sorted(position for _, position in by_group.pop(group))
+            del totals[group]
+
+    # Bounded subset-sum search over each remaining source's group
+    deadline = time.monotonic() + rule.time_limit
+    exhausted = 0
+    for k, group in enumerate(s_group):
+        free = by_group.get(group)
+        if k in pairs or not free or len(free) < 2:
+            continue
+        if time.monotonic() > deadline:
+            logger.warning("aggregate matching stopped at the %ss time limit", rule.time_limit)
+            break
+        found = None
+        try:
+            found = subset_sum([a for a, _ in free], s_low[k], s_high[k], 2, rule.max_size, rule.max_steps)
+        except _SearchExhausted:
+            exhausted += 1
+        if found is not None:
+            pairs[k] = sorted(free[i][1] for i in found)
+            taken = set(found)
+            by_group[group] = [item for i, item in enumerate(free) if i not in taken]
+    if exhausted:
+        logger.info("aggregate matching: %s source rows ran out of search steps", exhausted)
+
+    paired_source, paired_target = [], []
+    for k in sorted(pairs):
+        paired_source.extend([k] * len(pairs[k]))
+        paired_target.extend(pairs[k])
+    if not paired_source:
+        return empty, empty
+    return source_idx[np.array(paired_source, dtype=np.int64)], np.array(paired_target, dtype=np.int64)
+
+
+def match_sides(
+    source: SideKeys,
+    target: SideKeys,
+    rules: List[ToleranceRule],
+    fuzzy_rules: List[FuzzyRule] = ()
+) -> JoinResult:
+    """
+    One-to-one pairing of two sides built by build_side_keys.
+
+    Rows equal on every column (tolerance columns compared by parsed value,
+    so "100.5" equals "100.50"; fuzzy columns by canonical text) pair first,
+    with a hash join. The rows left over then pair within their exact-column
+    group: by fuzzy_join when there are fuzzy columns (tolerance columns act
+    as filters), else by tolerance_join. With fuzzy columns the result has a
+    score per pair, 1.0 for pairs from the first pass.
+    """
+    n_source = len(source.exact_keys)
+    source_groups, target_groups = shared_codes(source.exact_keys, target.exact_keys)
+    if not rules and not fuzzy_rules:
+        return hash_join_codes(source_groups, target_groups)
+
+    codes = np.concatenate([source_groups, target_groups])
+    for s_values, t_values, s_texts, t_texts in zip(
+        source.tolerance_values, target.tolerance_values, source.tolerance_texts, target.tolerance_texts
+    ):
+        codes = combine_codes(codes, value_codes(np.concatenate([s_values, t_values]), s_texts + t_texts))
+    for s_texts, t_texts in zip(source.fuzzy_texts, target.fuzzy_texts):
+        codes = combine_codes(codes, np.concatenate(shared_codes(s_texts, t_texts)))
+    joined = hash_join_codes(codes[:n_source], codes[n_source:])
+    if fuzzy_rules:
+        joined = joined._replace(scores=np.ones(len(joined.source_positions)))
+    if not len(joined.unmatched_source) or not len(joined.unmatched_target):
+        return joined
+
+    rest_source, rest_target = joined.unmatched_source, joined.unmatched_target
+    extra_scores = None
+    if fuzzy_rules:
+        extra_source, extra_target, extra_scores = fuzzy_join(
+            source_groups[rest_source], [[texts[i] for i in rest_source.tolist()] for texts in source.fuzzy_texts],
+            target_groups[rest_target], [[texts[i] for i in rest_target.tolist()] for texts in target.fuzzy_texts],
+            fuzzy_rules,
+            [v[rest_source] for v in source.tolerance_values],
+            [v[rest_target] for v in target.tolerance_values],
+            rules
+        )
+    else:
+        extra_source, extra_target = tolerance_join(
+            source_groups[rest_source], [v[rest_source] for v in source.tolerance_values],
+            target_groups[rest_target], [v[rest_target] for v in target.tolerance_values],
+            rules
+        )
+    return _add_pairs(joined, rest_source[extra_source], rest_target[extra_target], extra_scores)
+
+
+def match_keys(
+    source: SideKeys,
+    target: SideKeys,
+    rules: List[ToleranceRule],
+    fuzzy_rules: List[FuzzyRule] = (),
+    aggregate: Optional[AggregateRule] = None
+) -> JoinResult:
+    """match_sides, or match_sides_aggregate when an aggregate rule is given."""
+    if aggregate is not None:
+        return match_sides_aggregate(source, target, aggregate)
+    return match_sides(source, target, rules, fuzzy_rules)
+
+
+def match_sides_aggregate(source: SideKeys, target: SideKeys, rule: AggregateRule) -> JoinResult:
+    """
+    Many-to-one pairing: each source row with one target, or several that net to it.
+
+    The sides have one tolerance column, the amount. Rows first pair
+    one-to-one as in match_sides; the rest then pair by aggregate_join within
+    their exact-column group. A source row netting several targets appears
+    in one pair per target.
+    """
+    joined = match_sides(source, target, [rule.amount])
+    if not len(joined.unmatched_source) or len(joined.unmatched_target) < 2:
+        return joined
+
+    source_groups, target_groups = shared_codes(source.exact_keys, target.exact_keys)
+    rest_source, rest_target = joined.unmatched_source, joined.unmatched_target
+    extra_source, extra_target = aggregate_join(
+        source_groups[rest_source], source.tolerance_values[0][rest_source],
+        target_groups[rest_target], target.tolerance_values[0][rest_target],
+        rule
+    )
+    return _add_pairs(joined, rest_source[extra_source], rest_target[extra_target])
+
+
+def _add_pairs(
+    joined: JoinResult,
+    source_positions: np.ndarray,
+    target_positions: np.ndarray,
+    scores: Optional[np.ndarray] = None
+) -> JoinResult:
+    """joined with more pairs, kept in source order (stable, so a source's pairs stay together)."""
+    if not len(source_positions):
+        return joined
+    source_positions = np.concatenate([joined.source_positions, source_positions])
+    target_positions = np.concatenate([joined.target_positions, target_positions])
+    order = np.argsort(source_positions, kind="stable")
+    if scores is not None:
+        scores = np.concatenate([joined.scores, scores])[order]
+
+    return JoinResult(
+        source_positions=source_positions[order],
+        target_positions=target_positions[order],
+        unmatched_source=np.setdiff1d(joined.unmatched_source, source_positions),
+        unmatched_target=np.setdiff1d(joined.unmatched_target, target_positions),
+        scores=scores,
+    )
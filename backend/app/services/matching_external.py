@@ -0,0 +1,170 @@
+"""
+External Matching - out-of-core matching for tables larger than memory.
+
+Both tables are streamed from the database a batch at a time and only the
+cells of the match columns are kept: each row is hashed on its exact key to
+a partition and appended, with its position, to that partition's spill file
+on disk. Partitions are then loaded one at a time, keyed and matched with
+match_keys. The partition count is chosen so one partition's working set
+fits MATCH_MEMORY_BUDGET_MB; a single group of equal exact keys larger than
+that cannot be split and is matched whole.
+
+Rows only ever pair within their group of equal exact columns, so the pairs
+are the same as an in-memory run. Pair positions (a few bytes per pair) stay
+in memory; the caller streams the tables again to turn them into rows.
+"""
+import logging
+import math
+import os
+import pickle
+import shutil
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .matching_engine import (
+    AggregateRule, FuzzyRule, JoinResult, ToleranceRule, column_positions, is_fuzzy_column, is_tolerance_column,
+    key_partitions, match_keys, raw_match_values, side_keys_from_values
+)
+
+
+logger = logging.getLogger(__name__)
+
+# Row indexes and row data of a table, a batch at a time (table_store.iter_indexed_rows)
+RowBatches = Iterable[Tuple[List[int], List[List[str]]]]
+
+# Rough memory per row while a partition is keyed and matched, besides its cells
+ROW_OVERHEAD_BYTES = 300
+# Per match cell: the string and its slot in a column list
+CELL_OVERHEAD_BYTES = 60
+MAX_PARTITIONS = 4096
+
+
+def partition_count(rows: int, match_columns: int, memory_budget_mb: int) -> int:
+    """Partitions needed for each one's working set to fit the memory budget."""
+    row_bytes = ROW_OVERHEAD_BYTES + CELL_OVERHEAD_BYTES * match_columns
+    needed = math.ceil(rows * row_bytes / (max(1, memory_budget_mb) * 1024 * 1024))
+    return min(max(1, needed), MAX_PARTITIONS)
+
+
+class ExternalJoin:
+    """Spill files of one external match, in a temporary directory removed by close()."""
+
+    def __init__(
+        self,
+        match_columns,
+        mappings: Dict[int, Dict[str, str]],
+        partitions: int,
+        directory: Optional[str] = None
+    ):
+        self.match_columns = match_columns
+        self.mappings = mappings
+        self.exact = [
+            i for i, c in enumerate(match_columns) if not is_tolerance_column(c) and not is_fuzzy_column(c)
+        ]
+        # Partitions follow the exact columns, so without any there is nothing to split
+        self.partitions = partitions if self.exact else 1
+        self.directory = tempfile.mkdtemp(prefix="didp_match_", dir=directory)
+        self.counts = {True: 0, False: 0}
+
+    def _path(self, is_source: bool, partition: int) -> str:
+        return os.path.join(self.directory, f"{'source' if is_source else 'target'}_{partition}.pkl")
+
+    def spill(self, batches: RowBatches, columns: List[str], is_source: bool) -> int:
+        """Write the match cells of one side to partition files; returns its row count."""
+        positions = column_positions(columns)
+        exact_columns = [self.match_columns[i] for i in self.exact]
+        start = self.counts[is_source]
+        for _, rows in batches:
+            raw_values = [raw_match_values(rows, positions, c, is_source) for c in self.match_columns]
+            if self.partitions == 1:
+                parts = np.zeros(len(rows), dtype=np.int64)
+            else:
+                keys = side_keys_from_values(
+                    [raw_values[i] for i in self.exact], len(rows), exact_columns, is_source, self.mappings
+                )
+                parts = key_partitions(keys.exact_keys, self.partitions)
+
+            order = np.argsort(parts, kind="stable")
+            bounds = np.searchsorted(parts[order], np.arange(self.partitions + 1))
+            for partition in np.flatnonzero(np.diff(bounds)).tolist():
+                members = order[bounds[partition]:bounds[partition + 1]]
+                cells = [[values[i] for i in members.tolist()] for values in raw_values]
+                with open(self._path(is_source, partition), "ab") as f:
+                    pickle.dump((members + start, cells), f, protocol=pickle.HIGHEST_PROTOCOL)
+            start += len(rows)
+        self.counts[is_source] = start
+        return start
+
+    def _load(self, is_source: bool, partition: int) -> Tuple[np.ndarray, List[List[Optional[str]]]]:
+        """Positions and match cells of one side of a partition, in table order."""
+        positions = [np.array([], dtype=np.int64)]
+        cells = [[] for _ in self.match_columns]
+        path = self._path(is_source, partition)
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        batch_positions, batch_cells = pickle.load(f)
+                    except EOFError:
+                        break
+                    positions.append(batch_positions)
+                    for column, values in zip(cells, batch_cells):
+                        column.extend(values)
+            os.remove(path)
+        return np.concatenate(positions), cells
+
+    def match(
+        self,
+        rules: List[ToleranceRule],
+        fuzzy_rules: List[FuzzyRule] = (),
+        aggregate: Optional[AggregateRule] = None
+    ) -> JoinResult:
+        """match_keys partition by partition over the spilled rows; same result as one in-memory run."""
+        source_positions, target_positions, scores = [], [], []
+        unmatched_source, unmatched_target = [], []
+        largest = 0
+        for partition in range(self.partitions):
+            s_pos, s_cells = self._load(True, partition)
+            t_pos, t_cells = self._load(False, partition)
+            largest = max(largest, len(s_pos) + len(t_pos))
+            if not len(s_pos) or not len(t_pos):
+                unmatched_source.append(s_pos)
+                unmatched_target.append(t_pos)
+                continue
+
+            joined = match_keys(
+                side_keys_from_values(s_cells, len(s_pos), self.match_columns, True, self.mappings),
+                side_keys_from_values(t_cells, len(t_pos), self.match_columns, False, self.mappings),
+                rules, fuzzy_rules, aggregate
+            )
+            source_positions.append(s_pos[joined.source_positions])
+            target_positions.append(t_pos[joined.target_positions])
+            unmatched_source.append(s_pos[joined.unmatched_source])
+            unmatched_target.append(t_pos[joined.unmatched_target])
+            if joined.scores is not None:
+                scores.append(joined.scores)
+
+        total = self.counts[True] + self.counts[False]
+        if self.partitions > 1 and largest > 4 * total / self.partitions:
+            logger.warning(
+                "external match: largest partition has %d of %d rows; a large group of equal exact "
+                "keys cannot be split across partitions", largest, total
+            )
+
+        empty = np.array([], dtype=np.int64)
+        source_positions = np.concatenate([empty] + source_positions)
+        target_positions = np.concatenate([empty] + target_positions)
+        # Stable, so the several pairs of an aggregate source keep their order
+        order = np.argsort(source_positions, kind="stable")
+        return JoinResult(
+            source_positions=source_positions[order],
+            target_positions=target_positions[order],
+            unmatched_source=np.sort(np.concatenate([empty] + unmatched_source)),
+            unmatched_target=np.sort(np.concatenate([empty] + unmatched_target)),
+            scores=np.concatenate([np.ones(0)] + scores)[order] if fuzzy_rules else None,
+        )
+
+    def close(self) -> None:
+        shutil.rmtree(self.directory, ignore_errors=True)
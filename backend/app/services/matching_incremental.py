@@ -0,0 +1,283 @@
+"""
+Incremental Matching - re-match only the rows that changed since the last run.
+
+Rows only ever pair within their group of equal exact columns, and how a
+group pairs depends only on the match cells of its rows, in order. A run
+keeps, per config, the exact-key group and a digest of the match cells of
+every row on both sides, plus the pairs it produced. The next run hashes
+the tables' rows the same way: groups whose rows are unchanged on both
+sides keep their old pairs (moved to the rows' current positions), and
+only the rows of groups that changed are keyed and matched again. The
+result is the same as a full run.
+
+Tables are rewritten wholesale, so rows are recognised by content rather
+than by row index: appending, editing or deleting a few rows leaves most
+groups clean.
+"""
+import hashlib
+import io
+import json
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .matching_engine import (
+    AggregateRule, FuzzyRule, JoinResult, ToleranceRule, is_fuzzy_column, is_tolerance_column, match_keys,
+    side_keys_from_values
+)
+
+
+# Odd multiplier of the per-group polynomial hash of row digests
+_GROUP_HASH_BASE = np.uint64(0x9E3779B97F4A7C15)
+
+
+class IncrementalState(NamedTuple):
+    """What a run keeps for the next: row fingerprints of both sides and its pairs."""
+    source_groups: np.ndarray    # uint64 hash of each row's exact key
+    source_digests: np.ndarray   # uint64 hash of each row's match cells
+    target_groups: np.ndarray
+    target_digests: np.ndarray
+    source_positions: np.ndarray  # matched pairs, as in JoinResult
+    target_positions: np.ndarray
+    scores: Optional[np.ndarray] = None
+
+
+def state_digest(
+    config,
+    mappings: Dict[int, Dict[str, str]],
+    rules: List[ToleranceRule],
+    fuzzy_rules: List[FuzzyRule],
+    aggregate: Optional[AggregateRule]
+) -> str:
+    """Digest of everything besides the rows that decides a match; a changed digest discards the state."""
+    described = {
+        "tables": [config.source_table_id, config.target_table_id],
+        "mode": config.match_mode or "one_to_one",
+        "columns": [
+            [c.source_column, c.target_column, c.value_mapping_id, bool(c.case_sensitive), c.match_type or "exact"]
+            for c in config.match_columns
+        ],
+        "rules": [list(rule) for rule in rules],
+        "fuzzy": [list(rule) for rule in fuzzy_rules],
+        # time_limit left out: it bounds the search, it does not define the match
+        "aggregate": [aggregate.max_size, aggregate.max_steps] if aggregate else None,
+        "mappings": {str(k): sorted(v.items()) for k, v in mappings.items()},
+    }
+    return hashlib.sha256(json.dumps(described, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _cell_digests(raw_values: List[List[Optional[str]]], count: int) -> np.ndarray:
+    """Hash of each row's match cells, in column order."""
+    digests = np.zeros(count, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for values in raw_values:
+            # categorize=False: hash every cell rather than factorizing first
+            digests = digests * _GROUP_HASH_BASE ^ pd.util.hash_array(np.array(values, dtype=object), categorize=False)
+    return digests
+
+
+def side_fingerprints(
+    raw_values: List[List[Optional[str]]],
+    count: int,
+    match_columns,
+    is_source: bool,
+    mappings: Dict[int, Dict[str, str]],
+    previous_groups: Optional[np.ndarray] = None,
+    previous_digests: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exact-key group hash and match-cell digest of each row of one side.
+
+    Rows whose digest is in the previous fingerprints take their group from
+    there (equal cells give equal keys), so only new rows are keyed.
+    """
+    digests = _cell_digests(raw_values, count)
+    groups = np.zeros(count, dtype=np.uint64)
+
+    unknown = np.arange(count)
+    if previous_digests is not None and len(previous_digests):
+        order = np.argsort(previous_digests, kind="stable")
+        at = np.minimum(np.searchsorted(previous_digests[order], digests), len(order) - 1)
+        known = previous_digests[order[at]] == digests
+        groups[known] = previous_groups[order[at[known]]]
+        unknown = np.flatnonzero(~known)
+
+    exact = [i for i, c in enumerate(match_columns) if not is_tolerance_column(c) and not is_fuzzy_column(c)]
+    keys = side_keys_from_values(
+        _subset([raw_values[i] for i in exact], unknown), len(unknown),
+        [match_columns[i] for i in exact], is_source, mappings
+    ).exact_keys
+    groups[unknown] = pd.util.hash_array(np.array(keys, dtype=object), categorize=False)
+    return groups, digests
+
+
+def _group_signatures(groups: np.ndarray, digests: np.ndarray, order: np.ndarray) -> np.ndarray:
+    """(group, row count, hash of the rows' digests in order) per group, as rows of a uint64 array."""
+    sorted_groups = groups[order]
+    if not len(sorted_groups):
+        return np.zeros((0, 3), dtype=np.uint64)
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    sizes = np.diff(np.r_[starts, len(sorted_groups)])
+    ranks = np.arange(len(sorted_groups)) - np.repeat(starts, sizes)
+    with np.errstate(over="ignore"):
+        terms = digests[order] * np.power(_GROUP_HASH_BASE, ranks.astype(np.uint64))
+    return np.column_stack([sorted_groups[starts], sizes.astype(np.uint64), np.add.reduceat(terms, starts)])
+
+
+def _unmatched_signatures(signatures: np.ndarray, others: np.ndarray) -> np.ndarray:
+    """Groups whose signature is not in others (both sorted by group)."""
+    if not len(others):
+        return signatures[:, 0]
+    at = np.minimum(np.searchsorted(others[:, 0], signatures[:, 0]), len(others) - 1)
+    return signatures[~(others[at] == signatures).all(axis=1), 0]
+
+
+class _SideChange(NamedTuple):
+    """One side's rows before and after, in group order."""
+    old_groups: np.ndarray
+    old_order: np.ndarray
+    new_groups: np.ndarray
+    new_order: np.ndarray
+
+
+def _side_change(old_groups, new_groups) -> _SideChange:
+    return _SideChange(
+        old_groups, np.argsort(old_groups, kind="stable"), new_groups, np.argsort(new_groups, kind="stable")
+    )
+
+
+def _changed_groups(side: _SideChange, old_digests: np.ndarray, new_digests: np.ndarray) -> np.ndarray:
+    """Groups of one side whose rows differ between runs, including groups that appeared or went."""
+    old = _group_signatures(side.old_groups, old_digests, side.old_order)
+    new = _group_signatures(side.new_groups, new_digests, side.new_order)
+    return np.union1d(_unmatched_signatures(new, old), _unmatched_signatures(old, new))
+
+
+def _carried_positions(side: _SideChange, changed: np.ndarray) -> np.ndarray:
+    """New position of each old row in an unchanged group, -1 for the rest."""
+    old_groups, old_order, new_groups, new_order = side
+    old_clean = ~np.isin(old_groups, changed)
+    new_clean = ~np.isin(new_groups, changed)
+    carried = np.full(len(old_groups), -1, dtype=np.int64)
+    # Unchanged groups have the same rows in the same order, so they line up
+    carried[old_order[old_clean[old_order]]] = new_order[new_clean[new_order]]
+    return carried
+
+
+def _subset(raw_values: List[List[Optional[str]]], positions: np.ndarray) -> List[List[Optional[str]]]:
+    indices = positions.tolist()
+    return [[values[i] for i in indices] for values in raw_values]
+
+
+def incremental_join(
+    previous: Optional[IncrementalState],
+    source_values: List[List[Optional[str]]],
+    source_count: int,
+    target_values: List[List[Optional[str]]],
+    target_count: int,
+    match_columns,
+    mappings: Dict[int, Dict[str, str]],
+    rules: List[ToleranceRule],
+    fuzzy_rules: List[FuzzyRule] = (),
+    aggregate: Optional[AggregateRule] = None
+) -> Tuple[JoinResult, IncrementalState, int]:
+    """
+    match_keys over the rows of changed groups, reusing previous pairs for the rest.
+
+    source_values/target_values hold the raw_match_values of each match
+    column. Without a previous state every row is matched. Returns the join,
+    the state for the next run and how many rows were matched again.
+    """
+    empty = np.array([], dtype=np.int64)
+    kept = (empty, empty, np.ones(0))
+    fresh = (empty, empty, np.ones(0))
+
+    if previous is None:
+        # Everything is matched, so the groups come from the match's own keys
+        source_keys = side_keys_from_values(source_values, source_count, match_columns, True, mappings)
+        target_keys = side_keys_from_values(target_values, target_count, match_columns, False, mappings)
+        source_groups = pd.util.hash_array(np.array(source_keys.exact_keys, dtype=object), categorize=False)
+        target_groups = pd.util.hash_array(np.array(target_keys.exact_keys, dtype=object), categorize=False)
+        source_digests = _cell_digests(source_values, source_count)
+        target_digests = _cell_digests(target_values, target_count)
+        s_pos = np.arange(source_count)
+        t_pos = np.arange(target_count)
+        joined = match_keys(source_keys, target_keys, rules, fuzzy_rules, aggregate)
+    else:
+        source_groups, source_digests = side_fingerprints(
+            source_values, source_count, match_columns, True, mappings,
+            previous.source_groups, previous.source_digests
+        )
+        target_groups, target_digests = side_fingerprints(
+            target_values, target_count, match_columns, False, mappings,
+            previous.target_groups, previous.target_digests
+        )
+        source_side = _side_change(previous.source_groups, source_groups)
+        target_side = _side_change(previous.target_groups, target_groups)
+        changed = np.union1d(
+            _changed_groups(source_side, previous.source_digests, source_digests),
+            _changed_groups(target_side, previous.target_digests, target_digests)
+        )
+        source_carried = _carried_positions(source_side, changed)
+        target_carried = _carried_positions(target_side, changed)
+        keep = source_carried[previous.source_positions] >= 0
+        kept = (
+            source_carried[previous.source_positions[keep]],
+            target_carried[previous.target_positions[keep]],
+            previous.scores[keep] if previous.scores is not None else np.ones(int(keep.sum())),
+        )
+
+        s_pos = np.flatnonzero(np.isin(source_groups, changed))
+        t_pos = np.flatnonzero(np.isin(target_groups, changed))
+        joined = None
+        if len(s_pos) and len(t_pos):
+            joined = match_keys(
+                side_keys_from_values(_subset(source_values, s_pos), len(s_pos), match_columns, True, mappings),
+                side_keys_from_values(_subset(target_values, t_pos), len(t_pos), match_columns, False, mappings),
+                rules, fuzzy_rules, aggregate
+            )
+
+    if joined is not None:
+        fresh = (
+            s_pos[joined.source_positions],
+            t_pos[joined.target_positions],
+            joined.scores if joined.scores is not None else np.ones(len(joined.source_positions)),
+        )
+
+    source_positions = np.concatenate([kept[0], fresh[0]])
+    target_positions = np.concatenate([kept[1], fresh[1]])
+    # Stable, so the several pairs of an aggregate source keep their order
+    order = np.argsort(source_positions, kind="stable")
+    source_positions = source_positions[order]
+    target_positions = target_positions[order]
+    scores = np.concatenate([kept[2], fresh[2]])[order] if fuzzy_rules else None
+
+    source_paired = np.zeros(source_count, dtype=bool)
+    source_paired[source_positions] = True
+    target_paired = np.zeros(target_count, dtype=bool)
+    target_paired[target_positions] = True
+    joined = JoinResult(
+        source_positions=source_positions,
+        target_positions=target_positions,
+        unmatched_source=np.flatnonzero(~source_paired),
+        unmatched_target=np.flatnonzero(~target_paired),
+        scores=scores,
+    )
+    state = IncrementalState(
+        source_groups, source_digests, target_groups, target_digests, source_positions, target_positions, scores
+    )
+    return joined, state, len(s_pos) + len(t_pos)
+
+
+def pack_state(state: IncrementalState) -> bytes:
+    """Serialize a state for MatchState.data."""
+    buffer = io.BytesIO()
+    arrays = {name: value for name, value in state._asdict().items() if value is not None}
+    np.savez(buffer, **arrays)
+    return buffer.getvalue()
+
+
+def unpack_state(data: bytes) -> IncrementalState:
+    with np.load(io.BytesIO(data)) as arrays:
+        return IncrementalState(**{name: arrays[name] for name in arrays.files})
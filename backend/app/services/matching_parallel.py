@@ -0,0 +1,275 @@
+"""
+Parallel Matching - the vectorized engine spread over worker processes.
+
+Rows only ever pair within their group of equal exact columns, so groups
+can be matched independently. The API process writes the match columns of
+both tables to Arrow files under shared memory; worker processes map them,
+hash the exact key of every row to a partition (a chunk of rows per
+worker), then key and match each partition on its own. Only row positions
+travel over the pipes. Pairs are mapped back to table positions and merged
+in source order; a partition keeps its rows in table order, so the result
+is the same as a serial run.
+
+Requires pyarrow; without it the "parallel" engine runs serially.
+"""
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, NamedTuple, Optional
+
+import numpy as np
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+from ..config import settings
+from .matching_engine import (
+    AggregateRule, FuzzyRule, JoinResult, ToleranceRule, is_fuzzy_column, is_tolerance_column, key_partitions,
+    match_keys, side_keys_from_values
+)
+
+
+# Partitions per worker, so an unlucky large partition does not hold up the rest
+PARTITIONS_PER_WORKER = 4
+
+
+def parallel_matching_available() -> bool:
+    return pa is not None
+
+
+class ColumnSpec(NamedTuple):
+    """The parts of a MatchColumn that key building reads, for sending to workers."""
+    source_column: str
+    target_column: str
+    value_mapping_id: Optional[int]
+    case_sensitive: bool
+    match_type: Optional[str]
+    tolerance_type: Optional[str]
+
+
+def column_spec(match_col) -> ColumnSpec:
+    return ColumnSpec(
+        match_col.source_column, match_col.target_column, match_col.value_mapping_id,
+        match_col.case_sensitive, match_col.match_type, match_col.tolerance_type
+    )
+
+
+def _write_columns(directory: str, columns: List[List[Optional[str]]]) -> str:
+    """Write raw match column values to an Arrow IPC file; returns its path."""
+    arrays = [pa.array(values, type=pa.large_string()) for values in columns]
+    table = pa.Table.from_arrays(arrays, names=[f"c{i}" for i in range(len(arrays))])
+    fd, path = tempfile.mkstemp(prefix="didp_match_", suffix=".arrow", dir=directory)
+    os.close(fd)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return path
+
+
+def _read_columns(
+    path: str,
+    columns: List[int],
+    positions: Optional[np.ndarray] = None,
+    start: int = 0,
+    count: int = 0
+) -> List[List[Optional[str]]]:
+    """Some columns of a file written by _write_columns, at positions or for a range of rows."""
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all().select(columns)
+    table = table.take(positions) if positions is not None else table.slice(start, count)
+    return [column.to_pylist() for column in table.columns]
+
+
+def _partition_chunk(
+    path: str,
+    start: int,
+    count: int,
+    specs: List[ColumnSpec],
+    is_source: bool,
+    mappings: Dict[int, Dict[str, str]],
+    partitions: int
+) -> np.ndarray:
+    """Worker: the partition of each row of a chunk, from its exact columns."""
+    exact = [i for i, spec in enumerate(specs) if not is_tolerance_column(spec) and not is_fuzzy_column(spec)]
+    raw_values = _read_columns(path, exact, start=start, count=count)
+    keys = side_keys_from_values(raw_values, count, [specs[i] for i in exact], is_source, mappings)
+    return key_partitions(keys.exact_keys, partitions)
+
+
+def _match_partition(
+    source_path: str,
+    source_positions: np.ndarray,
+    target_path: str,
+    target_positions: np.ndarray,
+    specs: List[ColumnSpec],
+    mappings: Dict[int, Dict[str, str]],
+    rules: List[ToleranceRule],
+    fuzzy_rules: List[FuzzyRule],
+    aggregate: Optional[AggregateRule]
+) -> JoinResult:
+    """Worker: build the keys of one partition's rows and match them."""
+    columns = list(range(len(specs)))
+    source = side_keys_from_values(
+        _read_columns(source_path, columns, source_positions), len(source_positions), specs, True, mappings
+    )
+    target = side_keys_from_values(
+        _read_columns(target_path, columns, target_positions), len(target_positions), specs, False, mappings
+    )
+    return match_keys(source, target, rules, fuzzy_rules, aggregate)
+
+
+def _partition_positions(parts: np.ndarray, partitions: int) -> List[np.ndarray]:
+    """Row positions of each partition, in table order."""
+    order = np.argsort(parts, kind="stable")
+    bounds = np.searchsorted(parts[order], np.arange(partitions + 1))
+    return [order[bounds[p]:bounds[p + 1]] for p in range(partitions)]
+
+
+class ParallelMatcher:
+    """Process pool for the "parallel" match engine."""
+
+    def __init__(self, workers: int, directory: str):
+        self.workers = workers
+        self.directory = directory
+        self._executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self) -> None:
+        """Start every worker process now instead of on first use."""
+        for future in [self._executor.submit(int) for _ in range(self.workers)]:
+            future.result()
+
+    def partition(
+        self,
+        path: str,
+        count: int,
+        specs: List[ColumnSpec],
+        is_source: bool,
+        mappings: Dict[int, Dict[str, str]],
+        partitions: int
+    ) -> np.ndarray:
+        """Partition of each row of one side, hashed a chunk per worker."""
+        size = max(1, -(-count // self.workers))
+        futures = [
+            self._executor.submit(
+                _partition_chunk, path, start, min(size, count - start), specs, is_source, mappings, partitions
+            )
+            for start in range(0, count, size)
+        ]
+        return np.concatenate([np.array([], dtype=np.int64)] + [future.result() for future in futures])
+
+    def match(
+        self,
+        source_values: List[List[Optional[str]]],
+        source_count: int,
+        target_values: List[List[Optional[str]]],
+        target_count: int,
+        specs: List[ColumnSpec],
+        mappings: Dict[int, Dict[str, str]],
+        rules: List[ToleranceRule],
+        fuzzy_rules: List[FuzzyRule] = (),
+        aggregate: Optional[AggregateRule] = None
+    ) -> JoinResult:
+        """
+        match_keys over both sides, partitioned by exact key; same result as a serial run.
+
+        source_values/target_values hold the raw_match_values of each match
+        column.
+        """
+        partitions = self.workers * PARTITIONS_PER_WORKER
+        source_path = _write_columns(self.directory, source_values)
+        try:
+            target_path = _write_columns(self.directory, target_values)
+            try:
+                return self._match_files(
+                    source_path, source_count, target_path, target_count, partitions,
+                    specs, mappings, rules, fuzzy_rules, aggregate
+                )
+            finally:
+                os.remove(target_path)
+        finally:
+            os.remove(source_path)
+
+    def _match_files(
+        self,
+        source_path: str,
+        source_count: int,
+        target_path: str,
+        target_count: int,
+        partitions: int,
+        specs: List[ColumnSpec],
+        mappings: Dict[int, Dict[str, str]],
+        rules: List[ToleranceRule],
+        fuzzy_rules: List[FuzzyRule],
+        aggregate: Optional[AggregateRule]
+    ) -> JoinResult:
+        source_parts = self.partition(source_path, source_count, specs, True, mappings, partitions)
+        target_parts = self.partition(target_path, target_count, specs, False, mappings, partitions)
+
+        jobs = []
+        unmatched_source, unmatched_target = [], []
+        for s_pos, t_pos in zip(
+            _partition_positions(source_parts, partitions), _partition_positions(target_parts, partitions)
+        ):
+            if not len(s_pos) or not len(t_pos):
+                unmatched_source.append(s_pos)
+                unmatched_target.append(t_pos)
+                continue
+            future = self._executor.submit(
+                _match_partition, source_path, s_pos, target_path, t_pos,
+                specs, mappings, rules, fuzzy_rules, aggregate
+            )
+            jobs.append((s_pos, t_pos, future))
+
+        source_positions, target_positions, scores = [], [], []
+        for s_pos, t_pos, future in jobs:
+            joined = future.result()
+            source_positions.append(s_pos[joined.source_positions])
+            target_positions.append(t_pos[joined.target_positions])
+            unmatched_source.append(s_pos[joined.unmatched_source])
+            unmatched_target.append(t_pos[joined.unmatched_target])
+            if joined.scores is not None:
+                scores.append(joined.scores)
+
+        empty = np.array([], dtype=np.int64)
+        source_positions = np.concatenate([empty] + source_positions)
+        target_positions = np.concatenate([empty] + target_positions)
+        # Stable, so the several pairs of an aggregate source keep their order
+        order = np.argsort(source_positions, kind="stable")
+        return JoinResult(
+            source_positions=source_positions[order],
+            target_positions=target_positions[order],
+            unmatched_source=np.sort(np.concatenate([empty] + unmatched_source)),
+            unmatched_target=np.sort(np.concatenate([empty] + unmatched_target)),
+            scores=np.concatenate([np.ones(0)] + scores)[order] if fuzzy_rules else None,
+        )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+_matcher: Optional[ParallelMatcher] = None
+_matcher_lock = threading.Lock()
+
+
+def get_parallel_matcher() -> ParallelMatcher:
+    """Get the process-wide parallel matcher, starting its workers on first use"""
+    global _matcher
+    if _matcher is None:
+        with _matcher_lock:
+            if _matcher is None:
+                directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+                _matcher = ParallelMatcher(settings.MATCH_WORKERS or multiprocessing.cpu_count(), directory)
+    return _matcher
+
+
+def close_parallel_matcher() -> None:
+    """Stop the matching workers (application shutdown)"""
+    global _matcher
+    with _matcher_lock:
+        if _matcher is not None:
+            _matcher.close()
+            _matcher = None
@@ -1,7 +1,77 @@
-from typing import List, Dict, Optional
+import logging
+from contextlib import nullcontext
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
 from sqlalchemy.orm import Session
 
-from ..models import MatchConfig, MatchColumn, MatchResult, Table, TableColumn, TableRow, ValueMapping
+from ..config import settings
+from ..models import MatchConfig, MatchColumn, MatchResult, MatchState, Table
+from .match_results import (
+    IndexedPairs, IndexedRows, ResultRowLoader, row_hashes, save_indexed_match_result, save_match_result
+)
+from .matching_diagnostics import MatchDiagnostics, pass_diagnostics
+from .matching_engine import (
+    TOLERANCE_TYPES, AggregateRule, FuzzyRule, JoinResult, ToleranceRule, column_positions, is_fuzzy_column,
+    is_tolerance_column, match_keys, paused_gc, raw_match_values, side_keys_from_values
+)
+from .matching_external import ExternalJoin, partition_count
+from .matching_incremental import incremental_join, pack_state, state_digest, unpack_state
+from .matching_parallel import column_spec, get_parallel_matcher, parallel_matching_available
+from .table_store import fetch_indexed_rows, iter_indexed_rows, table_columns
+from .value_mapping_cache import get_value_mapping_cache
+
+
+logger = logging.getLogger(__name__)
+
+MATCH_ENGINES = ("vectorized", "parallel", "external", "legacy")
+MATCH_TYPES = ("exact", "tolerance", "fuzzy")
+MATCH_MODES = ("one_to_one", "aggregate")
+
+
+def validate_match_columns(match_columns) -> None:
+    """Check the match type and tolerance settings of match columns; raises ValueError"""
+    for col in match_columns:
+        match_type = col.match_type or "exact"
+        if match_type not in MATCH_TYPES:
+            raise ValueError(f"Unknown match_type '{match_type}'. Use one of: {', '.join(MATCH_TYPES)}")
+        if match_type == "tolerance":
+            if col.tolerance_type not in TOLERANCE_TYPES:
+                raise ValueError(
+                    f"Column '{col.source_column}' needs a tolerance_type: {', '.join(TOLERANCE_TYPES)}"
+                )
+            if col.tolerance is None or col.tolerance < 0:
+                raise ValueError(f"Column '{col.source_column}' needs a tolerance of 0 or more")
+        if match_type == "fuzzy" and col.fuzzy_threshold is not None and not 0 < col.fuzzy_threshold <= 1:
+            raise ValueError(f"Column '{col.source_column}' needs a fuzzy_threshold above 0 and at most 1")
+
+
+def match_passes(match_columns) -> List[list]:
+    """Match columns grouped by pass_index, in pass order"""
+    passes = {}
+    for col in match_columns:
+        passes.setdefault(col.pass_index or 0, []).append(col)
+    return [passes[index] for index in sorted(passes)]
+
+
+def validate_match_config(match_mode: Optional[str], aggregate_max_size: Optional[int], match_columns) -> None:
+    """Check the match mode of a config against the match columns of each pass; raises ValueError"""
+    validate_match_columns(match_columns)
+    if any((col.pass_index or 0) < 0 for col in match_columns):
+        raise ValueError("pass_index must be 0 or more")
+    match_mode = match_mode or "one_to_one"
+    if match_mode not in MATCH_MODES:
+        raise ValueError(f"Unknown match_mode '{match_mode}'. Use one of: {', '.join(MATCH_MODES)}")
+    if match_mode == "aggregate":
+        for columns in match_passes(match_columns):
+            amounts = [c for c in columns if (c.match_type or "exact") != "exact"]
+            if len(amounts) != 1 or amounts[0].match_type != "tolerance" or amounts[0].tolerance_type == "days":
+                raise ValueError(
+                    "Aggregate matching needs exactly one amount column with an absolute or percent "
+                    "tolerance in each pass; the other columns must be exact"
+                )
+        if aggregate_max_size is not None and aggregate_max_size < 2:
+            raise ValueError("aggregate_max_size must be at least 2")
 
 
 class MatchingService:
@@ -9,36 +79,501 @@ class MatchingService:
 
     def __init__(self, db: Session):
         self.db = db
-
-    def execute_match(self, config: MatchConfig) -> MatchResult:
+        # Rows of the last executed match's tables, for building its response
+        self.row_loader = ResultRowLoader(db)
+        # Whether the last executed match streamed its tables ("external" engine): its
+        # rows were never all in memory and are paged from the stored result instead
+        self.streamed = False
+        # Diagnostics report of the last executed match, when asked for
+        self.diagnostics: Optional[dict] = None
+        self._diagnostics: Optional[MatchDiagnostics] = None
+
+    def execute_match(
+        self,
+        config: MatchConfig,
+        engine: Optional[str] = None,
+        incremental: bool = False,
+        diagnostics: bool = False
+    ) -> MatchResult:
         """
-        Execute matching between source and target tables.
-
-        Algorithm:
-        1. Load source and target table data
-        2. Build index of target rows by match key
-        3. For each source row, create match key and lookup in target index
-        4. Track matched pairs and unmatched rows
-        5. Store and return results
+        Execute matching between source and target tables and store the result; raises ValueError.
+
+        engine: "vectorized", "parallel", "external" or "legacy" (default MATCH_ENGINE)
+        incremental: re-match only what changed since the config's last incremental run (vectorized, parallel)
+        diagnostics: leave a key and timing report in self.diagnostics (vectorized, parallel, not incremental)
         """
-        # Load source table data
+        engine = engine or settings.MATCH_ENGINE
+        if engine not in MATCH_ENGINES:
+            raise ValueError(f"Unknown match engine '{engine}'. Use one of: {', '.join(MATCH_ENGINES)}")
+        validate_match_config(config.match_mode, config.aggregate_max_size, config.match_columns)
+        if engine == "legacy" and any(
+            is_tolerance_column(c) or is_fuzzy_column(c) for c in config.match_columns
+        ):
+            raise ValueError("The legacy engine supports exact match columns only")
+        if engine == "legacy" and config.match_mode == "aggregate":
+            raise ValueError("The legacy engine supports one-to-one matching only")
+        if incremental and engine not in ("vectorized", "parallel"):
+            raise ValueError("Incremental matching needs the vectorized or parallel engine")
+        if (incremental or engine in ("external", "legacy")) and len(match_passes(config.match_columns)) > 1:
+            raise ValueError("Configs with several passes need the vectorized or parallel engine, not incremental")
+        if diagnostics and (incremental or engine not in ("vectorized", "parallel")):
+            raise ValueError("Diagnostics need the vectorized or parallel engine, not incremental")
+        self._diagnostics = MatchDiagnostics() if diagnostics else None
+        self.diagnostics = None
+        self.streamed = engine == "external"
+
         source_table = self.db.query(Table).filter(Table.id == config.source_table_id).first()
         target_table = self.db.query(Table).filter(Table.id == config.target_table_id).first()
 
         if not source_table or not target_table:
             raise ValueError("Source or target table not found")
 
-        source_columns = [c.name for c in sorted(source_table.columns, key=lambda x: x.index)]
-        target_columns = [c.name for c in sorted(target_table.columns, key=lambda x: x.index)]
+        source_columns = table_columns(source_table)
+        target_columns = table_columns(target_table)
+        if engine == "external":
+            pairs, unmatched_source, unmatched_target = self._match_rows_external(
+                config, source_table, source_columns, target_table, target_columns
+            )
+            return save_indexed_match_result(
+                self.db, config, source_table, target_table, pairs, unmatched_source, unmatched_target
+            )
+
+        with self._phase("load"):
+            source_indices, source_data = fetch_indexed_rows(self.db, source_table)
+            target_indices, target_data = fetch_indexed_rows(self.db, target_table)
+
+        if incremental:
+            matched_pairs, unmatched_source, unmatched_target = self._match_rows_incremental(
+                config,
+                source_indices, source_data, source_columns,
+                target_indices, target_data, target_columns
+            )
+        elif engine == "legacy":
+            matched_pairs, unmatched_source, unmatched_target = self._match_rows_legacy(
+                config,
+                list(zip(source_indices, source_data)), source_columns,
+                list(zip(target_indices, target_data)), target_columns
+            )
+        else:
+            matched_pairs, unmatched_source, unmatched_target = self._match_rows_vectorized(
+                config,
+                source_indices, source_data, source_columns,
+                target_indices, target_data, target_columns,
+                parallel=engine == "parallel"
+            )
+        with self._phase("persist"):
+            result = self._save_result(
+                config, source_table, target_table, matched_pairs, unmatched_source, unmatched_target
+            )
+        if self._diagnostics:
+            self.diagnostics = self._diagnostics.report()
+            logger.info(
+                "match diagnostics of config %s: %s ms, candidate pairs per pass %s", config.id,
+                self.diagnostics["total_ms"], [p["candidate_pairs"] for p in self.diagnostics["passes"]]
+            )
+        return result
+
+    def _phase(self, name: str):
+        """Time a block as a phase of the diagnostics, when collected"""
+        return self._diagnostics.phase(name) if self._diagnostics else nullcontext()
+
+    def _save_result(
+        self,
+        config: MatchConfig,
+        source_table: Table,
+        target_table: Table,
+        matched_pairs: List[dict],
+        unmatched_source: List[dict],
+        unmatched_target: List[dict]
+    ) -> MatchResult:
+        """Store a match run as row indexes, keeping its rows in row_loader for the response"""
+        source_rows = {item["row_index"]: item["row"] for item in unmatched_source}
+        target_rows = {item["row_index"]: item["row"] for item in unmatched_target}
+        for pair in matched_pairs:
+            source_rows[pair["source_row_index"]] = pair["source_row"]
+            target_rows[pair["target_row_index"]] = pair["target_row"]
+        # Every row is matched or unmatched, so these are whole tables
+        self.row_loader.add(source_table.id, source_rows)
+        self.row_loader.add(target_table.id, target_rows)
+        return save_match_result(
+            self.db, config, source_table, target_table, matched_pairs, unmatched_source, unmatched_target
+        )
+
+    def _match_rules(
+        self,
+        config: MatchConfig,
+        match_columns: List[MatchColumn]
+    ) -> Tuple[List[ToleranceRule], List[FuzzyRule], Optional[AggregateRule]]:
+        """
+        Tolerance, fuzzy and aggregate rules of match columns (one pass), with settings for unset values.
+
+        Tolerance columns pair numbers within an absolute or percentage
+        tolerance, or dates within a day window: rows equal on every column
+        pair first, the rest with the nearest target inside the tolerance.
+        Fuzzy columns pair similar texts, ignoring case, punctuation and
+        spellings like LIMITED/LTD (trigram candidates within groups of
+        equal exact columns, Dice similarity of at least fuzzy_threshold, best
+        first), and their pairs carry a score. match_mode "aggregate" then
+        pairs a source row with several leftover targets of its group whose
+        amounts sum to its own, up to aggregate_max_size of them.
+        """
+        rules = [
+            ToleranceRule(c.tolerance_type, c.tolerance)
+            for c in match_columns if is_tolerance_column(c)
+        ]
+        fuzzy_rules = [
+            FuzzyRule(c.fuzzy_threshold if c.fuzzy_threshold is not None else settings.MATCH_FUZZY_THRESHOLD)
+            for c in match_columns if is_fuzzy_column(c)
+        ]
+
+        aggregate = None
+        if config.match_mode == "aggregate":
+            aggregate = AggregateRule(
+                rules[0],
+                config.aggregate_max_size or settings.MATCH_AGGREGATE_MAX_SIZE,
+                settings.MATCH_AGGREGATE_MAX_STEPS,
+                settings.MATCH_AGGREGATE_TIME_LIMIT
+            )
+        return rules, fuzzy_rules, aggregate
+
+    def _match_rows_vectorized(
+        self,
+        config: MatchConfig,
+        source_indices: List[int],
+        source_data: List[List[str]],
+        source_columns: List[str],
+        target_indices: List[int],
+        target_data: List[List[str]],
+        target_columns: List[str],
+        parallel: bool = False
+    ) -> Tuple[List[dict], List[dict], List[dict]]:
+        """
+        Build keys for whole tables at once and pair them with a hash join (then tolerance/fuzzy), pass by pass.
 
-        source_rows = [(r.row_index, r.data) for r in sorted(source_table.data_rows, key=lambda x: x.row_index)]
-        target_rows = [(r.row_index, r.data) for r in sorted(target_table.data_rows, key=lambda x: x.row_index)]
+        With parallel, passes with exact columns are partitioned by them and
+        matched on MATCH_WORKERS processes, with identical results.
+        """
+        mappings = self._load_value_mappings(config.match_columns)
+        passes = match_passes(config.match_columns)
+        parallel = (
+            parallel
+            and parallel_matching_available()
+            and len(source_data) + len(target_data) >= settings.MATCH_PARALLEL_MIN_ROWS
+        )
+        source_positions = column_positions(source_columns)
+        target_positions = column_positions(target_columns)
+        # Cells of each column, read once and shared by the passes that use it
+        raw_values = {}
+
+        def values(match_col: MatchColumn, is_source: bool, rows_left: np.ndarray) -> List[Optional[str]]:
+            column = match_col.source_column if is_source else match_col.target_column
+            if (column, is_source) not in raw_values:
+                raw_values[column, is_source] = raw_match_values(
+                    source_data if is_source else target_data,
+                    source_positions if is_source else target_positions,
+                    match_col, is_source
+                )
+            cells = raw_values[column, is_source]
+            if len(rows_left) == len(cells):
+                return cells
+            return [cells[i] for i in rows_left.tolist()]
+
+        with paused_gc():
+            source_left = np.arange(len(source_data))
+            target_left = np.arange(len(target_data))
+            pairs = []
+            for columns in passes:
+                if not len(source_left) or not len(target_left):
+                    break
+                joined = self._match_pass(
+                    config, columns,
+                    [values(c, True, source_left) for c in columns], len(source_left),
+                    [values(c, False, target_left) for c in columns], len(target_left),
+                    mappings, parallel
+                )
+                pairs.append((
+                    source_left[joined.source_positions],
+                    target_left[joined.target_positions],
+                    joined.scores
+                ))
+                source_left = source_left[joined.unmatched_source]
+                target_left = target_left[joined.unmatched_target]
+
+            with self._phase("rows"):
+                if len(pairs) == 1 and len(passes) == 1:
+                    s_pos, t_pos, scores = pairs[0]
+                    joined = JoinResult(s_pos, t_pos, source_left, target_left, scores)
+                    return self._result_rows(joined, source_indices, source_data, target_indices, target_data)
+                return self._waterfall_rows(
+                    passes, pairs, source_left, target_left, source_indices, source_data, target_indices, target_data
+                )
+
+    def _match_pass(
+        self,
+        config: MatchConfig,
+        columns: List[MatchColumn],
+        source_values: List[List[Optional[str]]],
+        source_count: int,
+        target_values: List[List[Optional[str]]],
+        target_count: int,
+        mappings: Dict[int, Dict[str, str]],
+        parallel: bool
+    ) -> JoinResult:
+        """
+        One pass of a match over the raw_match_values of its columns.
+
+        When diagnosing, records the distinct, duplicate, blank and colliding
+        exact keys of each side and the keys with the largest groups.
+        """
+        rules, fuzzy_rules, aggregate = self._match_rules(config, columns)
+        exact = [i for i, c in enumerate(columns) if not is_tolerance_column(c) and not is_fuzzy_column(c)]
+        # Partitions follow the exact columns, so without any there is nothing to split
+        if parallel and exact:
+            # Keys are built in the worker processes, so key_build is part of join here
+            with self._phase("join"):
+                joined = get_parallel_matcher().match(
+                    source_values, source_count, target_values, target_count,
+                    [column_spec(c) for c in columns],
+                    mappings, rules, fuzzy_rules, aggregate
+                )
+            source_keys = target_keys = None
+        else:
+            with self._phase("key_build"):
+                source_keys = side_keys_from_values(source_values, source_count, columns, True, mappings)
+                target_keys = side_keys_from_values(target_values, target_count, columns, False, mappings)
+            with self._phase("join"):
+                joined = match_keys(source_keys, target_keys, rules, fuzzy_rules, aggregate)
+
+        if self._diagnostics:
+            with self._phase("diagnostics"):
+                exact_columns = [columns[i] for i in exact]
+                source_exact = [source_values[i] for i in exact]
+                target_exact = [target_values[i] for i in exact]
+                if source_keys is None:
+                    source_keys = side_keys_from_values(source_exact, source_count, exact_columns, True, mappings)
+                    target_keys = side_keys_from_values(target_exact, target_count, exact_columns, False, mappings)
+                self._diagnostics.passes.append(pass_diagnostics(
+                    columns[0].pass_index or 0, source_keys.exact_keys, target_keys.exact_keys,
+                    source_exact, target_exact, settings.MATCH_DIAGNOSTICS_TOP_KEYS
+                ))
+        return joined
+
+    def _waterfall_rows(
+        self,
+        passes: List[List[MatchColumn]],
+        pairs: List[Tuple[np.ndarray, np.ndarray, Optional[np.ndarray]]],
+        unmatched_source: np.ndarray,
+        unmatched_target: np.ndarray,
+        source_indices: List[int],
+        source_data: List[List[str]],
+        target_indices: List[int],
+        target_data: List[List[str]]
+    ) -> Tuple[List[dict], List[dict], List[dict]]:
+        """
+        Result rows of a match run in passes; pairs carry their pass_index and, from fuzzy passes, a score.
+
+        Columns with different pass_index values form a waterfall: each pass
+        matches, on its own columns, only the rows earlier passes left unmatched.
+        """
+        empty = np.array([], dtype=np.int64)
+        source_positions = np.concatenate([empty] + [p[0] for p in pairs])
+        target_positions = np.concatenate([empty] + [p[1] for p in pairs])
+        pass_indices = np.concatenate(
+            [empty] + [np.full(len(p[0]), passes[i][0].pass_index or 0) for i, p in enumerate(pairs)]
+        )
+        scores = None
+        if any(p[2] is not None for p in pairs):
+            scores = np.concatenate(
+                [np.ones(0)] + [p[2] if p[2] is not None else np.full(len(p[0]), np.nan) for p in pairs]
+            )
+        # Stable, so the several pairs of an aggregate source keep their order
+        order = np.argsort(source_positions, kind="stable")
+        joined = JoinResult(
+            source_positions=source_positions[order],
+            target_positions=target_positions[order],
+            unmatched_source=np.sort(unmatched_source),
+            unmatched_target=np.sort(unmatched_target),
+            scores=scores[order] if scores is not None else None,
+        )
+        rows = self._result_rows(joined, source_indices, source_data, target_indices, target_data)
+        for pair, pass_index in zip(rows[0], pass_indices[order].tolist()):
+            pair["pass_index"] = pass_index
+        return rows
+
+    def _match_rows_incremental(
+        self,
+        config: MatchConfig,
+        source_indices: List[int],
+        source_data: List[List[str]],
+        source_columns: List[str],
+        target_indices: List[int],
+        target_data: List[List[str]],
+        target_columns: List[str]
+    ) -> Tuple[List[dict], List[dict], List[dict]]:
+        """
+        Re-match the groups that changed since the config's stored state, then store the new state.
+
+        The state holds row fingerprints and pairs; only exact-key groups that
+        changed on either side are matched again, and the other pairs are
+        reused, with the same result as a full run.
+        """
+        mappings = self._load_value_mappings(config.match_columns)
+        rules, fuzzy_rules, aggregate = self._match_rules(config, config.match_columns)
+        digest = state_digest(config, mappings, rules, fuzzy_rules, aggregate)
+        stored = self.db.query(MatchState).filter(MatchState.config_id == config.id).first()
+        previous = unpack_state(stored.data) if stored and stored.digest == digest else None
+
+        with paused_gc():
+            source_positions = column_positions(source_columns)
+            target_positions = column_positions(target_columns)
+            joined, state, rematched = incremental_join(
+                previous,
+                [raw_match_values(source_data, source_positions, c, True) for c in config.match_columns],
+                len(source_data),
+                [raw_match_values(target_data, target_positions, c, False) for c in config.match_columns],
+                len(target_data),
+                config.match_columns, mappings, rules, fuzzy_rules, aggregate
+            )
+            rows = self._result_rows(joined, source_indices, source_data, target_indices, target_data)
+        logger.info(
+            "incremental match of config %s: %d of %d rows matched again%s", config.id, rematched,
+            len(source_data) + len(target_data), "" if previous else " (no usable state)"
+        )
+
+        if stored is None:
+            stored = MatchState(config_id=config.id)
+            self.db.add(stored)
+        stored.digest = digest
+        stored.data = pack_state(state)
+        return rows
+
+    def _result_rows(
+        self,
+        joined: JoinResult,
+        source_indices: List[int],
+        source_data: List[List[str]],
+        target_indices: List[int],
+        target_data: List[List[str]]
+    ) -> Tuple[List[dict], List[dict], List[dict]]:
+        """Matched pairs and unmatched rows of a join, with their row data"""
+        matched_pairs = [
+            {
+                "source_row_index": source_indices[s],
+                "target_row_index": target_indices[t],
+                "source_row": source_data[s],
+                "target_row": target_data[t]
+            }
+            for s, t in zip(joined.source_positions.tolist(), joined.target_positions.tolist())
+        ]
+        if joined.scores is not None:
+            for pair, score in zip(matched_pairs, joined.scores.tolist()):
+                # NaN: a pair from a pass without fuzzy columns
+                if score == score:
+                    pair["score"] = round(score, 4)
+        unmatched_source = [
+            {"row_index": source_indices[s], "row": source_data[s]}
+            for s in joined.unmatched_source.tolist()
+        ]
+        unmatched_target = [
+            {"row_index": target_indices[t], "row": target_data[t]}
+            for t in joined.unmatched_target.tolist()
+        ]
+        return matched_pairs, unmatched_source, unmatched_target
+
+    def _match_rows_external(
+        self,
+        config: MatchConfig,
+        source_table: Table,
+        source_columns: List[str],
+        target_table: Table,
+        target_columns: List[str]
+    ) -> Tuple[IndexedPairs, IndexedRows, IndexedRows]:
+        """
+        Match key partitions spilled to disk, streaming the tables instead of loading them.
+
+        Each table is read twice, a MATCH_CHUNK_ROWS batch at a time: once to
+        spill its match columns, once to turn the result's positions into row
+        indexes and hash the unmatched rows. Partitions are sized to
+        MATCH_MEMORY_BUDGET_MB, and no row data is kept.
+        The aggregate search time limit applies per partition.
+        """
+        mappings = self._load_value_mappings(config.match_columns)
+        rules, fuzzy_rules, aggregate = self._match_rules(config, config.match_columns)
+        batch_size = settings.MATCH_CHUNK_ROWS
+        partitions = partition_count(
+            (source_table.row_count or 0) + (target_table.row_count or 0),
+            len(config.match_columns), settings.MATCH_MEMORY_BUDGET_MB
+        )
+
+        join = ExternalJoin(config.match_columns, mappings, partitions, settings.MATCH_SPILL_DIR)
+        try:
+            join.spill(iter_indexed_rows(self.db, source_table, batch_size), source_columns, True)
+            join.spill(iter_indexed_rows(self.db, target_table, batch_size), target_columns, False)
+            joined = join.match(rules, fuzzy_rules, aggregate)
+        finally:
+            join.close()
+
+        source_rows, unmatched_source = self._stream_positions(
+            source_table, batch_size, joined.source_positions, joined.unmatched_source
+        )
+        target_rows, unmatched_target = self._stream_positions(
+            target_table, batch_size, joined.target_positions, joined.unmatched_target
+        )
+        return IndexedPairs(source_rows, target_rows, joined.scores), unmatched_source, unmatched_target
+
+    def _stream_positions(
+        self,
+        table: Table,
+        batch_size: int,
+        paired: np.ndarray,
+        unmatched: np.ndarray
+    ) -> Tuple[np.ndarray, IndexedRows]:
+        """Row indexes of paired positions (in their order) and of unmatched ones (sorted), streaming the table"""
+        order = np.argsort(paired, kind="stable")
+        sorted_paired = paired[order]
+        paired_rows = np.empty(len(paired), dtype=np.int64)
+        unmatched_rows = np.empty(len(unmatched), dtype=np.int64)
+        hashes = np.empty(len(unmatched), dtype=np.int64)
+        start = 0
+        for row_indices, rows in iter_indexed_rows(self.db, table, batch_size):
+            end = start + len(rows)
+            row_indices = np.asarray(row_indices, dtype=np.int64)
+            lo, hi = np.searchsorted(sorted_paired, [start, end])
+            paired_rows[order[lo:hi]] = row_indices[sorted_paired[lo:hi] - start]
+            lo, hi = np.searchsorted(unmatched, [start, end])
+            local = (unmatched[lo:hi] - start).tolist()
+            unmatched_rows[lo:hi] = row_indices[local]
+            hashes[lo:hi] = row_hashes([rows[i] for i in local])
+            start = end
+        return paired_rows, IndexedRows(unmatched_rows, hashes)
+
+    def _load_value_mappings(self, match_columns: List[MatchColumn]) -> Dict[int, Dict[str, str]]:
+        """Forward dicts of the mappings used by the match columns"""
+        cache = get_value_mapping_cache()
+        mappings = {}
+        for match_col in match_columns:
+            mapping_id = match_col.value_mapping_id
+            if mapping_id and mapping_id not in mappings:
+                mapping = cache.get(self.db, mapping_id)
+                mappings[mapping_id] = mapping.forward if mapping else {}
+        return mappings
+
+    def _match_rows_legacy(
+        self,
+        config: MatchConfig,
+        source_rows: List[tuple],
+        source_columns: List[str],
+        target_rows: List[tuple],
+        target_columns: List[str]
+    ) -> Tuple[List[dict], List[dict], List[dict]]:
+        """Original row-by-row matching loop, kept for comparison"""
+        mappings = self._load_value_mappings(config.match_columns)
 
         # Build target index
         target_index: Dict[str, List[tuple]] = {}
         for row_idx, row_data in target_rows:
             key = self._create_match_key(
-                row_data, target_columns, config.match_columns, is_source=False
+                row_data, target_columns, config.match_columns, mappings, is_source=False
             )
             if key not in target_index:
                 target_index[key] = []
@@ -51,7 +586,7 @@ class MatchingService:
 
         for source_row_idx, source_row_data in source_rows:
             key = self._create_match_key(
-                source_row_data, source_columns, config.match_columns, is_source=True
+                source_row_data, source_columns, config.match_columns, mappings, is_source=True
             )
 
             if key in target_index and target_index[key]:
@@ -79,28 +614,14 @@ class MatchingService:
             if row_idx not in matched_target_indices
         ]
 
-        # Create and save result
-        result = MatchResult(
-            config_id=config.id,
-            matched_count=len(matched_pairs),
-            unmatched_source_count=len(unmatched_source),
-            unmatched_target_count=len(unmatched_target),
-            matched_pairs=matched_pairs,
-            unmatched_source=unmatched_source,
-            unmatched_target=unmatched_target
-        )
-
-        self.db.add(result)
-        self.db.commit()
-        self.db.refresh(result)
-
-        return result
+        return matched_pairs, unmatched_source, unmatched_target
 
     def _create_match_key(
         self,
         row: List[str],
         columns: List[str],
         match_columns: List[MatchColumn],
+        mappings: Dict[int, Dict[str, str]],
         is_source: bool
     ) -> str:
         """Create composite key for matching"""
@@ -125,7 +646,7 @@ class MatchingService:
 
             # Apply value mapping if specified (only for source side)
             if is_source and match_col.value_mapping_id:
-                value = self._apply_value_mapping(match_col.value_mapping_id, value)
+                value = mappings[match_col.value_mapping_id].get(value, value)
 
             # Normalize value
             value = self._normalize_value(value, match_col.case_sensitive)
@@ -147,11 +668,3 @@ class MatchingService:
             value = value.upper()
 
         return value
-
-    def _apply_value_mapping(self, mapping_id: int, value: str) -> str:
-        """Apply value mapping transformation"""
-        mapping = self.db.query(ValueMapping).filter(ValueMapping.id == mapping_id).first()
-        if not mapping:
-            return value
-
-        return mapping.mappings.get(value, value)
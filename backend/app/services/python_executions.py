@@ -0,0 +1,111 @@
+"""
+Python Executions - streamed script runs and their cancellation.
+
+A streamed execution runs on a background thread and publishes output and
+progress events into a bounded queue that the HTTP response drains as
+Server-Sent Events. If the client reads too slowly, output/progress events
+are dropped (and counted) rather than buffered without limit; the final
+result always carries the complete captured output. Running executions are
+registered by id so they can be cancelled from another request.
+"""
+import json
+import queue
+import threading
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from ..config import settings
+
+
+# Run function for a stream: (on_event, cancel_event) -> final result payload
+ExecutionRunner = Callable[[Callable[[str, Any], None], threading.Event], Dict[str, Any]]
+
+_END = "end"
+
+
+class ExecutionStream:
+    """Bounded event queue and cancel flag for one streamed execution."""
+
+    def __init__(self, buffer_size: int):
+        self.id = uuid.uuid4().hex
+        self.cancel_event = threading.Event()
+        self.dropped = 0
+        self._queue: "queue.Queue[Tuple[str, Any]]" = queue.Queue(maxsize=buffer_size)
+        self._unreported_drops = 0
+
+    def emit(self, kind: str, payload: Any) -> None:
+        """Queue an output/progress event, dropping it if the client is behind."""
+        if self._unreported_drops:
+            try:
+                self._queue.put_nowait(("dropped", {"count": self._unreported_drops}))
+                self._unreported_drops = 0
+            except queue.Full:
+                pass
+        try:
+            self._queue.put_nowait((kind, payload))
+        except queue.Full:
+            self.dropped += 1
+            self._unreported_drops += 1
+
+    def finish(self, kind: str, payload: Any) -> None:
+        """Queue the final event; waits for room, unless the client is gone."""
+        for event in ((kind, payload), (_END, None)):
+            while True:
+                try:
+                    self._queue.put(event, timeout=1)
+                    break
+                except queue.Full:
+                    if self.cancel_event.is_set():
+                        return
+
+    def events(self, keepalive: float) -> Iterator[Optional[Tuple[str, Any]]]:
+        """Events until the run ends; None after `keepalive` seconds of silence."""
+        while True:
+            try:
+                event = self._queue.get(timeout=keepalive)
+            except queue.Empty:
+                yield None
+                continue
+            if event[0] == _END:
+                return
+            yield event
+
+
+_streams: Dict[str, ExecutionStream] = {}
+_streams_lock = threading.Lock()
+
+
+def start_execution_stream(run: ExecutionRunner) -> ExecutionStream:
+    """Start `run` on a background thread, streaming its events."""
+    stream = ExecutionStream(settings.PYTHON_STREAM_BUFFER_EVENTS)
+    with _streams_lock:
+        _streams[stream.id] = stream
+
+    def target() -> None:
+        try:
+            result = run(stream.emit, stream.cancel_event)
+            result['dropped_events'] = stream.dropped
+            stream.finish("result", result)
+        except Exception as e:
+            stream.finish("error", {"error": str(e)})
+        finally:
+            with _streams_lock:
+                _streams.pop(stream.id, None)
+
+    threading.Thread(target=target, name=f"python-stream-{stream.id[:8]}", daemon=True).start()
+    return stream
+
+
+def cancel_execution(execution_id: str) -> bool:
+    """Cancel a running streamed execution; False if it is unknown or finished."""
+    with _streams_lock:
+        stream = _streams.get(execution_id)
+    if stream is None:
+        return False
+    stream.cancel_event.set()
+    return True
+
+
+def format_sse(kind: str, payload: Any) -> str:
+    """One Server-Sent Event with a JSON payload."""
+    return f"event: {kind}\ndata: {json.dumps(payload)}\n\n"
@@ -1,20 +1,32 @@
 """
 Python Executor Service - executes Python scripts against table data.
 """
-import sys
+import logging
+import threading
 import time
 import traceback
-from io import StringIO
 from typing import List, Dict, Any, Optional
-from contextlib import redirect_stdout, redirect_stderr
 
 from sqlalchemy.orm import Session
 import pandas as pd
-import numpy as np
 
 from ..models import Table
 from ..config import settings
-from .formula_engine import ExcelFormulaEngine
+from .formula_engine import MappingLoader
+from .python_runtime import EventCallback, LazyTables, TableLoader, run_script, script_digest
+from .python_result_cache import get_result_cache
+from .table_store import fetch_rows, table_columns, table_version, write_table
+from .python_worker_pool import (
+    get_worker_pool, ScriptTimeoutError, WorkerCrashedError, ScriptCancelledError
+)
+from .python_shared_tables import get_shared_table_store, shared_tables_available
+from .python_result_store import get_result_store, frame_columns, frame_page, frame_display_rows
+from .value_mapping_cache import get_value_mapping_cache
+
+
+logger = logging.getLogger(__name__)
+
+RESULT_FORMATS = ("rows", "columnar")
 
 
 class PythonExecutorService:
@@ -22,12 +34,23 @@ class PythonExecutorService:
 
     def __init__(self, db: Session):
         self.db = db
+        # Version of each table read by the current script, for result memoization
+        self._accessed_versions: Dict[str, Any] = {}
+        # Whether the current script looked up value mappings (not memoized)
+        self._used_mappings = False
 
     def execute_script(
         self,
         script: str,
         table_keys: Optional[List[str]] = None,
-        timeout_seconds: int = 30
+        timeout_seconds: Optional[int] = None,
+        deterministic: bool = False,
+        result_format: str = "rows",
+        target_table_key: Optional[str] = None,
+        target_table_name: Optional[str] = None,
+        replace_target: bool = False,
+        on_event: Optional[EventCallback] = None,
+        cancel_event: Optional[threading.Event] = None
     ) -> Dict[str, Any]:
         """
         Execute Python script with access to table data.
@@ -35,133 +58,237 @@ class PythonExecutorService:
         The script has access to:
         - pandas as pd
         - numpy as np
-        - tables: dict of DataFrames keyed by table_key
-        - excel: ExcelFormulaEngine instance
+        - tables: mapping of DataFrames keyed by table_key, each loaded on
+          first access; tables.load(key, columns=[...]) loads only some columns
+        - excel: ExcelFormulaEngine instance, with the app's value mappings
+          (excel.map_value(mapping, value) by mapping id or name)
         - print() output is captured
 
+        Scripts run on a warm worker process and are stopped after
+        timeout_seconds (default PYTHON_EXECUTION_TIMEOUT); with
+        PYTHON_WORKER_POOL_SIZE = 0 they run in-process without a limit.
+
+        With deterministic=True a successful result is memoized by script
+        source and reused, without running the script, until a table it read
+        changes. Runs that used value mappings are not memoized.
+
+        The full `result` is kept server-side under result_id for paging.
+        result_format "rows" returns its first page as strings in
+        result_columns/result_data; "columnar" returns it as `result`, one
+        list of native values per column. With target_table_key the whole
+        result is also saved as an app table.
+
+        on_event receives ("output", text) and ("progress", {...}) events
+        while the script runs. Setting cancel_event stops it: a worker is
+        killed at once, an in-process script at its next print/progress.
+
         Returns:
         - output: captured stdout
         - error: any error message
         - execution_time_ms: time taken
-        - result_data: if script sets 'result' variable, it's returned
+        - result_columns/result_data or result: first page of the result
+        - result_id, result_row_count: handle and size of the full result
+        - saved_table_key, saved_row_count: set when the result was saved
+        - cached: whether the result came from the memo
+        - output_truncated: whether output passed PYTHON_MAX_OUTPUT_SIZE
+        - resources: wall_time_ms, cpu_time_ms and peak_rss_bytes of the
+          run (peak RSS only on worker processes)
         """
         start_time = time.time()
-        output_buffer = StringIO()
-        error_buffer = StringIO()
+        timeout = timeout_seconds or settings.PYTHON_EXECUTION_TIMEOUT
+        self._accessed_versions = {}
+        self._used_mappings = False
+        cache_key = None
+        result = None
 
         try:
-            # Load tables as DataFrames
-            tables = self._load_tables_as_dataframes(table_keys)
-
-            # Create Excel formula engine
-            excel = ExcelFormulaEngine()
-
-            # Create restricted globals
-            safe_globals = {
-                '__builtins__': {
-                    'print': print,
-                    'len': len,
-                    'range': range,
-                    'enumerate': enumerate,
-                    'zip': zip,
-                    'map': map,
-                    'filter': filter,
-                    'sorted': sorted,
-                    'reversed': reversed,
-                    'list': list,
-                    'dict': dict,
-                    'set': set,
-                    'tuple': tuple,
-                    'str': str,
-                    'int': int,
-                    'float': float,
-                    'bool': bool,
-                    'sum': sum,
-                    'min': min,
-                    'max': max,
-                    'abs': abs,
-                    'round': round,
-                    'isinstance': isinstance,
-                    'type': type,
-                    'getattr': getattr,
-                    'hasattr': hasattr,
-                    'True': True,
-                    'False': False,
-                    'None': None,
-                },
-                'pd': pd,
-                'np': np,
-                'pandas': pd,
-                'numpy': np,
-                'tables': tables,
-                'excel': excel,
-            }
-
-            # Create locals dict to capture result
-            local_vars = {}
-
-            # Execute with captured output
-            with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
-                exec(script, safe_globals, local_vars)
-
-            execution_time = int((time.time() - start_time) * 1000)
-
-            # Check if result was set
-            result_data = None
-            result_columns = None
-            if 'result' in local_vars:
-                result = local_vars['result']
-                if isinstance(result, pd.DataFrame):
-                    result_columns = result.columns.tolist()
-                    result_data = result.head(1000).values.tolist()
-                    result_data = [[str(cell) if cell is not None else '' for cell in row] for row in result_data]
-                elif isinstance(result, (list, tuple)):
-                    result_data = [[str(item)] for item in result[:1000]]
-                    result_columns = ['result']
-
-            return {
-                'output': output_buffer.getvalue(),
-                'error': error_buffer.getvalue() if error_buffer.getvalue() else None,
-                'execution_time_ms': execution_time,
-                'result_columns': result_columns,
-                'result_data': result_data,
-            }
-
-        except Exception as e:
-            execution_time = int((time.time() - start_time) * 1000)
-            error_msg = traceback.format_exc()
-
-            return {
-                'output': output_buffer.getvalue(),
-                'error': error_msg,
-                'execution_time_ms': execution_time,
-                'result_columns': None,
-                'result_data': None,
-            }
-
-    def _load_tables_as_dataframes(
+            if result_format not in RESULT_FORMATS:
+                raise ValueError(f"Unknown result_format '{result_format}'. Use one of: {', '.join(RESULT_FORMATS)}")
+
+            keys = self._available_table_keys(table_keys)
+
+            if deterministic:
+                cache_key = (script_digest(script), tuple(keys))
+                result = get_result_cache().get(self.db, cache_key)
+
+            if result is not None:
+                result['cached'] = True
+                result['resources'] = {'wall_time_ms': None, 'cpu_time_ms': 0, 'peak_rss_bytes': None}
+            elif settings.PYTHON_WORKER_POOL_SIZE > 0:
+                loader = self._shared_table_loader() if shared_tables_available() else self._table_loader()
+                result = get_worker_pool().run(
+                    {'script': script, 'table_keys': keys, 'stream': on_event is not None},
+                    timeout, loader, on_event=on_event, cancel_event=cancel_event,
+                    mapping_loader=self._mapping_loader()
+                )
+            else:
+                result = run_script(
+                    script, LazyTables(keys, self._table_loader()),
+                    self._cancellable(on_event, cancel_event), self._mapping_loader()
+                )
+
+        except (ScriptTimeoutError, WorkerCrashedError, ScriptCancelledError) as e:
+            result = self._error_result(str(e))
+        except Exception:
+            result = self._error_result(traceback.format_exc())
+
+        if 'cached' not in result:
+            if cache_key is not None and not result['error'] and not self._used_mappings:
+                get_result_cache().put(cache_key, self._accessed_versions, result)
+            result['cached'] = False
+
+        result = self._present_result(result, result_format, target_table_key, target_table_name, replace_target)
+        result['execution_time_ms'] = int((time.time() - start_time) * 1000)
+        if result['resources']['wall_time_ms'] is None:
+            result['resources']['wall_time_ms'] = result['execution_time_ms']
+
+        resources = result['resources']
+        logger.info(
+            "python script %s: wall=%sms cpu=%sms peak_rss=%s tables=%s cached=%s error=%s",
+            script_digest(script)[:12], resources['wall_time_ms'], resources['cpu_time_ms'],
+            resources['peak_rss_bytes'], sorted(self._accessed_versions), result['cached'],
+            bool(result['error'])
+        )
+        return result
+
+    def _cancellable(
+        self,
+        on_event: Optional[EventCallback],
+        cancel_event: Optional[threading.Event]
+    ) -> Optional[EventCallback]:
+        """Event callback for in-process runs that aborts the script once cancelled."""
+        if cancel_event is None:
+            return on_event
+
+        def emit(kind: str, payload: Any) -> None:
+            if cancel_event.is_set():
+                raise ScriptCancelledError("Script was cancelled")
+            if on_event is not None:
+                on_event(kind, payload)
+        return emit
+
+    def _present_result(
         self,
-        table_keys: Optional[List[str]] = None
+        result: Dict[str, Any],
+        result_format: str,
+        target_table_key: Optional[str],
+        target_table_name: Optional[str],
+        replace_target: bool
     ) -> Dict[str, Any]:
-        """Load table data as pandas DataFrames."""
-        tables_dict = {}
+        """Store the result frame for paging, build its first page and optionally save it as a table"""
+        frame = result.pop('result_frame', None)
+        result.update({
+            'result_columns': None,
+            'result_data': None,
+            'result': None,
+            'result_id': None,
+            'result_row_count': None,
+            'saved_table_key': None,
+            'saved_row_count': None,
+        })
+        if frame is None:
+            if target_table_key and not result['error']:
+                result['error'] = "Script did not set a `result` to save"
+            return result
 
-        query = self.db.query(Table)
+        result['result_id'] = get_result_store().put(frame)
+        result['result_row_count'] = len(frame)
+
+        page_size = settings.PYTHON_RESULT_PAGE_SIZE
+        if result_format == "columnar":
+            result['result'] = frame_page(frame, 0, page_size)
+        else:
+            result['result_columns'] = frame_columns(frame)
+            result['result_data'] = list(frame_display_rows(frame, page_size))
+
+        if target_table_key and not result['error']:
+            try:
+                table = write_table(
+                    self.db,
+                    target_table_key,
+                    target_table_name or target_table_key,
+                    frame_columns(frame),
+                    frame_display_rows(frame),
+                    replace=replace_target
+                )
+                result['saved_table_key'] = table.key
+                result['saved_row_count'] = table.row_count
+            except Exception as e:
+                self.db.rollback()
+                result['error'] = str(e)
+
+        return result
+
+    def get_result_page(self, result_id: str, offset: int, limit: int) -> Optional[Dict[str, Any]]:
+        """A page of a stored result in columnar form, or None if it has expired."""
+        frame = get_result_store().get(result_id)
+        if frame is None:
+            return None
+        page = frame_page(frame, offset, limit)
+        page['result_id'] = result_id
+        return page
+
+    def _error_result(self, error: str) -> Dict[str, Any]:
+        return {
+            'output': '',
+            'error': error,
+            'execution_time_ms': 0,
+            'result_frame': None,
+            'output_truncated': False,
+            'resources': {'wall_time_ms': None, 'cpu_time_ms': None, 'peak_rss_bytes': None},
+        }
+
+    def _available_table_keys(self, table_keys: Optional[List[str]] = None) -> List[str]:
+        """Keys of the tables a script may load, without reading any rows."""
+        query = self.db.query(Table.key)
         if table_keys:
             query = query.filter(Table.key.in_(table_keys))
+        return [key for (key,) in query.order_by(Table.id)]
 
-        tables = query.all()
+    def _get_table(self, key: str) -> Table:
+        """Look up a table a script asked for and record the version it sees."""
+        table = self.db.query(Table).filter(Table.key == key).first()
+        if not table:
+            raise KeyError(key)
+        self._accessed_versions[key] = table_version(table)
+        return table
 
-        for table in tables:
-            columns = [c.name for c in sorted(table.columns, key=lambda x: x.index)]
-            if not columns:
-                continue
+    def _table_loader(self) -> TableLoader:
+        """Loader for LazyTables: one table as a DataFrame, optionally projected to some columns."""
+        def load(key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+            table = self._get_table(key)
+            all_columns = table_columns(table)
+            rows = fetch_rows(self.db, table)
+            if columns is None:
+                return pd.DataFrame(rows, columns=all_columns)
+
+            missing = [c for c in columns if c not in all_columns]
+            if missing:
+                raise KeyError(f"Columns not found in '{key}': {', '.join(missing)}")
+            indices = [all_columns.index(c) for c in columns]
+            return pd.DataFrame(
+                [[row[i] if i < len(row) else None for i in indices] for row in rows],
+                columns=columns
+            )
+        return load
+
+    def _shared_table_loader(self):
+        """Worker loader that publishes the table to shared memory and returns its path."""
+        store = get_shared_table_store()
 
-            rows = [r.data for r in sorted(table.data_rows, key=lambda x: x.row_index)]
-            df = pd.DataFrame(rows, columns=columns)
-            tables_dict[table.key] = df
+        def load(key: str, columns: Optional[List[str]] = None) -> str:
+            table = self._get_table(key)
+            # Workers project columns themselves from the full file
+            return store.publish(self.db, table)
+        return load
 
-        return tables_dict
+    def _mapping_loader(self) -> MappingLoader:
+        """Value mappings for the script's excel engine, by id or name, from the shared cache."""
+        def load(ref):
+            self._used_mappings = True
+            mapping = get_value_mapping_cache().resolve(self.db, ref)
+            return mapping.lookup() if mapping else None
+        return load
 
     def get_available_tables(self) -> List[Dict[str, Any]]:
         """Get list of available tables with their columns."""
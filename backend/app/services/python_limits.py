@@ -0,0 +1,160 @@
+"""
+Python Limits - resource limits, usage accounting and bounded output for scripts.
+
+Limits are applied inside worker processes with setrlimit: an address-space
+cap (PYTHON_MEMORY_LIMIT_MB) makes large allocations raise MemoryError in the
+script, and a per-job CPU cap (PYTHON_CPU_LIMIT_SECONDS) interrupts the
+script through SIGXCPU. Only soft limits are lowered so they can be lifted
+again for the next job. On platforms without `resource` nothing is limited.
+"""
+import io
+import signal
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+class CpuTimeExceeded(BaseException):
+    """Raised in a script that used up its CPU time; not caught by `except Exception`."""
+
+
+def apply_memory_limit(limit_mb: int) -> None:
+    """Cap the process address space (includes memory-mapped shared tables)."""
+    if resource is None or limit_mb <= 0:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    soft = limit_mb * 1024 * 1024
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (soft, hard))
+
+
+class CpuLimitState:
+    """Whether the CPU limit fired during a `cpu_limit` block."""
+
+    def __init__(self):
+        self.exceeded = False
+
+
+@contextmanager
+def cpu_limit(seconds: int) -> Iterator[CpuLimitState]:
+    """Interrupt the block once this process has used `seconds` more CPU time."""
+    state = CpuLimitState()
+    if (
+        resource is None or seconds <= 0
+        or threading.current_thread() is not threading.main_thread()
+    ):
+        yield state
+        return
+
+    def raise_exceeded(signum, frame):
+        state.exceeded = True
+        raise CpuTimeExceeded("Script exceeded its CPU time limit")
+
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # RLIMIT_CPU counts whole seconds of the process lifetime
+    soft = int(usage.ru_utime + usage.ru_stime) + seconds + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+
+    previous = signal.signal(signal.SIGXCPU, raise_exceeded)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    try:
+        yield state
+    finally:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        signal.signal(signal.SIGXCPU, previous)
+
+
+def process_cpu_seconds() -> float:
+    """User + system CPU time of this process, all threads."""
+    if resource is None:
+        return time.process_time()
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def reset_peak_rss() -> bool:
+    """Reset the kernel's peak RSS mark (Linux); False if unsupported."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """Peak RSS since the last reset (Linux), else since process start."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    if resource is None:
+        return None
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# Partial lines are forwarded once this many characters are pending
+STREAM_CHUNK_SIZE = 8192
+
+
+class BoundedOutput(io.TextIOBase):
+    """Write-only text stream that keeps the first `limit` characters and counts the rest."""
+
+    def __init__(self, limit: int, on_write: Optional[Callable[[str], None]] = None):
+        self.limit = limit
+        self.dropped = 0
+        self._chunks: List[str] = []
+        self._size = 0
+        # Kept text is also forwarded line by line, for live streaming
+        self._on_write = on_write
+        self._pending: List[str] = []
+        self._pending_size = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, text: str) -> int:
+        remaining = self.limit - self._size
+        if remaining > 0:
+            kept = text[:remaining]
+            self._chunks.append(kept)
+            self._size += len(kept)
+            self.dropped += len(text) - len(kept)
+            if self._on_write is not None:
+                self._pending.append(kept)
+                self._pending_size += len(kept)
+                if "\n" in kept or self._pending_size >= STREAM_CHUNK_SIZE:
+                    self.flush()
+        else:
+            self.dropped += len(text)
+        return len(text)
+
+    def flush(self) -> None:
+        if self._on_write is not None and self._pending:
+            text = "".join(self._pending)
+            self._pending = []
+            self._pending_size = 0
+            self._on_write(text)
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped > 0
+
+    def getvalue(self) -> str:
+        value = "".join(self._chunks)
+        if self.dropped:
+            value += f"\n... output truncated: {self.dropped} more characters not shown"
+        return value
@@ -0,0 +1,72 @@
+"""
+Python Result Cache - memoized results of deterministic scripts.
+
+A script run with deterministic=True has its result stored under its source
+hash and the tables it could see. An entry also records the version of every
+table the script actually read; it is reused only while all of those tables
+are unchanged, so editing or reloading any input table invalidates it.
+"""
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Table
+from .table_store import table_version
+
+
+CacheKey = Tuple[str, Tuple[str, ...]]
+
+
+class ScriptResultCache:
+    """LRU of script results keyed by (source hash, visible table keys)."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[CacheKey, Tuple[Dict[str, Tuple], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, key: CacheKey) -> Optional[Dict[str, Any]]:
+        """Cached result, if every table it read is still at the recorded version."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        versions, result = entry
+        if versions:
+            tables = db.query(Table).filter(Table.key.in_(list(versions))).all()
+            current = {t.key: table_version(t) for t in tables}
+            if current != versions:
+                with self._lock:
+                    self._entries.pop(key, None)
+                return None
+
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        return dict(result)
+
+    def put(self, key: CacheKey, versions: Dict[str, Tuple], result: Dict[str, Any]) -> None:
+        with self._lock:
+            # Result frames are never modified after a run, so they can be shared
+            self._entries[key] = (dict(versions), dict(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+
+_cache: Optional[ScriptResultCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> ScriptResultCache:
+    """Get the process-wide result cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ScriptResultCache(settings.PYTHON_RESULT_CACHE_SIZE)
+    return _cache
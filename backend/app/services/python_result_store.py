@@ -0,0 +1,115 @@
+"""
+Python Result Store - full `result` DataFrames kept server-side for paging.
+
+Script results are no longer cut to 1000 stringified rows in the response;
+the whole frame is kept here under a result id and served a page at a time
+as columns of native JSON values. The store is a bounded LRU, so ids expire
+once PYTHON_RESULT_STORE_SIZE newer results exist.
+"""
+import math
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime, time as dt_time
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..config import settings
+from .table_store import unique_columns
+
+
+def result_to_frame(result: Any) -> Optional[pd.DataFrame]:
+    """A script's `result` as a DataFrame (lists become a single `result` column)."""
+    if isinstance(result, pd.DataFrame):
+        return result
+    if isinstance(result, (list, tuple)):
+        return pd.DataFrame({'result': list(result)})
+    return None
+
+
+def native_value(value: Any) -> Any:
+    """Convert one cell to a JSON-native value (None for missing)."""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float):
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, (bool, int, str)):
+        return value
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    return str(value)
+
+
+def display_value(value: Any) -> str:
+    """Convert one cell to the string form used by table data and legacy rows."""
+    if isinstance(value, (datetime, date, dt_time)) and value is not pd.NaT:
+        return str(value)
+    value = native_value(value)
+    return '' if value is None else str(value)
+
+
+def frame_columns(frame: pd.DataFrame) -> List[str]:
+    return unique_columns([str(c) for c in frame.columns])
+
+
+def frame_page(frame: pd.DataFrame, offset: int, limit: int) -> Dict[str, Any]:
+    """One page of a frame, column-major: data[i] holds the values of columns[i]."""
+    page = frame.iloc[offset:offset + limit]
+    return {
+        'columns': frame_columns(frame),
+        'dtypes': [str(dtype) for dtype in frame.dtypes],
+        'offset': offset,
+        'total_rows': len(frame),
+        'data': [[native_value(v) for v in page.iloc[:, i].tolist()] for i in range(page.shape[1])],
+    }
+
+
+def frame_display_rows(frame: pd.DataFrame, limit: Optional[int] = None) -> Iterator[List[str]]:
+    """Rows of a frame as strings, for saving as an app table or legacy display."""
+    rows = frame.itertuples(index=False, name=None)
+    for n, row in enumerate(rows):
+        if limit is not None and n >= limit:
+            break
+        yield [display_value(v) for v in row]
+
+
+class PythonResultStore:
+    """Bounded LRU of result frames by id."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._frames: "OrderedDict[str, pd.DataFrame]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, frame: pd.DataFrame) -> str:
+        result_id = uuid.uuid4().hex
+        with self._lock:
+            self._frames[result_id] = frame
+            while len(self._frames) > self.size:
+                self._frames.popitem(last=False)
+        return result_id
+
+    def get(self, result_id: str) -> Optional[pd.DataFrame]:
+        with self._lock:
+            frame = self._frames.get(result_id)
+            if frame is not None:
+                self._frames.move_to_end(result_id)
+            return frame
+
+
+_store: Optional[PythonResultStore] = None
+_store_lock = threading.Lock()
+
+
+def get_result_store() -> PythonResultStore:
+    """Get the process-wide result store"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = PythonResultStore(settings.PYTHON_RESULT_STORE_SIZE)
+    return _store
@@ -0,0 +1,234 @@
+"""
+Python Runtime - runs a user script against table DataFrames.
+
+Shared by in-process execution and the worker pool processes, so a script
+behaves the same wherever it runs.
+"""
+import hashlib
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Iterable, Iterator, List, Mapping, Optional, Tuple
+from contextlib import redirect_stdout, redirect_stderr
+
+import pandas as pd
+import numpy as np
+
+from ..config import settings
+from .formula_engine import ExcelFormulaEngine, MappingLoader
+from .python_result_store import result_to_frame
+from .python_limits import BoundedOutput, CpuTimeExceeded
+
+
+SAFE_BUILTINS = {
+    'print': print,
+    'len': len,
+    'range': range,
+    'enumerate': enumerate,
+    'zip': zip,
+    'map': map,
+    'filter': filter,
+    'sorted': sorted,
+    'reversed': reversed,
+    'list': list,
+    'dict': dict,
+    'set': set,
+    'tuple': tuple,
+    'str': str,
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'sum': sum,
+    'min': min,
+    'max': max,
+    'abs': abs,
+    'round': round,
+    'isinstance': isinstance,
+    'type': type,
+    'getattr': getattr,
+    'hasattr': hasattr,
+    'True': True,
+    'False': False,
+    'None': None,
+}
+
+
+def script_digest(script: str) -> str:
+    """Hash identifying a script's source."""
+    return hashlib.sha256(script.encode("utf-8")).hexdigest()
+
+
+_code_cache: "OrderedDict[str, Any]" = OrderedDict()
+_code_cache_lock = threading.Lock()
+
+
+def compile_script(script: str):
+    """Compile a script, reusing the code object of an identical earlier source (LRU)."""
+    digest = script_digest(script)
+    with _code_cache_lock:
+        code = _code_cache.get(digest)
+        if code is not None:
+            _code_cache.move_to_end(digest)
+            return code
+
+    code = compile(script, "<string>", "exec")
+    with _code_cache_lock:
+        _code_cache[digest] = code
+        while len(_code_cache) > settings.PYTHON_CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+    return code
+
+
+TableLoader = Callable[[str, Optional[List[str]]], pd.DataFrame]
+
+
+class LazyTables(Mapping):
+    """
+    The `tables` mapping seen by scripts: keys are known up front, DataFrames
+    are loaded on first access.
+
+    `tables.load(key, columns=[...])` loads only the listed columns. Scripts
+    may also assign new entries, as they could with the old plain dict.
+    """
+
+    def __init__(self, keys: Iterable[str], loader: TableLoader):
+        self._keys = list(keys)
+        self._loader = loader
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._projections: Dict[Tuple[str, Tuple[str, ...]], pd.DataFrame] = {}
+
+    def load(self, key: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Load a table, optionally only the given columns."""
+        if key in self._frames:
+            frame = self._frames[key]
+            return frame[list(columns)] if columns is not None else frame
+        if key not in self._keys:
+            raise KeyError(key)
+
+        if columns is None:
+            self._frames[key] = self._loader(key, None)
+            return self._frames[key]
+
+        projection = (key, tuple(columns))
+        if projection not in self._projections:
+            self._projections[projection] = self._loader(key, list(columns))
+        return self._projections[projection]
+
+    @property
+    def loaded_keys(self) -> List[str]:
+        """Keys of tables the script has read (fully or projected)."""
+        keys = set(self._frames) | {key for key, _ in self._projections}
+        return [key for key in self._keys if key in keys]
+
+    def __getitem__(self, key: str) -> pd.DataFrame:
+        return self.load(key)
+
+    def __setitem__(self, key: str, frame: pd.DataFrame) -> None:
+        if key not in self._keys:
+            self._keys.append(key)
+        self._frames[key] = frame
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._keys
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._keys))
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __repr__(self) -> str:
+        return f"LazyTables({self._keys!r})"
+
+
+EventCallback = Callable[[str, Any], None]
+
+
+def _make_progress(on_event: Optional[EventCallback]) -> Callable[..., None]:
+    """The script's progress(value=None, message=None); a no-op unless streaming."""
+    def progress(value: Optional[float] = None, message: Optional[str] = None) -> None:
+        if on_event is not None:
+            on_event("progress", {
+                "value": None if value is None else float(value),
+                "message": None if message is None else str(message),
+            })
+    return progress
+
+
+def run_script(
+    script: str,
+    tables: Mapping[str, pd.DataFrame],
+    on_event: Optional[EventCallback] = None,
+    mapping_loader: Optional[MappingLoader] = None
+) -> Dict[str, Any]:
+    """
+    Execute a script with pd, np, tables, excel and progress in scope.
+
+    mapping_loader gives excel.map_value() and friends the app's value
+    mappings. With on_event, stdout is forwarded as ("output", text) events as lines are
+    printed and progress() calls as ("progress", {...}) events.
+
+    Returns output, error, execution_time_ms, result_frame (the script's
+    `result` variable as a DataFrame, uncut), output_truncated and resources
+    (wall and CPU time of this thread; callers add peak RSS where known).
+    Output beyond PYTHON_MAX_OUTPUT_SIZE characters is dropped as it is written.
+    """
+    start_time = time.time()
+    start_cpu = time.thread_time()
+    output_buffer = BoundedOutput(
+        settings.PYTHON_MAX_OUTPUT_SIZE,
+        on_write=(lambda text: on_event("output", text)) if on_event is not None else None
+    )
+    error_buffer = BoundedOutput(settings.PYTHON_MAX_OUTPUT_SIZE)
+    result_frame = None
+    error = None
+
+    try:
+        # Create Excel formula engine
+        excel = ExcelFormulaEngine(mapping_loader)
+
+        # Create restricted globals
+        safe_globals = {
+            '__builtins__': SAFE_BUILTINS,
+            'pd': pd,
+            'np': np,
+            'pandas': pd,
+            'numpy': np,
+            'tables': tables,
+            'excel': excel,
+            'progress': _make_progress(on_event),
+        }
+
+        # Create locals dict to capture result
+        local_vars = {}
+
+        code = compile_script(script)
+
+        # Execute with captured output
+        with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
+            try:
+                exec(code, safe_globals, local_vars)
+            finally:
+                output_buffer.flush()
+
+        result_frame = result_to_frame(local_vars.get('result'))
+        error = error_buffer.getvalue() or None
+
+    except (Exception, CpuTimeExceeded):
+        error = traceback.format_exc()
+
+    execution_time = int((time.time() - start_time) * 1000)
+
+    return {
+        'output': output_buffer.getvalue(),
+        'error': error,
+        'execution_time_ms': execution_time,
+        'result_frame': result_frame,
+        'output_truncated': output_buffer.truncated,
+        'resources': {
+            'wall_time_ms': execution_time,
+            'cpu_time_ms': int((time.thread_time() - start_cpu) * 1000),
+            'peak_rss_bytes': None,
+        },
+    }
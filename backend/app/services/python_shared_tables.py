@@ -0,0 +1,160 @@
+"""
+Python Shared Tables - app tables published once as Arrow IPC files for workers.
+
+The API process decodes a table into an Arrow file under shared memory
+(/dev/shm where available) the first time a script asks for it. Worker
+processes memory-map the file and wrap its buffers as a DataFrame without
+copying, so concurrent scripts over the same table share one copy of the data
+instead of each receiving a pickled DataFrame. Files are keyed by table
+version and removed when the table changes or is deleted, or when the files
+exceed PYTHON_SHARED_TABLES_MAX_MB (oldest first); a worker
+asks again for a file removed before it mapped it.
+
+Requires pyarrow; without it workers fall back to pickled DataFrames.
+"""
+import hashlib
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import pandas as pd
+from sqlalchemy.orm import Session
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+from ..config import settings
+from ..models import Table
+from .table_store import table_version, table_columns, fetch_rows
+
+
+def shared_tables_available() -> bool:
+    return pa is not None and settings.PYTHON_SHARED_TABLES
+
+
+def read_shared_table(path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+    """Attach a published table as a DataFrame backed by the memory-mapped file."""
+    with pa.memory_map(path, "r") as source:
+        table = pa.ipc.open_file(source).read_all()
+
+    if columns is not None:
+        missing = [c for c in columns if c not in table.column_names]
+        if missing:
+            raise KeyError(f"Columns not found: {', '.join(missing)}")
+        table = table.select(columns)
+
+    # The same dtypes as tables loaded in-process, so scripts behave alike on workers
+    return table.to_pandas()
+
+
+class SharedTableStore:
+    """Directory of Arrow IPC files, one per published table version."""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        if os.path.exists(directory):
+            shutil.rmtree(directory)
+        os.makedirs(directory)
+
+        self._lock = threading.Lock()
+        # (version, path, size) by table key, oldest first
+        self._published: "OrderedDict[str, Tuple[Tuple, str, int]]" = OrderedDict()
+
+    def publish(self, db: Session, table: Table) -> str:
+        """Path of the table's current Arrow file, writing it if needed."""
+        version = table_version(table)
+        published = self._published.get(table.key)
+        if published and published[0] == version:
+            return published[1]
+
+        with self._lock:
+            published = self._published.get(table.key)
+            if published and published[0] == version:
+                return published[1]
+
+            path = self._write(db, table, version)
+            self._discard(table.key)
+            self._published[table.key] = (version, path, os.path.getsize(path))
+
+            existing = {key for key, in db.query(Table.key)}
+            for key in [k for k in self._published if k not in existing]:
+                self._discard(key)
+            total = sum(size for _, _, size in self._published.values())
+            while total > self.max_bytes and len(self._published) > 1:
+                key = next(iter(self._published))
+                total -= self._published[key][2]
+                self._discard(key)
+            return path
+
+    def _discard(self, key: str) -> None:
+        published = self._published.pop(key, None)
+        if published:
+            # Workers still reading the file keep their mapping after unlink
+            try:
+                os.remove(published[1])
+            except FileNotFoundError:
+                pass
+
+    def _write(self, db: Session, table: Table, version: Tuple) -> str:
+        columns = table_columns(table)
+        rows = fetch_rows(db, table)
+        width = len(columns)
+
+        arrays = [
+            pa.array(
+                [None if i >= len(row) or row[i] is None else str(row[i]) for row in rows],
+                type=pa.string()
+            )
+            for i in range(width)
+        ]
+        arrow_table = pa.Table.from_arrays(arrays, names=columns)
+
+        digest = hashlib.sha1(repr(version).encode()).hexdigest()[:12]
+        name = re.sub(r"[^A-Za-z0-9_-]", "_", table.key)
+        path = os.path.join(self.directory, f"{name}-{table.id}-{digest}.arrow")
+
+        tmp_path = path + ".tmp"
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+                writer.write_table(arrow_table)
+        os.replace(tmp_path, path)
+        return path
+
+    def close(self) -> None:
+        """Remove all published files"""
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self._published.clear()
+
+
+_store: Optional[SharedTableStore] = None
+_store_lock = threading.Lock()
+
+
+def get_shared_table_store() -> SharedTableStore:
+    """Get the process-wide shared table store, creating it on first use"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                base = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+                directory = settings.PYTHON_SHARED_TABLES_DIR or os.path.join(
+                    base, f"didp_tables_{os.getpid()}"
+                )
+                _store = SharedTableStore(directory, settings.PYTHON_SHARED_TABLES_MAX_MB * 1024 * 1024)
+    return _store
+
+
+def close_shared_table_store() -> None:
+    """Remove published tables (application shutdown)"""
+    global _store
+    with _store_lock:
+        if _store is not None:
+            _store.close()
+            _store = None
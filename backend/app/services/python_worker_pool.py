@@ -0,0 +1,252 @@
+"""
+Python Worker Pool - warm subprocesses that execute user scripts.
+
+Workers are started ahead of time with pandas, numpy and the formula engine
+already imported and take one job at a time over a pipe. A job that runs
+past its timeout has its worker killed and replaced, so a hung script never
+holds server capacity.
+
+Table data stays in the API process: a worker asks for a table over the pipe
+the first time the script touches it and gets back either the path of a
+shared Arrow file to map, or a pickled DataFrame. Value mappings used through
+`excel` are requested the same way.
+"""
+import multiprocessing
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pandas as pd
+
+from ..config import settings
+from .formula_engine import MappingLoader
+from .python_runtime import EventCallback, LazyTables, TableLoader, run_script
+from .python_shared_tables import read_shared_table
+from .python_limits import (
+    apply_memory_limit, cpu_limit, process_cpu_seconds, reset_peak_rss, peak_rss_bytes
+)
+
+
+# Parent-side loader: a DataFrame to pickle, or the path of a shared table file
+TablePayloadLoader = Callable[[str, Optional[List[str]]], Union[pd.DataFrame, str]]
+
+
+class ScriptTimeoutError(Exception):
+    """A script ran longer than its time limit and its worker was killed."""
+
+
+class WorkerCrashedError(Exception):
+    """A worker process exited while running a script."""
+
+
+class ScriptCancelledError(Exception):
+    """A script was cancelled while running and its worker was killed."""
+
+
+# How often a running job checks for cancellation
+CANCEL_POLL_INTERVAL = 0.1
+
+
+def _remote_loader(conn) -> TableLoader:
+    """Table loader for a worker: request the table from the parent and wait for it."""
+    def request(key: str, columns: Optional[List[str]]):
+        conn.send(("table", key, columns))
+        status, payload = conn.recv()
+        if status == "error":
+            raise KeyError(payload)
+        return payload
+
+    def load(key: str, columns: Optional[List[str]]) -> pd.DataFrame:
+        payload = request(key, columns)
+        if not isinstance(payload, str):
+            return payload
+        try:
+            return read_shared_table(payload, columns)
+        except FileNotFoundError:
+            # The table changed and its old file was replaced; ask again
+            return read_shared_table(request(key, columns), columns)
+    return load
+
+
+def _remote_mapping_loader(conn) -> MappingLoader:
+    """Mapping loader for a worker: request a value mapping from the parent."""
+    def load(ref):
+        conn.send(("mapping", ref))
+        return conn.recv()[1]
+    return load
+
+
+def worker_main(conn) -> None:
+    """Worker process loop: run jobs until the pipe closes or a stop message arrives."""
+    # Exercise the runtime once so first-use costs are paid before the first job
+    run_script("pass", {})
+    apply_memory_limit(settings.PYTHON_MEMORY_LIMIT_MB)
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+
+        if message[0] == "stop":
+            break
+
+        job = message[1]
+        tables = LazyTables(job["table_keys"], _remote_loader(conn))
+        reset_peak_rss()
+        start_cpu = process_cpu_seconds()
+        on_event = (lambda kind, payload: conn.send((kind, payload))) if job.get("stream") else None
+        with cpu_limit(settings.PYTHON_CPU_LIMIT_SECONDS) as limit:
+            result = run_script(job["script"], tables, on_event, _remote_mapping_loader(conn))
+        # The limit may have interrupted a table request mid-exchange, so the
+        # pipe can't be trusted any more: have the parent replace this worker
+        result['retire_worker'] = limit.exceeded
+        # Whole-process figures include numpy/arrow threads
+        result['resources']['cpu_time_ms'] = int((process_cpu_seconds() - start_cpu) * 1000)
+        result['resources']['peak_rss_bytes'] = peak_rss_bytes()
+        try:
+            conn.send(("result", result))
+        except Exception as e:
+            # e.g. a result frame holding objects that cannot be pickled
+            conn.send(("result", {**result, 'error': f"Could not return result: {e}", 'result_frame': None}))
+
+
+class _Worker:
+    """One worker process and the parent end of its pipe."""
+
+    def __init__(self, ctx):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(target=worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(("stop",))
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+        self.conn.close()
+
+
+class PythonWorkerPool:
+    """Fixed-size pool of warm worker processes."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        for _ in range(size):
+            self._idle.put(_Worker(self._ctx))
+
+    def run(
+        self,
+        job: Dict[str, Any],
+        timeout: float,
+        table_loader: TablePayloadLoader,
+        on_event: Optional[EventCallback] = None,
+        cancel_event: Optional[threading.Event] = None,
+        mapping_loader: Optional[MappingLoader] = None
+    ) -> Dict[str, Any]:
+        """
+        Run a job on an idle worker, killing and replacing it if the timeout passes.
+
+        Table requests from the worker are answered with table_loader (a
+        DataFrame or the path of a shared table file) and value mapping
+        requests with mapping_loader while the job runs; loading time counts
+        towards the timeout. Output and progress events of a streaming job go
+        to on_event. Setting cancel_event kills the job.
+        """
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise ScriptTimeoutError(f"No Python worker became free within {timeout}s")
+
+        if not worker.process.is_alive():
+            worker = _Worker(self._ctx)
+
+        deadline = time.monotonic() + timeout
+        try:
+            worker.conn.send(("run", job))
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise ScriptTimeoutError(f"Script exceeded the {timeout}s time limit and was stopped")
+                if cancel_event is not None:
+                    if cancel_event.is_set():
+                        raise ScriptCancelledError("Script was cancelled")
+                    remaining = min(remaining, CANCEL_POLL_INTERVAL)
+                if not worker.conn.poll(remaining):
+                    continue
+
+                message = worker.conn.recv()
+                if message[0] == "result":
+                    result = message[1]
+                    if result.pop('retire_worker', False):
+                        self._replace(worker)
+                    else:
+                        self._idle.put(worker)
+                    return result
+                if message[0] == "table":
+                    worker.conn.send(self._load_table(table_loader, message[1], message[2]))
+                elif message[0] == "mapping":
+                    worker.conn.send(("mapping", mapping_loader(message[1]) if mapping_loader else None))
+                elif on_event is not None:
+                    on_event(message[0], message[1])
+        except (ScriptTimeoutError, ScriptCancelledError):
+            self._replace(worker)
+            raise
+        except (EOFError, OSError) as e:
+            self._replace(worker)
+            raise WorkerCrashedError(f"Python worker exited while running the script: {e}")
+        except Exception:
+            self._replace(worker)
+            raise
+
+    def _load_table(self, table_loader: TablePayloadLoader, key: str, columns: Optional[List[str]]):
+        try:
+            return ("table", table_loader(key, columns))
+        except KeyError as e:
+            return ("error", str(e.args[0]) if e.args else key)
+
+    def _replace(self, worker: _Worker) -> None:
+        worker.kill()
+        self._idle.put(_Worker(self._ctx))
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                break
+
+
+_pool: Optional[PythonWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> PythonWorkerPool:
+    """Get the process-wide worker pool, starting it on first use"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = PythonWorkerPool(settings.PYTHON_WORKER_POOL_SIZE)
+    return _pool
+
+
+def close_worker_pool() -> None:
+    """Stop all workers (application shutdown)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
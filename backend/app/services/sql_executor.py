@@ -1,13 +1,52 @@
+import re
 import sqlite3
 import time
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from typing import List, Dict, Any, Iterator, Optional, Tuple
 from io import StringIO
 
 from sqlalchemy.orm import Session
+import pandas as pd
 
-from ..models import Table, TableColumn, TableRow
-from ..schemas import SqlExecuteResponse
+from ..models import Table
+from ..schemas import SqlExecuteResponse, SqlParameters, SqlProfile, SqlTableProfile, SqlQueryPlanStep
 from ..config import settings
+from .sql_functions import register_duckdb_functions, register_formula_functions, used_formula_functions
+from .sql_workspace import get_workspace
+from .table_store import fetch_rows, unique_columns, write_table
+
+try:
+    import duckdb
+except ImportError:  # optional analytical engine
+    duckdb = None
+
+
+SQL_ENGINES = ("sqlite", "duckdb")
+
+# Text values that read as numbers, like SQLite's numeric conversion of text
+NUMBER_PATTERN = r'[+-]?(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?'
+INTEGER_PATTERN = r'[+-]?\d{1,18}'
+# Cells that are NULL in a numeric column, as TRY_CAST leaves them (compared lower-cased)
+NULL_TOKENS = ["", "null", "none", "nan", "n/a", "na", "#n/a", "-"]
+# Columns where more than this share of values have leading zeros hold codes ("007") and stay text
+CODE_VALUE_SHARE = 0.5
+
+# SQLite-style :name parameters, skipping string literals, quoted identifiers,
+# comments and DuckDB's :: casts
+NAMED_PARAMETER_PATTERN = re.compile(
+    r"""('(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/)|(?<![:\w]):([A-Za-z_]\w*)""",
+    re.DOTALL
+)
+
+# Table references in FROM/JOIN clauses, used to map plan aliases back to table keys
+TABLE_REF_PATTERN = re.compile(
+    r'\b(?:FROM|JOIN)\s+["`\[]?([\w.]+)["`\]]?(?:\s+(?:AS\s+)?["`\[]?(\w+)["`\]]?)?',
+    re.IGNORECASE
+)
+SQL_KEYWORDS = {
+    "WHERE", "ON", "USING", "JOIN", "INNER", "LEFT", "RIGHT", "FULL", "CROSS", "NATURAL",
+    "OUTER", "GROUP", "ORDER", "LIMIT", "HAVING", "UNION", "EXCEPT", "INTERSECT", "WINDOW",
+}
 
 
 class SqlExecutorService:
@@ -19,66 +58,204 @@ class SqlExecutorService:
     def execute_query(
         self,
         query: str,
-        table_keys: Optional[List[str]] = None
+        table_keys: Optional[List[str]] = None,
+        profile: bool = False,
+        engine: Optional[str] = None,
+        parameters: Optional[SqlParameters] = None,
+        target_table_key: Optional[str] = None,
+        target_table_name: Optional[str] = None,
+        replace_target: bool = False
     ) -> SqlExecuteResponse:
         """
-        Execute SQL query against in-memory SQLite database.
+        Execute SQL query against table data.
 
-        1. Create in-memory SQLite database
-        2. Load requested tables into SQLite
+        1. Get a connection: a reader on the shared SQLite workspace, or a
+           private in-memory database (DuckDB, or SQLite with the workspace off)
+        2. Load requested tables into it (the workspace only refreshes changed tables)
         3. Execute query
-        4. Return results
+        4. Return results, or with target_table_key stream the full result
+           into that app table and return the first SQL_MAX_ROWS as a preview
+
+        Parameters are bound rather than inlined, so repeated runs reuse the
+        reader's cached prepared statement. The engine defaults to
+        settings.SQL_ENGINE. With profile=True the response carries a
+        per-phase timing breakdown, rows loaded/scanned per table and the
+        query plan.
         """
         start_time = time.time()
-
-        # Create in-memory SQLite connection
-        conn = sqlite3.connect(":memory:")
+        timings: Dict[str, float] = {}
+        rows_loaded: Dict[str, int] = {}
+        engine = (engine or settings.SQL_ENGINE).lower()
 
         try:
-            # Load tables into SQLite
-            self._load_tables_to_sqlite(conn, table_keys)
-
-            # Execute query
-            cursor = conn.execute(query)
-            columns = [desc[0] for desc in cursor.description] if cursor.description else []
-            data = cursor.fetchmany(settings.SQL_MAX_ROWS)
-
-            # Convert to list of lists with string values
-            data = [[str(cell) if cell is not None else '' for cell in row] for row in data]
-
-            execution_time = int((time.time() - start_time) * 1000)
-
-            return SqlExecuteResponse(
-                columns=columns,
-                data=data,
-                row_count=len(data),
-                execution_time_ms=execution_time
-            )
+            if engine not in SQL_ENGINES:
+                raise ValueError(f"Unknown SQL engine '{engine}'. Expected one of: {', '.join(SQL_ENGINES)}")
+            use_workspace = self._uses_workspace(engine)
+            if engine == "duckdb" and isinstance(parameters, dict):
+                query = self._duckdb_named_parameters(query)
+
+            # Resolve tables
+            phase_start = time.perf_counter()
+            tables = self._resolve_tables(table_keys)
+            timings["resolve"] = time.perf_counter() - phase_start
+
+            with self._connection(engine, tables, query) as conn:
+                phase_start = time.perf_counter()
+                if use_workspace:
+                    rows_loaded = get_workspace().sync(self.db, tables)
+                elif engine == "duckdb":
+                    rows_loaded = self._load_tables_to_duckdb(conn, tables)
+                else:
+                    rows_loaded = self._load_tables_to_sqlite(conn, tables)
+                timings["load"] = time.perf_counter() - phase_start
+
+                # Execute query
+                phase_start = time.perf_counter()
+                cursor = conn.execute(query, parameters) if parameters is not None else conn.execute(query)
+                columns = [desc[0] for desc in cursor.description] if cursor.description else []
+                timings["execute"] = time.perf_counter() - phase_start
+
+                if target_table_key:
+                    phase_start = time.perf_counter()
+                    saved_table, data = self._save_results(
+                        cursor, columns, target_table_key, target_table_name, replace_target
+                    )
+                    timings["save"] = time.perf_counter() - phase_start
+
+                    return SqlExecuteResponse(
+                        columns=unique_columns(columns),
+                        data=data,
+                        row_count=len(data),
+                        execution_time_ms=int((time.time() - start_time) * 1000),
+                        profile=self._build_profile(
+                            conn, engine, query, parameters, timings, rows_loaded, start_time
+                        ) if profile else None,
+                        saved_table_key=saved_table.key,
+                        saved_row_count=saved_table.row_count
+                    )
+
+                phase_start = time.perf_counter()
+                data = cursor.fetchmany(settings.SQL_MAX_ROWS)
+                timings["fetch"] = time.perf_counter() - phase_start
+
+                # Convert to list of lists with string values
+                phase_start = time.perf_counter()
+                data = [[str(cell) if cell is not None else '' for cell in row] for row in data]
+                timings["serialize"] = time.perf_counter() - phase_start
+
+                execution_time = int((time.time() - start_time) * 1000)
+
+                return SqlExecuteResponse(
+                    columns=columns,
+                    data=data,
+                    row_count=len(data),
+                    execution_time_ms=execution_time,
+                    profile=self._build_profile(
+                        conn, engine, query, parameters, timings, rows_loaded, start_time
+                    ) if profile else None
+                )
 
         except Exception as e:
+            if target_table_key:
+                self.db.rollback()
             execution_time = int((time.time() - start_time) * 1000)
             return SqlExecuteResponse(
                 columns=[],
                 data=[],
                 row_count=0,
                 execution_time_ms=execution_time,
-                error=str(e)
+                error=str(e),
+                profile=self._build_profile(
+                    None, engine, query, parameters, timings, rows_loaded, start_time
+                ) if profile else None
             )
+
+    def _save_results(
+        self,
+        cursor: Any,
+        columns: List[str],
+        table_key: str,
+        table_name: Optional[str],
+        replace: bool
+    ) -> Tuple[Table, List[List[str]]]:
+        """Stream every result row into an app table; returns the table and a display preview"""
+        if not columns:
+            raise ValueError("Query returned no result set to save")
+
+        preview: List[List[str]] = []
+
+        def result_rows() -> Iterator[List[str]]:
+            while True:
+                batch = cursor.fetchmany(settings.BULK_INSERT_BATCH_SIZE)
+                if not batch:
+                    return
+                for row in batch:
+                    row = [str(cell) if cell is not None else '' for cell in row]
+                    if len(preview) < settings.SQL_MAX_ROWS:
+                        preview.append(row)
+                    yield row
+
+        table = write_table(
+            self.db,
+            table_key,
+            table_name or table_key,
+            unique_columns(columns),
+            result_rows(),
+            replace=replace
+        )
+        return table, preview
+
+    def _uses_workspace(self, engine: str) -> bool:
+        return engine == "sqlite" and settings.SQL_SHARED_WORKSPACE
+
+    @contextmanager
+    def _connection(self, engine: str, tables: List[Table], query: str) -> Iterator[Any]:
+        """Connection to run a query on: a shared workspace reader limited to tables, or a private in-memory database"""
+        if self._uses_workspace(engine):
+            with get_workspace().reader(t.key for t in tables) as conn:
+                yield conn
+            return
+
+        conn = self._connect(engine, query)
+        try:
+            yield conn
         finally:
             conn.close()
 
-    def _load_tables_to_sqlite(
-        self,
-        conn: sqlite3.Connection,
-        table_keys: Optional[List[str]] = None
-    ) -> None:
-        """Load table data into in-memory SQLite"""
-        # Get tables to load
+    def _connect(self, engine: str, query: str) -> Any:
+        """Open a private in-memory connection for the given engine, with the formula functions"""
+        if engine == "duckdb":
+            if duckdb is None:
+                raise RuntimeError("duckdb not available. Install with: pip install duckdb")
+            conn = duckdb.connect(":memory:")
+            register_duckdb_functions(conn, used_formula_functions(query))
+            return conn
+
+        conn = sqlite3.connect(":memory:")
+        register_formula_functions(conn)
+        return conn
+
+    def _duckdb_named_parameters(self, query: str) -> str:
+        """Rewrite SQLite's :name parameters as DuckDB's $name"""
+        return NAMED_PARAMETER_PATTERN.sub(
+            lambda m: m.group(1) if m.group(1) is not None else f"${m.group(2)}", query
+        )
+
+    def _resolve_tables(self, table_keys: Optional[List[str]] = None) -> List[Table]:
+        """Get the tables a query should see"""
         query = self.db.query(Table)
         if table_keys:
             query = query.filter(Table.key.in_(table_keys))
 
-        tables = query.all()
+        return query.all()
+
+    def _load_tables_to_sqlite(
+        self,
+        conn: sqlite3.Connection,
+        tables: List[Table]
+    ) -> Dict[str, int]:
+        """Load table data into in-memory SQLite, returning rows loaded per table"""
+        rows_loaded: Dict[str, int] = {}
 
         for table in tables:
             # Get columns
@@ -92,7 +269,7 @@ class SqlExecutorService:
             conn.execute(create_sql)
 
             # Insert rows
-            rows = [r.data for r in sorted(table.data_rows, key=lambda x: x.row_index)]
+            rows = fetch_rows(self.db, table)
             if rows:
                 placeholders = ", ".join(["?" for _ in columns])
                 insert_sql = f'INSERT INTO "{table.key}" VALUES ({placeholders})'
@@ -103,6 +280,146 @@ class SqlExecutorService:
                     conn.execute(insert_sql, padded_row)
 
             conn.commit()
+            rows_loaded[table.key] = len(rows)
+
+        return rows_loaded
+
+    def _load_tables_to_duckdb(self, conn: Any, tables: List[Table]) -> Dict[str, int]:
+        """Register table data as DataFrames with DuckDB (scanned in place, no row inserts)"""
+        rows_loaded: Dict[str, int] = {}
+
+        for table in tables:
+            columns = [c.name for c in sorted(table.columns, key=lambda x: x.index)]
+            if not columns:
+                continue
+
+            rows = fetch_rows(self.db, table)
+
+            # Pad/truncate ragged rows to the column count
+            df = pd.DataFrame(rows).reindex(columns=range(len(columns)))
+            df.columns = columns
+            df = self._infer_frame_types(df.fillna(''))
+
+            conn.register(table.key, df)
+            rows_loaded[table.key] = len(rows)
+
+        return rows_loaded
+
+    def _infer_frame_types(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Type numeric columns so the SQL that runs on SQLite's text columns
+        (SUM(qty), qty * price) runs on DuckDB too, with native integers or doubles.
+
+        A column is numeric when each cell is a number or a NULL token (blank,
+        "N/A", "null", ...), which become NULL as with TRY_CAST; SQLite sums
+        such cells as 0, so totals agree. Numbers with leading zeros ("007")
+        count as numbers, unless so many have them that the column holds codes.
+        Columns of whole numbers are BIGINT, so "3" does not come back as "3.0".
+        """
+        typed = {}
+        for col in df.columns:
+            values = df[col].astype(str).str.strip()
+            blank = values.str.lower().isin(NULL_TOKENS)
+            present = values[~blank]
+
+            # Cheap rejection of text columns from a sample before checking the whole column
+            if present.empty or not present.head(100).str.fullmatch(NUMBER_PATTERN).all():
+                typed[col] = df[col]
+                continue
+            if not present.str.fullmatch(NUMBER_PATTERN).all():
+                typed[col] = df[col]
+            elif present.str.match(r'[+-]?0\d').mean() > CODE_VALUE_SHARE:
+                typed[col] = df[col]
+            elif present.str.fullmatch(INTEGER_PATTERN).all():
+                typed[col] = pd.to_numeric(values.where(~blank)).astype('Int64')
+            else:
+                typed[col] = pd.to_numeric(values.where(~blank)).astype('float64')
+
+        return pd.DataFrame(typed, columns=df.columns)
+
+    def _explain(
+        self,
+        conn: Any,
+        engine: str,
+        query: str,
+        parameters: Optional[SqlParameters]
+    ) -> List[SqlQueryPlanStep]:
+        """Get the query plan from the engine"""
+        args = (parameters,) if parameters is not None else ()
+        if engine == "duckdb":
+            plan_text = "\n".join(row[1] for row in conn.execute(f"EXPLAIN {query}", *args).fetchall())
+            return [
+                SqlQueryPlanStep(id=idx, parent=0, detail=line)
+                for idx, line in enumerate(plan_text.splitlines())
+                if line.strip()
+            ]
+
+        return [
+            SqlQueryPlanStep(id=row[0], parent=row[1], detail=row[3])
+            for row in conn.execute(f"EXPLAIN QUERY PLAN {query}", *args)
+        ]
+
+    def _build_profile(
+        self,
+        conn: Any,
+        engine: str,
+        query: str,
+        parameters: Optional[SqlParameters],
+        timings: Dict[str, float],
+        rows_loaded: Dict[str, int],
+        start_time: float
+    ) -> SqlProfile:
+        """Assemble the profile for a query; conn is None when the query failed"""
+        plan: List[SqlQueryPlanStep] = []
+        if conn is not None:
+            try:
+                plan = self._explain(conn, engine, query, parameters)
+            except Exception:
+                pass
+
+        # Count full-scan plan steps per table, resolving aliases used in the query
+        aliases = {key.lower(): key for key in rows_loaded}
+        for match in TABLE_REF_PATTERN.finditer(query):
+            table_name, alias = match.group(1), match.group(2)
+            if table_name.lower() in aliases and alias and alias.upper() not in SQL_KEYWORDS:
+                aliases[alias.lower()] = aliases[table_name.lower()]
+
+        full_scans: Dict[str, int] = {}
+        if engine == "duckdb":
+            # Columnar scans read every referenced table in full
+            for match in TABLE_REF_PATTERN.finditer(query):
+                table_key = aliases.get(match.group(1).lower())
+                if table_key:
+                    full_scans[table_key] = full_scans.get(table_key, 0) + 1
+        else:
+            for step in plan:
+                parts = step.detail.split()
+                if len(parts) >= 2 and parts[0] == "SCAN":
+                    table_key = aliases.get(parts[1].strip('"').lower())
+                    if table_key:
+                        full_scans[table_key] = full_scans.get(table_key, 0) + 1
+
+        def ms(phase: str) -> float:
+            return round(timings.get(phase, 0.0) * 1000, 3)
+
+        return SqlProfile(
+            resolve_ms=ms("resolve"),
+            load_ms=ms("load"),
+            execute_ms=ms("execute"),
+            fetch_ms=ms("fetch"),
+            serialize_ms=ms("serialize"),
+            save_ms=ms("save"),
+            total_ms=round((time.time() - start_time) * 1000, 3),
+            tables=[
+                SqlTableProfile(
+                    table_key=key,
+                    rows_loaded=count,
+                    rows_scanned=count * full_scans.get(key, 0)
+                )
+                for key, count in rows_loaded.items()
+            ],
+            query_plan=plan
+        )
 
     def generate_ddl_schema(self) -> str:
         """Generate SQL DDL schema for all tables"""
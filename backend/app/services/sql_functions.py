@@ -0,0 +1,223 @@
+"""
+SQL Functions - formula engine functions registered as SQL user-defined functions.
+
+Lets queries compute commission, settlement dates, FX conversion, P&L and
+text helpers in one SQL pass, e.g.:
+
+    SELECT trade_id, COMMISSION(quantity * price, 0.0003, 20) AS comm,
+           SETTLEMENT_DATE(trade_date, 'T+2') AS settle
+    FROM trades
+
+Table values are TEXT, so numeric arguments are converted first; a NULL or
+non-numeric argument makes the function return NULL. Functions that
+SQLite already provides (UPPER, LOWER, TRIM, REPLACE, LENGTH) are left alone,
+and LEFT/RIGHT are exposed as LEFT_TEXT/RIGHT_TEXT since both are SQL keywords.
+
+DuckDB has no overloaded or variadic Python UDFs, so there each function is
+a macro with one overload per argument count, calling a UDF of that arity
+with the arguments cast to text (variadic functions take up to
+DUCKDB_MAX_VARIADIC_ARGS arguments). WEIGHTED_AVG is a SQL macro there.
+"""
+import inspect
+import re
+import sqlite3
+from typing import Any, Callable, Dict, Optional, Set, Tuple
+
+from .formula_engine import ExcelFormulaEngine
+
+
+# SQL name -> (engine method, argument kinds, minimum arguments or None for the method's own)
+# Kinds: n = number, i = integer, s = text
+SCALAR_FUNCTIONS: Dict[str, Tuple[str, str, Optional[int]]] = {
+    # Trade
+    "COMMISSION": ("commission", "nnnn", None),
+    "BROKERAGE_FEE": ("brokerage_fee", "nsnn", None),
+    "STAMP_DUTY": ("stamp_duty", "nns", None),
+    "TRANSACTION_TAX": ("transaction_tax", "nns", None),
+    "GROSS_VALUE": ("gross_value", "nn", None),
+    "NET_VALUE": ("net_value", "nnnns", None),
+    "TOTAL_COST": ("total_cost", "n", None),
+    "EFFECTIVE_PRICE": ("effective_price", "nn", None),
+    # Settlement
+    "SETTLEMENT_DATE": ("settlement_date", "ss", None),
+    "DAYS_TO_SETTLEMENT": ("days_to_settlement", "ss", None),
+    "ACCRUED_INTEREST": ("accrued_interest", "nnis", None),
+    "CLEAN_PRICE": ("clean_price", "nnn", None),
+    "DIRTY_PRICE": ("dirty_price", "nnn", None),
+    "SETTLEMENT_AMOUNT": ("settlement_amount", "nnnn", None),
+    "DAY_COUNT_FRACTION": ("day_count_fraction", "sss", None),
+    # FX
+    "FX_CONVERT": ("fx_convert", "nns", None),
+    "CROSS_RATE": ("cross_rate", "nn", None),
+    "FX_GAIN_LOSS": ("fx_gain_loss", "nnn", None),
+    "BASE_CURRENCY_VALUE": ("base_currency_value", "nn", None),
+    # P&L
+    "REALIZED_PNL": ("realized_pnl", "nn", None),
+    "UNREALIZED_PNL": ("unrealized_pnl", "nnn", None),
+    "MARK_TO_MARKET": ("mark_to_market", "nn", None),
+    "POSITION_VALUE": ("position_value", "nn", None),
+    "PNL_PERCENTAGE": ("pnl_percentage", "nn", None),
+    "TOTAL_RETURN": ("total_return", "nnnn", None),
+    "ANNUALIZED_RETURN": ("annualized_return", "ni", None),
+    # Text
+    "LEFT_TEXT": ("left", "si", None),
+    "RIGHT_TEXT": ("right", "si", None),
+    "MID": ("mid", "sii", None),
+    "PROPER": ("proper", "s", None),
+    "FIND": ("find", "ssi", None),
+    "SEARCH": ("search", "ssi", None),
+    "SUBSTITUTE": ("substitute", "sssi", None),
+    "REPT": ("rept", "si", None),
+    "TEXTJOIN": ("text_join", "s", None),
+    "SPLIT_TEXT": ("split_text", "ssi", 3),
+}
+
+DUCKDB_MAX_VARIADIC_ARGS = 16
+
+# Python return annotation -> DuckDB result type (anything else is text)
+DUCKDB_RESULT_TYPES = {float: "DOUBLE", int: "BIGINT"}
+
+# Cell as a number like WeightedAverage._number: non-numeric text counts as 0
+_DUCKDB_NUMBER = "COALESCE(TRY_CAST(REPLACE(CAST({} AS VARCHAR), ',', '') AS DOUBLE), 0)"
+
+FUNCTION_CALL_PATTERN = re.compile(r'\b(\w+)\s*\(')
+
+_engine: Optional[ExcelFormulaEngine] = None
+
+
+def _get_engine() -> ExcelFormulaEngine:
+    global _engine
+    if _engine is None:
+        _engine = ExcelFormulaEngine()
+    return _engine
+
+
+def _coerce(value: Any, kind: str) -> Any:
+    """Convert a SQL value to the argument type; raises ValueError for missing numbers"""
+    if kind == "s":
+        return value
+    if value is None or (isinstance(value, str) and not value.strip()):
+        raise ValueError("missing numeric argument")
+    number = float(str(value).replace(",", "")) if isinstance(value, str) else float(value)
+    return int(number) if kind == "i" else number
+
+
+def _make_scalar(method: Callable, kinds: str) -> Callable:
+    """Wrap an engine method so SQL arguments are converted and bad input gives NULL"""
+    def scalar(*args):
+        try:
+            values = [_coerce(arg, kinds[min(idx, len(kinds) - 1)]) for idx, arg in enumerate(args)]
+            return method(*values)
+        except (TypeError, ValueError, ZeroDivisionError, OverflowError):
+            return None
+
+    return scalar
+
+
+def _arity(method: Callable, kinds: str, min_args: Optional[int]) -> Tuple[int, int]:
+    """Allowed argument counts (max -1 for variadic functions)"""
+    params = list(inspect.signature(method).parameters.values())
+    if any(p.kind == inspect.Parameter.VAR_POSITIONAL for p in params):
+        return -1, -1
+
+    required = sum(1 for p in params if p.default is inspect.Parameter.empty)
+    return min_args if min_args is not None else required, len(kinds)
+
+
+class WeightedAverage:
+    """
+    WEIGHTED_AVG(qty, price[, value]) aggregate - streaming form of
+    ExcelFormulaEngine.weighted_avg_cost (non-numeric inputs count as 0).
+    """
+
+    def __init__(self):
+        self.total_qty = 0.0
+        self.total_value = 0.0
+
+    def step(self, qty, price, value=None):
+        qty = self._number(qty)
+        self.total_qty += qty
+        self.total_value += self._number(value) if value is not None else qty * self._number(price)
+
+    def finalize(self):
+        if self.total_qty == 0:
+            return 0.0
+        return round(self.total_value / self.total_qty, 4)
+
+    @staticmethod
+    def _number(value) -> float:
+        try:
+            return float(str(value).replace(",", "")) if value is not None else 0.0
+        except ValueError:
+            return 0.0
+
+
+def register_formula_functions(conn: sqlite3.Connection) -> None:
+    """Register the formula engine functions on a SQLite connection"""
+    engine = _get_engine()
+
+    for sql_name, (method_name, kinds, min_args) in SCALAR_FUNCTIONS.items():
+        method = getattr(engine, method_name)
+        scalar = _make_scalar(method, kinds)
+        low, high = _arity(method, kinds, min_args)
+        if low == -1:
+            conn.create_function(sql_name, -1, scalar, deterministic=True)
+            continue
+        for narg in range(low, high + 1):
+            conn.create_function(sql_name, narg, scalar, deterministic=True)
+
+    conn.create_aggregate("WEIGHTED_AVG", 2, WeightedAverage)
+    conn.create_aggregate("WEIGHTED_AVG", 3, WeightedAverage)
+
+
+def _fixed_arity(scalar: Callable, narg: int) -> Callable:
+    """scalar with a signature of narg parameters, which DuckDB checks against the parameter types"""
+    def fixed(*args):
+        return scalar(*args)
+
+    fixed.__signature__ = inspect.Signature(
+        [inspect.Parameter(f"a{i}", inspect.Parameter.POSITIONAL_ONLY) for i in range(narg)]
+    )
+    return fixed
+
+
+def used_formula_functions(query: str) -> Set[str]:
+    """Formula function names a query calls (registering all of them on DuckDB takes ~100 ms)"""
+    names = {name.upper() for name in FUNCTION_CALL_PATTERN.findall(query)}
+    return names & (set(SCALAR_FUNCTIONS) | {"WEIGHTED_AVG"})
+
+
+def register_duckdb_functions(conn: Any, names: Optional[Set[str]] = None) -> None:
+    """Register the formula engine functions (or only those in names) on a DuckDB connection"""
+    engine = _get_engine()
+
+    for sql_name, (method_name, kinds, min_args) in SCALAR_FUNCTIONS.items():
+        if names is not None and sql_name not in names:
+            continue
+        method = getattr(engine, method_name)
+        scalar = _make_scalar(method, kinds)
+        low, high = _arity(method, kinds, min_args)
+        if low == -1:
+            low, high = 1, DUCKDB_MAX_VARIADIC_ARGS
+        result_type = DUCKDB_RESULT_TYPES.get(inspect.signature(method).return_annotation, "VARCHAR")
+
+        overloads = []
+        for narg in range(low, high + 1):
+            udf_name = f"_formula_{sql_name.lower()}_{narg}"
+            params = [f"a{i}" for i in range(narg)]
+            conn.create_function(
+                udf_name, _fixed_arity(scalar, narg), ["VARCHAR"] * narg, result_type, null_handling="special"
+            )
+            casts = ", ".join(f"CAST({p} AS VARCHAR)" for p in params)
+            overloads.append(f"({', '.join(params)}) AS {udf_name}({casts})")
+        conn.execute(f"CREATE TEMP MACRO {sql_name} {', '.join(overloads)}")
+
+    if names is not None and "WEIGHTED_AVG" not in names:
+        return
+    qty, price, value = (_DUCKDB_NUMBER.format(name) for name in ("q", "p", "v"))
+    average = "COALESCE(ROUND(SUM({}) / NULLIF(SUM(" + qty + "), 0), 4), 0.0)"
+    conn.execute(
+        "CREATE TEMP MACRO WEIGHTED_AVG "
+        f"(q, p) AS {average.format(f'{qty} * {price}')}, "
+        f"(q, p, v) AS {average.format(f'CASE WHEN v IS NULL THEN {qty} * {price} ELSE {value} END')}"
+    )
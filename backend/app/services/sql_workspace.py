@@ -0,0 +1,210 @@
+"""
+SQL Workspace - shared, pre-materialised SQLite copy of the app tables.
+
+One writer connection loads tables and refreshes them when their source
+changes; queries run on a pool of read-only connections to the same file
+(WAL mode), so concurrent requests read one copy of the data in parallel
+instead of each building a private in-memory database.
+
+The file holds every table some request synced, so a reader is lent out for
+a set of table keys and an authorizer refuses reads of any other table, as
+if it did not exist. Tables deleted from the app are dropped on the next sync.
+"""
+import os
+import queue
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Table
+from .sql_functions import register_formula_functions
+from .table_store import table_version, table_columns, fetch_rows
+
+
+class _TableGuard:
+    """Authorizer of one reader connection: reads only of the tables it is lent for."""
+
+    def __init__(self):
+        self.allowed: Optional[Set[str]] = None
+        self.denied: List[str] = []
+
+    def check(self, action, table, column, database, trigger):
+        if action == sqlite3.SQLITE_READ and table not in self.allowed and not table.startswith("sqlite_"):
+            self.denied.append(table)
+            return sqlite3.SQLITE_DENY
+        return sqlite3.SQLITE_OK
+
+
+class SqlWorkspace:
+    """File-backed SQLite workspace with one writer and a pool of read-only readers."""
+
+    def __init__(self, path: str, pool_size: int):
+        self.path = path
+        self.pool_size = pool_size
+
+        # Anything left over from a previous run has unknown versions
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+        self._write_lock = threading.Lock()
+        # Version and row count of each table copy in the file; replaced, never modified
+        self._copies: Dict[str, Tuple[Tuple, int]] = {}
+
+        self._writer = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._writer.execute("PRAGMA journal_mode=WAL")
+        self._writer.execute("PRAGMA synchronous=OFF")
+
+        self._readers: "queue.Queue[Tuple[sqlite3.Connection, _TableGuard]]" = queue.Queue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+
+    def sync(self, db: Session, requested: List[Table]) -> Dict[str, int]:
+        """
+        Make the requested tables available, reloading copies whose table changed.
+
+        Only the requested tables are reloaded: a concurrent request may have
+        just synced other tables (possibly seeing newer versions than this
+        request's session does) and be about to query them. Copies of tables
+        that no longer exist are dropped. Returns rows per requested table.
+        """
+        versions = {t.key: table_version(t) for t in requested}
+        existing = {key for key, in db.query(Table.key)}
+
+        copies = self._copies
+        if not self._needs_sync(copies, versions) and existing.issuperset(copies):
+            return {t.key: copies[t.key][1] for t in requested if t.key in copies}
+
+        with self._write_lock:
+            # Changes go to a new dict, published only once committed
+            copies = dict(self._copies)
+            self._writer.execute("BEGIN")
+            try:
+                for key in [k for k in copies if k not in existing]:
+                    self._writer.execute(f'DROP TABLE IF EXISTS "{key}"')
+                    del copies[key]
+                for table in requested:
+                    if copies.get(table.key, (None,))[0] != versions[table.key]:
+                        copies[table.key] = (table_version(table), self._materialise(db, table))
+                self._writer.execute("COMMIT")
+            except Exception:
+                self._writer.execute("ROLLBACK")
+                raise
+            self._copies = copies
+
+        return {t.key: copies[t.key][1] for t in requested if t.key in copies}
+
+    def _needs_sync(self, copies: Dict[str, Tuple[Tuple, int]], versions: Dict[str, Tuple]) -> bool:
+        """Whether a requested table is missing or its copy is stale"""
+        return any(copies.get(key, (None,))[0] != version for key, version in versions.items())
+
+    def _materialise(self, db: Session, table: Table) -> int:
+        """(Re)create and fill one table inside the writer's open transaction; returns its rows"""
+        self._writer.execute(f'DROP TABLE IF EXISTS "{table.key}"')
+        columns = table_columns(table)
+        if not columns:
+            # Nothing to create, but synced: later requests need not take the write lock for it
+            return 0
+
+        col_defs = ", ".join([f'"{col}" TEXT' for col in columns])
+        self._writer.execute(f'CREATE TABLE "{table.key}" ({col_defs})')
+
+        rows = fetch_rows(db, table)
+        width = len(columns)
+        placeholders = ", ".join(["?" for _ in columns])
+        self._writer.executemany(
+            f'INSERT INTO "{table.key}" VALUES ({placeholders})',
+            (row + [''] * (width - len(row)) if len(row) < width else row[:width] for row in rows)
+        )
+        return len(rows)
+
+    @contextmanager
+    def reader(self, table_keys: Iterable[str]) -> Iterator[sqlite3.Connection]:
+        """
+        Borrow a read-only connection that can read only the given tables,
+        opening one if the pool is not full yet.
+        """
+        conn, guard = self._acquire_reader()
+        allowed = set(table_keys)
+        if guard.allowed != allowed:
+            guard.allowed = allowed
+            # Setting the authorizer expires cached statements prepared for other tables
+            conn.set_authorizer(guard.check)
+        guard.denied.clear()
+        try:
+            yield conn
+        except sqlite3.DatabaseError as e:
+            if guard.denied:
+                raise sqlite3.OperationalError(f"no such table: {guard.denied[0]}") from e
+            raise
+        finally:
+            self._readers.put((conn, guard))
+
+    def _acquire_reader(self) -> Tuple[sqlite3.Connection, _TableGuard]:
+        try:
+            return self._readers.get_nowait()
+        except queue.Empty:
+            pass
+
+        with self._reader_lock:
+            if self._reader_count < self.pool_size:
+                self._reader_count += 1
+                return self._open_reader()
+
+        return self._readers.get(timeout=settings.SQL_TIMEOUT)
+
+    def _open_reader(self) -> Tuple[sqlite3.Connection, _TableGuard]:
+        conn = sqlite3.connect(
+            f"file:{self.path}?mode=ro",
+            uri=True,
+            check_same_thread=False,
+            cached_statements=settings.SQL_STATEMENT_CACHE_SIZE
+        )
+        conn.execute("PRAGMA query_only=ON")
+        # Readers map the file instead of each holding private page copies
+        conn.execute(f"PRAGMA mmap_size={settings.SQL_WORKSPACE_MMAP_SIZE}")
+        register_formula_functions(conn)
+        return conn, _TableGuard()
+
+    def close(self) -> None:
+        """Close all connections and remove the workspace file"""
+        while True:
+            try:
+                self._readers.get_nowait()[0].close()
+            except queue.Empty:
+                break
+        self._writer.close()
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.path + suffix):
+                os.remove(self.path + suffix)
+
+
+_workspace: Optional[SqlWorkspace] = None
+_workspace_lock = threading.Lock()
+
+
+def get_workspace() -> SqlWorkspace:
+    """Get the process-wide workspace, creating it on first use"""
+    global _workspace
+    if _workspace is None:
+        with _workspace_lock:
+            if _workspace is None:
+                path = settings.SQL_WORKSPACE_PATH or os.path.join(
+                    tempfile.gettempdir(), f"didp_sql_workspace_{os.getpid()}.db"
+                )
+                _workspace = SqlWorkspace(path, settings.SQL_READER_POOL_SIZE)
+    return _workspace
+
+
+def close_workspace() -> None:
+    """Tear down the workspace (application shutdown)"""
+    global _workspace
+    with _workspace_lock:
+        if _workspace is not None:
+            _workspace.close()
+            _workspace = None
@@ -0,0 +1,144 @@
+"""
+Table Store - shared helpers for reading app table data and tracking changes.
+"""
+from datetime import datetime
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import Table, TableColumn, TableRow
+
+
+def table_version(table: Table) -> Tuple:
+    """Identity of a table's current contents; changes whenever its data is replaced."""
+    return (table.id, table.updated_at, table.row_count)
+
+
+def mark_table_changed(table: Table) -> None:
+    """Bump the table version after its rows or columns were rewritten."""
+    table.updated_at = datetime.utcnow()
+
+
+def table_columns(table: Table) -> List[str]:
+    """Column names in display order."""
+    return [c.name for c in sorted(table.columns, key=lambda x: x.index)]
+
+
+def fetch_rows(db: Session, table: Table) -> List[List[str]]:
+    """Fetch row data in order without materialising TableRow objects."""
+    return [
+        data for (data,) in db.query(TableRow.data)
+        .filter(TableRow.table_id == table.id)
+        .order_by(TableRow.row_index)
+    ]
+
+
+def fetch_indexed_rows(db: Session, table: Table) -> Tuple[List[int], List[List[str]]]:
+    """Row indexes and row data in order, without materialising TableRow objects."""
+    row_indices = []
+    rows = []
+    for row_index, data in (
+        db.query(TableRow.row_index, TableRow.data)
+        .filter(TableRow.table_id == table.id)
+        .order_by(TableRow.row_index)
+    ):
+        row_indices.append(row_index)
+        rows.append(data)
+    return row_indices, rows
+
+
+def iter_indexed_rows(
+    db: Session,
+    table: Table,
+    batch_size: int
+) -> Iterator[Tuple[List[int], List[List[str]]]]:
+    """Row indexes and row data in order, a batch at a time, for tables too large to load at once."""
+    query = (
+        db.query(TableRow.row_index, TableRow.data)
+        .filter(TableRow.table_id == table.id)
+        .order_by(TableRow.row_index)
+        .yield_per(batch_size)
+    )
+    row_indices = []
+    rows = []
+    for row_index, data in query:
+        row_indices.append(row_index)
+        rows.append(data)
+        if len(rows) == batch_size:
+            yield row_indices, rows
+            row_indices, rows = [], []
+    if rows:
+        yield row_indices, rows
+
+
+def unique_columns(columns: List[str]) -> List[str]:
+    """Suffix repeated column names (e.g. two "id" columns from a join) so each is addressable."""
+    seen = {}
+    result = []
+    for col in columns:
+        name = col
+        while name in seen:
+            seen[col] += 1
+            name = f"{col}_{seen[col]}"
+        seen[name] = 1
+        result.append(name)
+    return result
+
+
+def write_table(
+    db: Session,
+    key: str,
+    name: str,
+    columns: List[str],
+    rows: Iterable[List[str]],
+    category: Optional[str] = None,
+    source_type: str = "derived",
+    replace: bool = False
+) -> Table:
+    """
+    Create a table, or replace an existing one's data, from an iterable of rows.
+
+    Rows are consumed in batches of BULK_INSERT_BATCH_SIZE and written with
+    executemany inserts, so large results never exist as ORM objects.
+    """
+    table = db.query(Table).filter(Table.key == key).first()
+    if table and not replace:
+        raise ValueError(f"Table with key '{key}' already exists")
+
+    if table:
+        db.query(TableColumn).filter(TableColumn.table_id == table.id).delete()
+        db.query(TableRow).filter(TableRow.table_id == table.id).delete()
+        table.name = name
+        if category is not None:
+            table.category = category
+        mark_table_changed(table)
+    else:
+        table = Table(key=key, name=name, category=category, source_type=source_type, row_count=0)
+        db.add(table)
+        db.flush()
+
+    db.execute(insert(TableColumn), [
+        {"table_id": table.id, "index": idx, "name": col_name}
+        for idx, col_name in enumerate(columns)
+    ])
+
+    row_count = 0
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, settings.BULK_INSERT_BATCH_SIZE))
+        if not batch:
+            break
+        db.execute(insert(TableRow), [
+            {"table_id": table.id, "row_index": row_count + offset, "data": row}
+            for offset, row in enumerate(batch)
+        ])
+        row_count += len(batch)
+
+    table.row_count = row_count
+    db.commit()
+    db.refresh(table)
+
+    return table
@@ -0,0 +1,115 @@
+"""
+Value Mapping Cache - value mappings loaded once and shared by their users.
+
+Matching, the apply/reverse endpoints and the `excel` engine in Python
+scripts all look mappings up through this cache instead of loading the
+ValueMapping row per value. Each entry holds the forward dict and its
+reverse, built once, and the mapping's updated_at when it was loaded. A
+lookup reads only the current updated_at and reloads the mapping if it
+changed, so writes from other workers or processes are seen on the next
+lookup. The value mapping routes also invalidate an entry on every write.
+"""
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..config import settings
+from ..models import ValueMapping
+from .formula_engine import MappingRef, ValueLookup
+
+
+class CachedMapping(NamedTuple):
+    """A value mapping's lookups. Treat the dicts as read-only; they are shared."""
+    id: int
+    name: str
+    forward: Dict[str, str]   # source value -> target value
+    reverse: Dict[str, str]   # target value -> source value (last one wins)
+
+    def lookup(self) -> ValueLookup:
+        """The mapping's dicts as handed to the excel formula engine."""
+        return ValueLookup(forward=self.forward, reverse=self.reverse)
+
+
+class ValueMappingCache:
+    """LRU of mappings by id, each valid while the mapping's updated_at is unchanged."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._entries: "OrderedDict[int, Tuple[datetime, CachedMapping]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, mapping_id: int) -> Optional[CachedMapping]:
+        """The mapping with this id, or None if it does not exist."""
+        found = db.query(ValueMapping.updated_at).filter(ValueMapping.id == mapping_id).first()
+        if found is None:
+            self.invalidate(mapping_id)
+            return None
+        return self._get(db, mapping_id, found[0])
+
+    def get_by_name(self, db: Session, name: str) -> Optional[CachedMapping]:
+        """The first mapping with this name, or None."""
+        found = (
+            db.query(ValueMapping.id, ValueMapping.updated_at)
+            .filter(ValueMapping.name == name)
+            .order_by(ValueMapping.id)
+            .first()
+        )
+        return self._get(db, found[0], found[1]) if found else None
+
+    def resolve(self, db: Session, ref: MappingRef) -> Optional[CachedMapping]:
+        """Look a mapping up by id (int) or name (str)."""
+        if isinstance(ref, str):
+            return self.get_by_name(db, ref)
+        return self.get(db, int(ref))
+
+    def _get(self, db: Session, mapping_id: int, version: datetime) -> Optional[CachedMapping]:
+        with self._lock:
+            cached = self._entries.get(mapping_id)
+            if cached is not None and cached[0] == version:
+                self._entries.move_to_end(mapping_id)
+                return cached[1]
+
+        row = db.query(ValueMapping).filter(ValueMapping.id == mapping_id).first()
+        if row is None:
+            self.invalidate(mapping_id)
+            return None
+        forward = dict(row.mappings or {})
+        entry = CachedMapping(
+            id=row.id,
+            name=row.name,
+            forward=forward,
+            reverse={v: k for k, v in forward.items()},
+        )
+
+        with self._lock:
+            self._entries[mapping_id] = (row.updated_at, entry)
+            self._entries.move_to_end(mapping_id)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, mapping_id: int) -> None:
+        """Drop a mapping after it was created, changed or deleted."""
+        with self._lock:
+            self._entries.pop(mapping_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_cache: Optional[ValueMappingCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_value_mapping_cache() -> ValueMappingCache:
+    """Get the process-wide value mapping cache"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ValueMappingCache(settings.VALUE_MAPPING_CACHE_SIZE)
+    return _cache
@@ -0,0 +1,134 @@
+"""
+Benchmark SQLite vs DuckDB for /sql/execute on typical EOD queries.
+
+Builds a throwaway database with a synthetic trades table, then runs each
+query through SqlExecutorService on both engines, prints the load and
+execute phases from the query profile and checks both engines return the
+same rows. --dirty mixes blanks, "N/A" and leading zeros into quantities.
+
+Usage (from backend/):
+    python -m benchmarks.sql_engines --rows 200000 [--dirty]
+"""
+import argparse
+import math
+import os
+import random
+import tempfile
+import time
+
+EOD_QUERIES = {
+    "turnover_by_client": (
+        'SELECT client_code, COUNT(*) AS trades, SUM(quantity * price) AS turnover '
+        'FROM trades GROUP BY client_code ORDER BY turnover DESC'
+    ),
+    "net_position_by_isin": (
+        "SELECT isin, SUM(CASE WHEN side = 'B' THEN quantity ELSE -quantity END) AS net_qty "
+        'FROM trades GROUP BY isin ORDER BY isin'
+    ),
+    "brokerage_by_date": (
+        'SELECT trade_date, SUM(brokerage) AS brokerage, AVG(price) AS avg_price '
+        'FROM trades GROUP BY trade_date ORDER BY trade_date'
+    ),
+    "large_trades": (
+        'SELECT trade_id, client_code, quantity * price AS value FROM trades '
+        'WHERE quantity * price > 900000 ORDER BY value DESC LIMIT 100'
+    ),
+}
+
+COLUMNS = ["trade_id", "trade_date", "client_code", "isin", "side", "quantity", "price", "brokerage"]
+
+
+DIRTY_QUANTITIES = ["", "N/A", "-", "007", " 12 "]
+
+
+def build_rows(count: int, dirty: bool = False):
+    rng = random.Random(42)
+    clients = [f"CL{i:04d}" for i in range(500)]
+    isins = [f"INE{i:06d}01" for i in range(2000)]
+    for i in range(count):
+        qty = rng.randint(1, 5000)
+        price = round(rng.uniform(10, 2500), 2)
+        quantity = rng.choice(DIRTY_QUANTITIES) if dirty and i % 50 == 0 else str(qty)
+        yield [
+            f"T{i:08d}",
+            f"2024-01-{rng.randint(1, 28):02d}",
+            rng.choice(clients),
+            rng.choice(isins),
+            rng.choice("BS"),
+            quantity,
+            str(price),
+            str(round(qty * price * 0.0003, 2)),
+        ]
+
+
+def same_rows(a, b) -> bool:
+    """Whether two results hold the same cells, numbers equal up to float rounding."""
+    def same_cell(x: str, y: str) -> bool:
+        if x == y:
+            return True
+        try:
+            return math.isclose(float(x), float(y), rel_tol=1e-9)
+        except ValueError:
+            return False
+    return len(a) == len(b) and all(
+        len(r) == len(s) and all(same_cell(x, y) for x, y in zip(r, s)) for r, s in zip(a, b)
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dirty", action="store_true", help="mix blanks, N/A and leading zeros into quantities")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="didp_bench_")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    from sqlalchemy import insert
+    from app.database import SessionLocal, init_db
+    from app.models import Table, TableColumn, TableRow
+    from app.services.sql_executor import SqlExecutorService
+
+    init_db()
+    db = SessionLocal()
+
+    table = Table(key="trades", name="Trades", source_type="imported", row_count=args.rows)
+    db.add(table)
+    db.flush()
+    db.add_all([TableColumn(table_id=table.id, index=idx, name=name) for idx, name in enumerate(COLUMNS)])
+    db.execute(
+        insert(TableRow),
+        [{"table_id": table.id, "row_index": idx, "data": row} for idx, row in enumerate(build_rows(args.rows, args.dirty))]
+    )
+    db.commit()
+
+    service = SqlExecutorService(db)
+    print(f"{'query':<24}{'engine':<8}{'load ms':>10}{'execute ms':>12}{'total ms':>10}")
+    mismatches = []
+    for name, query in EOD_QUERIES.items():
+        outputs = {}
+        for engine in ("sqlite", "duckdb"):
+            best = None
+            for _ in range(args.repeat):
+                db.expire_all()
+                started = time.perf_counter()
+                result = service.execute_query(query, ["trades"], profile=True, engine=engine)
+                elapsed = (time.perf_counter() - started) * 1000
+                if result.error:
+                    raise SystemExit(f"{name} on {engine} failed: {result.error}")
+                if best is None or elapsed < best[2]:
+                    best = (result.profile.load_ms, result.profile.execute_ms + result.profile.fetch_ms, elapsed)
+                outputs[engine] = result.data
+            print(f"{name:<24}{engine:<8}{best[0]:>10.1f}{best[1]:>12.1f}{best[2]:>10.1f}")
+        if not same_rows(outputs["sqlite"], outputs["duckdb"]):
+            mismatches.append(name)
+
+    db.close()
+    if mismatches:
+        raise SystemExit(f"engines returned different rows for: {', '.join(mismatches)}")
+    print("results identical")
+
+
+if __name__ == "__main__":
+    main()
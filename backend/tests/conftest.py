@@ -0,0 +1,19 @@
+import os
+import tempfile
+
+import pytest
+
+# Point the app at a throwaway database before anything imports its settings
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+
+from app.database import SessionLocal, init_db  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    init_db()
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
@@ -0,0 +1,66 @@
+import os
+
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from app.models import Table  # noqa: E402
+from app.services.python_executor import PythonExecutorService  # noqa: E402
+from app.services.python_shared_tables import SharedTableStore, read_shared_table  # noqa: E402
+from app.services.table_store import write_table  # noqa: E402
+
+
+ROWS = [["T1", "10", "1.5"], ["T2", "20", ""], ["T3", "n/a"], ["T4", None, "2"]]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SharedTableStore(str(tmp_path / "tables"), 1024 * 1024)
+    yield store
+    store.close()
+
+
+def test_worker_frames_match_in_process_frames(db, store):
+    write_table(db, "trades", "Trades", ["id", "qty", "price"], ROWS, replace=True)
+    table = db.query(Table).filter(Table.key == "trades").first()
+    load = PythonExecutorService(db)._table_loader()
+    path = store.publish(db, table)
+
+    for columns in (None, ["qty"], ["price", "id"]):
+        in_process = load("trades", columns)
+        shared = read_shared_table(path, columns)
+        assert shared.dtypes.tolist() == in_process.dtypes.tolist()
+        pd.testing.assert_frame_equal(shared, in_process)
+
+    qty = read_shared_table(path)["qty"]
+    assert pd.to_numeric(qty, errors="coerce").sum() == 30
+
+
+def test_replaced_and_deleted_tables_lose_their_files(db, store):
+    write_table(db, "a", "A", ["v"], [["1"]], replace=True)
+    write_table(db, "b", "B", ["v"], [["2"]], replace=True)
+    a = db.query(Table).filter(Table.key == "a").first()
+    b = db.query(Table).filter(Table.key == "b").first()
+    old_a, old_b = store.publish(db, a), store.publish(db, b)
+
+    write_table(db, "a", "A", ["v"], [["3"]], replace=True)
+    db.delete(b)
+    db.commit()
+    new_a = store.publish(db, db.query(Table).filter(Table.key == "a").first())
+
+    assert new_a != old_a and os.path.exists(new_a)
+    assert not os.path.exists(old_a)
+    assert not os.path.exists(old_b)
+
+
+def test_files_beyond_the_size_limit_are_removed_oldest_first(db, tmp_path):
+    store = SharedTableStore(str(tmp_path / "small"), 1)
+    try:
+        paths = []
+        for key in ("a", "b", "c"):
+            write_table(db, key, key, ["v"], [["x" * 100]], replace=True)
+            paths.append(store.publish(db, db.query(Table).filter(Table.key == key).first()))
+        assert [os.path.exists(p) for p in paths] == [False, False, True]
+    finally:
+        store.close()